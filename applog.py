@@ -0,0 +1,224 @@
+"""Non-blocking, structured logging shared by the MCP and auth apps.
+
+``configure_logging`` routes every record through a ``QueueHandler`` into a
+bounded queue; a ``QueueListener`` thread formats them and writes them to
+stdout, so request handlers never block on terminal or pipe writes. On top
+of that:
+
+* ``LOG_LEVEL`` sets the root level and ``LOG_LEVELS`` per-module levels,
+  e.g. ``server=DEBUG,assets=WARNING``
+* ``LOG_SAMPLE_RATES`` keeps only a fraction of records below WARNING from
+  high-volume loggers, e.g. ``main.requests=0.01,server.requests=0.1``
+* ``LOG_FORMAT`` is ``json`` (one object per line) or ``text``
+* secrets, tokens and one-time codes are redacted before a record is queued
+* a full queue drops records instead of waiting; the count is reported by
+  ``logging_stats``
+
+Pass structured fields with ``extra``::
+
+    log.info("one-time code issued", extra={"email": email})
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+from typing import Dict, Optional
+
+REDACTED = "[REDACTED]"
+SENSITIVE_FIELDS = frozenset({
+    "access_token",
+    "authorization",
+    "challenge",
+    "code",
+    "code_verifier",
+    "credential_public_key",
+    "password",
+    "refresh_token",
+    "secret",
+    "temp_token",
+    "token",
+})
+_SENSITIVE_TEXT = re.compile(
+    r"(?P<key>\b(?:%s)\b[\"']?\s*[:=]\s*[\"']?)(?P<value>[^\s&\"',}]+)"
+    % "|".join(sorted(SENSITIVE_FIELDS, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+_BEARER = re.compile(r"(Bearer\s+)[A-Za-z0-9._~+/=-]+", re.IGNORECASE)
+
+# LogRecord attributes that are not user-supplied ``extra`` fields.
+_RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None)).keys()
+) | {"message", "asctime", "taskName"}
+
+
+def redact_text(text: str) -> str:
+    text = _SENSITIVE_TEXT.sub(lambda m: m.group("key") + REDACTED, text)
+    return _BEARER.sub(lambda m: m.group(1) + REDACTED, text)
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, object]:
+    return {
+        key: value
+        for key, value in record.__dict__.items()
+        if key not in _RECORD_ATTRIBUTES and not key.startswith("_")
+    }
+
+
+class RedactingFilter(logging.Filter):
+    """Scrubs sensitive ``extra`` fields and ``key=value`` pairs in messages."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.msg = redact_text(record.getMessage())
+        record.args = None
+        for key in _extra_fields(record):
+            if key.lower() in SENSITIVE_FIELDS:
+                setattr(record, key, REDACTED)
+        if record.exc_info and record.exc_info[1] is not None:
+            record.exc_text = redact_text(logging.Formatter().formatException(record.exc_info))
+            record.exc_info = None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps ``rate`` of the records below WARNING from the configured loggers."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Longest prefix first, so "main.requests" wins over "main".
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self.sampled_out = 0
+
+    def _rate(self, name: str) -> float:
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The filters already merged msg and args; keep extra fields intact.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _parse_mapping(spec: str) -> Dict[str, str]:
+    mapping = {}
+    for item in spec.split(","):
+        name, sep, value = item.partition("=")
+        if sep and name.strip():
+            mapping[name.strip()] = value.strip()
+    return mapping
+
+
+_queue_handler: Optional[_DroppingQueueHandler] = None
+_sampler: Optional[SamplingFilter] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    module_levels: Optional[str] = None,
+    sample_rates: Optional[str] = None,
+    fmt: Optional[str] = None,
+    max_queue: Optional[int] = None,
+) -> None:
+    """Install the queue handler on the root logger; later calls are no-ops."""
+    global _queue_handler, _sampler, _listener
+    if _listener is not None:
+        return
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    module_levels = module_levels if module_levels is not None else os.getenv("LOG_LEVELS", "")
+    sample_rates = sample_rates if sample_rates is not None else os.getenv("LOG_SAMPLE_RATES", "")
+    fmt = fmt or os.getenv("LOG_FORMAT", "json")
+    max_queue = max_queue or int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    _sampler = SamplingFilter({name: float(rate) for name, rate in _parse_mapping(sample_rates).items()})
+    _queue_handler = _DroppingQueueHandler(queue.Queue(max_queue))
+    _queue_handler.addFilter(_sampler)
+    _queue_handler.addFilter(RedactingFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level.upper())
+    for name, module_level in _parse_mapping(module_levels).items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, output)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> Dict[str, int]:
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler is not None else 0,
+        "dropped": _queue_handler.dropped if _queue_handler is not None else 0,
+        "sampled_out": _sampler.sampled_out if _sampler is not None else 0,
+    }
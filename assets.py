@@ -0,0 +1,323 @@
+"""Widget HTML shells built from the component CSS and JS bundles.
+
+``WidgetAssetLoader`` renders the HTML shell for each widget component in
+one of three modes:
+
+* ``local``   - read ``<component>.css`` and ``<component>.js`` from a built
+  dist directory, re-reading them when their modification times change.
+* ``startup`` - fetch the bundles from the asset server while the app starts
+  up, without blocking module import.
+* ``lazy``    - fetch the bundles the first time a widget is requested.
+
+Every rendered shell carries a content hash, which results report as
+``widgetVersion``. Remote bundles are fetched by ``AssetFetcher``, which
+shares one pooled async HTTP client across all widgets. After a failed load
+the loader fails fast for ``failure_backoff`` seconds instead of fetching
+again on every request."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+ASSET_MODES = ("local", "startup", "lazy")
+
+log = logging.getLogger(__name__)
+
+
+class AssetUnavailableError(RuntimeError):
+    """Raised when a widget's CSS or JS bundle cannot be loaded."""
+
+
+@dataclass(frozen=True)
+class WidgetAsset:
+    html: str
+    content_hash: str
+
+
+def template_uri_of(uri: str) -> str:
+    """``ui://widget/x.html?v=abc`` without its query.
+
+    Only the current version of a shell is kept, so a ``?v=`` a client
+    added for cache busting does not change what it is served."""
+    return uri.partition("?")[0]
+
+
+def render_widget_html(title: str, css: str, js: str) -> str:
+    return f"""<!doctype html>
+    <html lang="en">
+    <head>
+      <meta charset="UTF-8" />
+      <meta name="viewport" content="width=device-width, initial-scale=1" />
+      <title>{title}</title>
+      <style>{css}</style>
+    </head>
+    <body>
+      <div id="root"></div>
+      <script type="module">{js}</script>
+    </body>
+    </html>"""
+
+
+def _build_asset(title: str, css: str, js: str) -> WidgetAsset:
+    html = render_widget_html(title, css, js)
+    content_hash = hashlib.sha256(html.encode()).hexdigest()[:16]
+    return WidgetAsset(html=html, content_hash=content_hash)
+
+
+class AssetFetcher:
+    """Async text fetcher over one shared connection pool.
+
+    * at most ``max_connections_per_host`` requests run against a host at once
+    * transport errors, 429s and 5xx responses are retried ``retries`` times
+      with exponential backoff and jitter; every other ``httpx.HTTPError``
+      fails at once
+    * every failure is raised as ``AssetUnavailableError``
+    * concurrent requests for the same path share a single fetch
+
+    ``transport`` is passed straight to ``httpx.AsyncClient``, which makes it
+    easy to point the fetcher at an in-process stand-in asset server."""
+
+    RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 10.0,
+        max_connections_per_host: int = 8,
+        retries: int = 2,
+        backoff: float = 0.2,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_connections_per_host = max_connections_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=None,
+                    max_keepalive_connections=self.max_connections_per_host,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    def _slots(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        slots = self._host_slots.get(host)
+        if slots is None:
+            slots = self._host_slots[host] = asyncio.Semaphore(self.max_connections_per_host)
+        return slots
+
+    async def _fetch_with_retry(self, url: str) -> str:
+        client = self._get_client()
+        attempt = 0
+        while True:
+            try:
+                async with self._slots(url):
+                    response = await client.get(url)
+                if response.status_code not in self.RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.text
+                error: Exception = httpx.HTTPStatusError(
+                    f"{response.status_code} from {url}", request=response.request, response=response
+                )
+            except httpx.TransportError as e:
+                error = e
+            except httpx.HTTPError as e:
+                # Other statuses, undecodable bodies and bad URLs: retrying would not help.
+                raise AssetUnavailableError(f"Cannot fetch {url}: {e}") from e
+            if attempt >= self.retries:
+                raise AssetUnavailableError(f"Cannot fetch {url}: {error}") from error
+            await asyncio.sleep(self.backoff * 2 ** attempt * (0.5 + random.random()))
+            attempt += 1
+
+    async def fetch_text(self, path: str) -> str:
+        url = f"{self.base_url}{path}"
+        future = self._inflight.get(url)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch_with_retry(url))
+            self._inflight[url] = future
+            future.add_done_callback(lambda _: self._inflight.pop(url, None))
+        # Shielded so one cancelled caller does not cancel the fetch for the others.
+        return await asyncio.shield(future)
+
+    async def fetch_bundle(self, component: str) -> Tuple[str, str]:
+        """Fetch a component's CSS and JS concurrently."""
+        css, js = await asyncio.gather(
+            self.fetch_text(f"/{component}.css"),
+            self.fetch_text(f"/{component}.js"),
+        )
+        return css, js
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class WidgetAssetLoader:
+    """Renders and caches widget HTML shells keyed by component name."""
+
+    def __init__(
+        self,
+        titles: Dict[str, str],
+        mode: str = "startup",
+        dist_dir: str = "./client/dist",
+        fetcher: Optional[AssetFetcher] = None,
+        check_interval: float = 1.0,
+        failure_backoff: float = 5.0,
+    ):
+        if mode not in ASSET_MODES:
+            raise ValueError(f"Unknown widget asset mode {mode!r}, expected one of {ASSET_MODES}")
+        self.titles = titles
+        self.mode = mode
+        self.dist_dir = dist_dir
+        self.fetcher = fetcher or AssetFetcher("http://localhost:3000")
+        self.check_interval = check_interval
+        self.failure_backoff = failure_backoff
+        self._assets: Dict[str, WidgetAsset] = {}
+        self._mtimes: Dict[str, Tuple[float, float]] = {}
+        self._last_checked: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # component -> (monotonic time, error) of its last failed load.
+        self._failed: Dict[str, Tuple[float, str]] = {}
+        self.hits = 0
+        self.loads = 0
+        self.failures = 0
+        self.fast_failures = 0
+
+    def _paths(self, component: str) -> Tuple[str, str]:
+        return (
+            os.path.join(self.dist_dir, f"{component}.css"),
+            os.path.join(self.dist_dir, f"{component}.js"),
+        )
+
+    def _read_local(self, component: str) -> Tuple[WidgetAsset, Tuple[float, float]]:
+        css_path, js_path = self._paths(component)
+        try:
+            mtimes = (os.stat(css_path).st_mtime, os.stat(js_path).st_mtime)
+            with open(css_path, encoding="utf-8") as f:
+                css = f.read()
+            with open(js_path, encoding="utf-8") as f:
+                js = f.read()
+        except OSError as e:
+            raise AssetUnavailableError(f"Cannot read {component} bundle: {e}") from e
+        return _build_asset(self.titles[component], css, js), mtimes
+
+    async def _fetch_remote(self, component: str) -> WidgetAsset:
+        css, js = await self.fetcher.fetch_bundle(component)
+        return _build_asset(self.titles[component], css, js)
+
+    def _local_is_stale(self, component: str) -> bool:
+        now = time.monotonic()
+        if now - self._last_checked.get(component, 0.0) < self.check_interval:
+            return False
+        self._last_checked[component] = now
+        css_path, js_path = self._paths(component)
+        try:
+            mtimes = (os.stat(css_path).st_mtime, os.stat(js_path).st_mtime)
+        except OSError:
+            return False
+        return mtimes != self._mtimes.get(component)
+
+    async def _load(self, component: str) -> WidgetAsset:
+        try:
+            if self.mode == "local":
+                asset, mtimes = await asyncio.to_thread(self._read_local, component)
+                self._mtimes[component] = mtimes
+            else:
+                asset = await self._fetch_remote(component)
+        except Exception as e:
+            self.failures += 1
+            self._failed[component] = (time.monotonic(), str(e))
+            raise
+        self.loads += 1
+        self._failed.pop(component, None)
+        self._assets[component] = asset
+        return asset
+
+    def _check_backoff(self, component: str) -> None:
+        failed = self._failed.get(component)
+        if failed is not None and time.monotonic() - failed[0] < self.failure_backoff:
+            self.fast_failures += 1
+            raise AssetUnavailableError(f"{component} bundle failed recently: {failed[1]}")
+
+    def peek(self, component: str) -> Optional[WidgetAsset]:
+        """The currently cached asset, without loading or reloading it."""
+        return self._assets.get(component)
+
+    async def get(self, component: str) -> WidgetAsset:
+        """Return the rendered shell, loading it if needed.
+
+        Local bundles are re-read when their files change; remote bundles are
+        fetched once and kept until ``invalidate`` is called. Within
+        ``failure_backoff`` seconds of a failed load, a component that has
+        no cached shell raises ``AssetUnavailableError`` without loading."""
+        asset = self._assets.get(component)
+        if asset is not None and not (self.mode == "local" and self._local_is_stale(component)):
+            self.hits += 1
+            return asset
+        if asset is None:
+            self._check_backoff(component)
+        lock = self._locks.setdefault(component, asyncio.Lock())
+        async with lock:
+            current = self._assets.get(component)
+            if current is not None and current is not asset:
+                return current
+            if current is None:
+                # Callers that queued behind a failed load fail with it.
+                self._check_backoff(component)
+            return await self._load(component)
+
+    def invalidate(self, component: Optional[str] = None) -> None:
+        if component is None:
+            self._assets.clear()
+            self._failed.clear()
+        else:
+            self._assets.pop(component, None)
+            self._failed.pop(component, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "cached": len(self._assets),
+            "hits": self.hits,
+            "loads": self.loads,
+            "failures": self.failures,
+            "fast_failures": self.fast_failures,
+        }
+
+    async def preload(self) -> None:
+        """Load every component up front; used by the ``startup`` and ``local`` modes.
+
+        Failures are reported and left for ``get`` to retry, so a slow or
+        missing asset server never prevents the app from starting."""
+        if self.mode == "lazy":
+            return
+        results = await asyncio.gather(
+            *(self._load(component) for component in self.titles),
+            return_exceptions=True,
+        )
+        for component, result in zip(self.titles, results):
+            if isinstance(result, Exception):
+                log.warning(
+                    "could not preload widget", extra={"widget": component, "error": str(result)}
+                )
@@ -0,0 +1,179 @@
+"""Per-restaurant reservation availability with date and time-window queries.
+
+Catalog rows describe availability as ``{'MM-DD-YYYY': ['HH:MM:SS', ...]}``.
+``Availability`` parses and validates that mapping once at load time and
+keeps the slots as sorted minute-of-day integers keyed by real dates, so
+questions like "Friday to Sunday after 19:00" are answered with binary
+searches instead of string parsing."""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Tuple
+
+DATE_FORMAT = "%m-%d-%Y"
+MINUTES_PER_DAY = 24 * 60
+# Slots after this cannot be real; it catches data-entry errors such as
+# '11-19-2205'. A fixed date, so whether a catalog loads never depends on today.
+LATEST_AVAILABILITY_DATE = date(2100, 12, 31)
+
+
+class InvalidAvailabilityError(ValueError):
+    """Raised when an availability date or time cannot be used."""
+
+
+def parse_date(value: str) -> date:
+    """Parse an ``MM-DD-YYYY`` string."""
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date()
+    except (TypeError, ValueError):
+        raise InvalidAvailabilityError(f"Invalid date {value!r}, expected MM-DD-YYYY") from None
+
+
+def format_date(day: date) -> str:
+    return day.strftime(DATE_FORMAT)
+
+
+def parse_time(value: str) -> int:
+    """Parse ``HH:MM`` or ``HH:MM:SS`` into minutes since midnight."""
+    parts = value.split(":") if isinstance(value, str) else []
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+        raise InvalidAvailabilityError(f"Invalid time {value!r}, expected HH:MM")
+    hours, minutes = int(parts[0]), int(parts[1])
+    seconds = int(parts[2]) if len(parts) == 3 else 0
+    if hours > 23 or minutes > 59 or seconds != 0:
+        raise InvalidAvailabilityError(f"Invalid time {value!r}, expected HH:MM")
+    return hours * 60 + minutes
+
+
+def format_time(minute: int) -> str:
+    hours, minutes = divmod(minute, 60)
+    return f"{hours:02d}:{minutes:02d}:00"
+
+
+class Availability:
+    """Bookable slots for one restaurant, sorted by date then time.
+
+    Everything lives in a single ``array('I')`` laid out as
+    ``[day_count, *day_ordinals, *slot_offsets, *slot_minutes]``: the slots
+    for ``day_ordinals[i]`` are ``slot_minutes[slot_offsets[i]:slot_offsets[i + 1]]``.
+    Day lookups and time windows are both binary searches."""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, slots: Dict[date, Iterable[int]] | None = None):
+        days = sorted(slots or {})
+        data = array("I", [len(days)])
+        data.extend(day.toordinal() for day in days)
+        minutes: List[int] = []
+        data.append(0)
+        for day in days:
+            minutes.extend(sorted(set(slots[day])))
+            data.append(len(minutes))
+        data.extend(minutes)
+        self._data = data
+
+    @classmethod
+    def from_dict(
+        cls,
+        availability: Dict[str, List[str]],
+        *,
+        latest: date = LATEST_AVAILABILITY_DATE,
+    ) -> Availability:
+        """Build from the catalog's ``{'MM-DD-YYYY': ['HH:MM:SS']}`` shape.
+
+        Dates after ``latest`` are rejected along with anything that fails
+        to parse."""
+        slots: Dict[date, List[int]] = {}
+        for key, times in availability.items():
+            day = parse_date(key)
+            if day > latest:
+                raise InvalidAvailabilityError(
+                    f"Availability date {key!r} is after {format_date(latest)}"
+                )
+            slots.setdefault(day, []).extend(parse_time(time) for time in times)
+        return cls(slots)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> Availability:
+        """Rebuild from ``to_bytes`` output (little-endian ``uint32`` words)."""
+        data = array("I")
+        data.frombytes(raw)
+        if sys.byteorder != "little":
+            data.byteswap()
+        availability = cls.__new__(cls)
+        availability._data = data
+        return availability
+
+    def to_bytes(self) -> bytes:
+        if sys.byteorder == "little":
+            return self._data.tobytes()
+        data = array("I", self._data)
+        data.byteswap()
+        return data.tobytes()
+
+    @property
+    def _day_count(self) -> int:
+        return self._data[0]
+
+    def _minutes_base(self) -> int:
+        return 2 * self._day_count + 2
+
+    def _day_bounds(self, index: int) -> Tuple[int, int]:
+        offsets = self._day_count + 1
+        base = self._minutes_base()
+        return base + self._data[offsets + index], base + self._data[offsets + index + 1]
+
+    def _window(self, index: int, start_minute: int, end_minute: int) -> List[int]:
+        lo, hi = self._day_bounds(index)
+        first = bisect_left(self._data, start_minute, lo, hi)
+        last = bisect_left(self._data, end_minute, first, hi)
+        return self._data[first:last].tolist()
+
+    def __len__(self) -> int:
+        return len(self._data) - self._minutes_base()
+
+    def __bool__(self) -> bool:
+        return self._day_count > 0
+
+    def days(self) -> List[date]:
+        return [date.fromordinal(ordinal) for ordinal in self._data[1:self._day_count + 1]]
+
+    def slots_on(self, day: date) -> List[int]:
+        """Minutes since midnight that are open on ``day``."""
+        return self.query(day, day).get(day, [])
+
+    def has_slot(self, day: date, minute: int) -> bool:
+        return minute in self.query(day, day, minute, minute + 1).get(day, ())
+
+    def query(
+        self,
+        start: date,
+        end: date,
+        start_minute: int = 0,
+        end_minute: int = MINUTES_PER_DAY,
+    ) -> Dict[date, List[int]]:
+        """Open slots on days ``start..end`` inclusive within ``[start_minute, end_minute)``.
+
+        Days without a matching slot are omitted."""
+        count = self._day_count
+        first = bisect_left(self._data, start.toordinal(), 1, count + 1) - 1
+        last = bisect_right(self._data, end.toordinal(), 1, count + 1) - 1
+        result: Dict[date, List[int]] = {}
+        for index in range(first, last):
+            window = self._window(index, start_minute, end_minute)
+            if window:
+                result[date.fromordinal(self._data[index + 1])] = window
+        return result
+
+    def to_dict(self, slots: Dict[date, List[int]] | None = None) -> Dict[str, List[str]]:
+        """Render ``slots`` (default: everything) in the catalog's string shape."""
+        if slots is None:
+            slots = {day: self._window(i, 0, MINUTES_PER_DAY) for i, day in enumerate(self.days())}
+        return {
+            format_date(day): [format_time(minute) for minute in minutes]
+            for day, minutes in slots.items()
+        }
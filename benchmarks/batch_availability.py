@@ -0,0 +1,104 @@
+"""Availability for a page of restaurants: N booking calls vs one batch call.
+
+Starts ``uvicorn main:mcp_app`` on a snapshot of ``--venues`` synthetic
+restaurants and, for each page size, fetches availability for a random
+page of ids three ways: one ``Restaurant-booking`` call per id in turn (the
+widget's old pattern), the same calls issued concurrently, and a single
+``Restaurant-availability`` call. Reports the median and p95 time per page.
+Run from the repository root::
+
+    python -m benchmarks.batch_availability --pages 10 25 50 --searches 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.load_mcp import MCP_HEADERS, _rpc, _rpc_result, start_server, stop_server
+from benchmarks.synthetic import synthetic_restaurants
+from snapshot import write_snapshot
+
+WINDOW = {"start_date": "11-15-2025", "end_date": "11-16-2025", "after": "18:00"}
+
+
+async def _call(client: httpx.AsyncClient, name: str, arguments: dict) -> dict:
+    response = await client.post(
+        "/mcp", json=_rpc("tools/call", {"name": name, "arguments": arguments}), headers=MCP_HEADERS
+    )
+    result = (_rpc_result(response) or {}).get("result", {})
+    if result.get("isError", True):
+        raise RuntimeError(f"{name} failed: {result}")
+    return result["structuredContent"]
+
+
+async def sequential(client: httpx.AsyncClient, ids: List[str]) -> None:
+    for restaurant_id in ids:
+        await _call(client, "Restaurant-booking", {"restaurant_id": restaurant_id, **WINDOW})
+
+
+async def concurrent(client: httpx.AsyncClient, ids: List[str]) -> None:
+    await asyncio.gather(*(
+        _call(client, "Restaurant-booking", {"restaurant_id": restaurant_id, **WINDOW})
+        for restaurant_id in ids
+    ))
+
+
+async def batch(client: httpx.AsyncClient, ids: List[str]) -> None:
+    result = await _call(client, "Restaurant-availability", {"restaurant_ids": ids, **WINDOW})
+    assert len(result["availability"]) == len(ids), result["not_found"]
+
+
+async def _measure(url: str, venues: int, pages: List[int], searches: int) -> Dict[int, Dict[str, dict]]:
+    strategies = {"sequential": sequential, "concurrent": concurrent, "batch": batch}
+    results: Dict[int, Dict[str, dict]] = {}
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        for page in pages:
+            results[page] = {}
+            for name, strategy in strategies.items():
+                timings = []
+                for _ in range(searches):
+                    ids = [f"{i:08d}" for i in random.sample(range(venues), page)]
+                    start = time.perf_counter()
+                    await strategy(client, ids)
+                    timings.append(time.perf_counter() - start)
+                timings.sort()
+                results[page][name] = {
+                    "p50_ms": statistics.median(timings) * 1000,
+                    "p95_ms": timings[int(0.95 * (len(timings) - 1))] * 1000,
+                }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--venues", type=int, default=10_000)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 25, 50])
+    parser.add_argument("--searches", type=int, default=50, help="pages fetched per strategy and size")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="batch-availability-")
+    path = os.path.join(directory, "catalog.snapshot")
+    write_snapshot(path, synthetic_restaurants(args.venues))
+    process, url = start_server(env={"CATALOG_PATH": path})
+    try:
+        results = asyncio.run(_measure(url, args.venues, args.pages, args.searches))
+    finally:
+        stop_server(process)
+
+    print(f"{'page':>5} {'strategy':>11} {'p50 ms':>9} {'p95 ms':>9}")
+    for page, strategies in results.items():
+        for name, timing in strategies.items():
+            print(f"{page:>5} {name:>11} {timing['p50_ms']:>9.2f} {timing['p95_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
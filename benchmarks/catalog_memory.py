@@ -0,0 +1,47 @@
+"""Compare retained memory of dict rows and compact ``Restaurant`` records.
+
+Run from the repository root::
+
+    python -m benchmarks.catalog_memory --sizes 10000 100000 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import tracemalloc
+
+from benchmarks.synthetic import synthetic_restaurants
+from records import Restaurant
+
+
+def _retained_bytes(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    rows = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    gc.collect()
+    return current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'venues':>10} {'dict MiB':>10} {'record MiB':>11} {'ratio':>6}")
+    for size in args.sizes:
+        as_dicts = _retained_bytes(lambda: list(synthetic_restaurants(size)))
+        as_records = _retained_bytes(
+            lambda: [Restaurant.from_dict(row) for row in synthetic_restaurants(size)]
+        )
+        print(
+            f"{size:>10} {as_dicts / 2**20:>10.1f} {as_records / 2**20:>11.1f} "
+            f"{as_dicts / as_records:>6.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
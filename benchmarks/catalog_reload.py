@@ -0,0 +1,135 @@
+"""Request latency before, during and after a hot catalog reload.
+
+Writes ``--venues`` synthetic rows as JSON, starts ``uvicorn main:mcp_app``
+with ``CATALOG_PATH`` pointing at them, and sends ``Restaurant-recomm`` and
+``Restaurant-booking`` calls at a fixed arrival rate. After ``--warmup``
+seconds it calls ``POST /admin/catalog/reload``, which converts the JSON
+to a snapshot in a child process and swaps it in. Latency percentiles are
+reported separately for requests that finished before, during and after
+the reload. Run from the repository root::
+
+    python -m benchmarks.catalog_reload --venues 200000 --rate 100 --warmup 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.load_mcp import (
+    MCP_HEADERS,
+    Recorder,
+    _drive,
+    _git_commit,
+    _mcp_request,
+    _rpc,
+    _rpc_result,
+    start_server,
+    stop_server,
+)
+from benchmarks.synthetic import synthetic_restaurants
+
+
+class PhaseRecorder(Recorder):
+    """Files each sample under the reload phase it finished in."""
+
+    phase = "before"
+
+    def record(self, operation: str, seconds: float, ok: bool) -> None:
+        super().record(f"{operation} {self.phase}", seconds, ok)
+
+
+def _booking_sender(venues: int):
+    async def send(client: httpx.AsyncClient, operation: str) -> bool:
+        if operation == "recomm":
+            return await _mcp_request(client, "recomm")
+        payload = _rpc("tools/call", {
+            "name": "Restaurant-booking",
+            "arguments": {"restaurant_id": f"{random.randrange(venues):08d}"},
+        })
+        response = await client.post("/mcp", json=payload, headers=MCP_HEADERS)
+        message = _rpc_result(response) if response.status_code == 200 else None
+        return bool(message) and not message.get("result", {}).get("isError", True)
+
+    return send
+
+
+async def _run(url: str, token: str, args) -> dict:
+    recorder = PhaseRecorder()
+    reload_result = {}
+
+    async def trigger(client: httpx.AsyncClient) -> None:
+        await asyncio.sleep(args.warmup)
+        recorder.phase = "during"
+        start = time.perf_counter()
+        response = await client.post(
+            "/admin/catalog/reload", headers={"authorization": f"Bearer {token}"}, timeout=None
+        )
+        reload_result.update(status=response.status_code, seconds=time.perf_counter() - start)
+        recorder.phase = "after"
+
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        start = time.perf_counter()
+        await asyncio.gather(
+            _drive(
+                client, recorder,
+                lambda: random.choice(("recomm", "booking")),
+                _booking_sender(args.venues),
+                args.rate, args.duration, args.max_in_flight,
+            ),
+            trigger(client),
+        )
+        elapsed = time.perf_counter() - start
+    return {"reload": reload_result, "operations": recorder.summary(elapsed)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--venues", type=int, default=200_000)
+    parser.add_argument("--rate", type=float, default=100, help="requests per second")
+    parser.add_argument("--duration", type=float, default=30,
+                        help="seconds of load; must outlast the reload")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of load before reloading")
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="catalog-reload-")
+    path = os.path.join(directory, "catalog.json")
+    with open(path, "w") as f:
+        json.dump(list(synthetic_restaurants(args.venues)), f)
+    token = secrets.token_urlsafe(16)
+    process, url = start_server(env={
+        "CATALOG_PATH": path,
+        "CATALOG_SNAPSHOT_DIR": directory,
+        "ADMIN_TOKEN": token,
+    })
+    try:
+        results = asyncio.run(_run(url, token, args))
+    finally:
+        stop_server(process)
+
+    reload = results["reload"]
+    print(f"{args.venues} venues, reload status {reload.get('status')} in {reload.get('seconds', 0):.2f}s")
+    print(f"{'operation':>16} {'requests':>9} {'errors':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, stats in results["operations"].items():
+        print(
+            f"{name:>16} {stats['requests']:>9} {stats['errors']:>7} "
+            f"{stats['p50_ms'] or 0:>8.2f} {stats['p99_ms'] or 0:>8.2f} {stats['max_ms'] or 0:>8.2f}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"commit": _git_commit(), "venues": args.venues, **results}, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Startup time and per-worker memory: JSON catalog vs mapped snapshot.
+
+Writes ``--venues`` synthetic rows once as JSON and once with
+``snapshot.write_snapshot``, then for each loader starts ``--workers`` fresh
+interpreters side by side, as uvicorn would. Each one loads the catalog,
+answers ``--queries`` random id lookups and recommendation pages, and
+reports its load time, RSS and PSS (``/proc/self/smaps_rollup``) while all
+of them are still alive, so pages shared through the page cache are split
+between workers in PSS. Memory is reported above a bare interpreter that
+imported the same modules. Run from the repository root::
+
+    python -m benchmarks.catalog_snapshot --venues 1000000 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.synthetic import CITIES, CUISINES, synthetic_restaurants
+
+
+def _memory() -> Dict[str, int]:
+    """RSS and PSS of this process in bytes."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Pss"):
+                fields[name.lower()] = int(value.split()[0]) * 1024
+    return fields
+
+
+def _worker(loader: str, path: str, venues: int, queries: int, results, measure, release) -> None:
+    from catalog import RestaurantCatalog
+    from snapshot import open_snapshot
+
+    baseline = _memory()
+    start = time.perf_counter()
+    if loader == "json":
+        with open(path) as f:
+            catalog = RestaurantCatalog(json.load(f))
+    else:
+        catalog = open_snapshot(path)
+    loaded = time.perf_counter() - start
+
+    rng = random.Random(os.getpid())
+    start = time.perf_counter()
+    for _ in range(queries):
+        restaurant = catalog.get(f"{rng.randrange(venues):08d}")
+        restaurant.to_dict()
+        city, state = rng.choice(CITIES)
+        page = catalog.search(city, state, rng.choice(CUISINES), rng.choice(("rating", "price")))
+        page[:10]
+    served = time.perf_counter() - start
+
+    # PSS splits shared pages among the processes mapping them at the time it
+    # is read, so wait until every worker has loaded before reading it.
+    results.put(None)
+    measure.wait()
+    memory = _memory()
+    results.put({
+        "load_s": loaded,
+        "query_us": served / queries * 1e6 if queries else 0.0,
+        "rss": memory["rss"] - baseline["rss"],
+        "pss": memory["pss"] - baseline["pss"],
+    })
+    release.wait()
+
+
+def measure(loader: str, path: str, venues: int, workers: int, queries: int) -> dict:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    measure_memory = context.Event()
+    release = context.Event()
+    procs = [
+        context.Process(
+            target=_worker,
+            args=(loader, path, venues, queries, results, measure_memory, release),
+        )
+        for _ in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    for _ in procs:
+        results.get()
+    measure_memory.set()
+    samples: List[dict] = [results.get() for _ in procs]
+    release.set()
+    for proc in procs:
+        proc.join()
+    return {
+        "loader": loader,
+        "workers": workers,
+        "load_s": max(sample["load_s"] for sample in samples),
+        "query_us": sum(sample["query_us"] for sample in samples) / workers,
+        "rss_per_worker": sum(sample["rss"] for sample in samples) / workers,
+        "pss_per_worker": sum(sample["pss"] for sample in samples) / workers,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--venues", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--directory", help="where to write the catalog files (default: a temp dir)")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    from snapshot import write_snapshot
+
+    directory = args.directory or tempfile.mkdtemp(prefix="catalog-snapshot-")
+    json_path = os.path.join(directory, "catalog.json")
+    snapshot_path = os.path.join(directory, "catalog.snapshot")
+    with open(json_path, "w") as f:
+        json.dump(list(synthetic_restaurants(args.venues)), f)
+    start = time.perf_counter()
+    write_snapshot(snapshot_path, synthetic_restaurants(args.venues))
+    built = time.perf_counter() - start
+    print(
+        f"{args.venues} venues: json {os.path.getsize(json_path) / 2**20:.1f} MiB, "
+        f"snapshot {os.path.getsize(snapshot_path) / 2**20:.1f} MiB (built in {built:.1f}s)"
+    )
+
+    runs = []
+    print(f"{'loader':>9} {'load s':>8} {'query us':>9} {'RSS MiB':>9} {'PSS MiB':>9}  per worker, {args.workers} workers")
+    for loader, path in (("json", json_path), ("snapshot", snapshot_path)):
+        run = measure(loader, path, args.venues, args.workers, args.queries)
+        runs.append(run)
+        print(
+            f"{loader:>9} {run['load_s']:>8.3f} {run['query_us']:>9.1f} "
+            f"{run['rss_per_worker'] / 2**20:>9.1f} {run['pss_per_worker'] / 2**20:>9.1f}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"venues": args.venues, "snapshot_build_s": built, "runs": runs}, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
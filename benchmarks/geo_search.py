@@ -0,0 +1,127 @@
+"""Radius and nearest-neighbour search: ``geo.GeoIndex`` vs a full scan.
+
+Indexes the coordinates of ``--points`` synthetic venues (clustered around
+the cities in ``benchmarks.synthetic``) and times radius searches and
+k-nearest searches from random spots near those cities. A few queries of
+each kind are also answered by measuring the distance to every point, to
+check the index returns exactly the same venues and to show what it saves.
+With ``--snapshot`` the same queries also run through
+``SnapshotCatalog.nearby`` on a snapshot of the full rows, which includes
+decoding the matched venues. Run from the repository root::
+
+    python -m benchmarks.geo_search --points 1000000 --radii 2 10 --counts 10 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, List, Tuple
+
+from benchmarks.synthetic import CITY_CENTERS, synthetic_restaurants
+from geo import GeoIndex, haversine_miles
+from snapshot import open_snapshot, write_snapshot
+
+Point = Tuple[int, float, float]
+
+
+def _points(count: int) -> List[Point]:
+    return [(i, row["latitude"], row["longitude"]) for i, row in enumerate(synthetic_restaurants(count))]
+
+
+def _queries(count: int, seed: int = 1) -> List[Tuple[float, float]]:
+    rng = random.Random(seed)
+    centers = list(CITY_CENTERS.values())
+    return [
+        (latitude + rng.gauss(0, 0.1), longitude + rng.gauss(0, 0.1))
+        for latitude, longitude in (rng.choice(centers) for _ in range(count))
+    ]
+
+
+def brute_force(points: List[Point], latitude: float, longitude: float,
+                radius_miles: float | None, count: int | None) -> List[Tuple[float, int]]:
+    found = sorted(
+        (haversine_miles(latitude, longitude, point_lat, point_lon), payload)
+        for payload, point_lat, point_lon in points
+    )
+    if radius_miles is not None:
+        found = [match for match in found if match[0] <= radius_miles]
+    return found if count is None else found[:count]
+
+
+def _time(queries: List[Tuple[float, float]], search: Callable[[float, float], list]) -> dict:
+    timings, sizes = [], []
+    for latitude, longitude in queries:
+        start = time.perf_counter()
+        sizes.append(len(search(latitude, longitude)))
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[int(0.95 * (len(timings) - 1))] * 1000,
+        "results": statistics.mean(sizes),
+    }
+
+
+def _same(left: List[Tuple[float, int]], right: List[Tuple[float, int]]) -> bool:
+    return len(left) == len(right) and all(
+        a_id == b_id and abs(a - b) < 1e-9 for (a, a_id), (b, b_id) in zip(left, right)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--radii", type=float, nargs="+", default=[2, 10], help="radius searches, in miles")
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 50], help="k-nearest searches")
+    parser.add_argument("--queries", type=int, default=200, help="indexed queries per search")
+    parser.add_argument("--brute-queries", type=int, default=3, help="full-scan queries per search")
+    parser.add_argument("--snapshot", action="store_true", help="also query a catalog snapshot")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    points = _points(args.points)
+    print(f"generated {len(points)} points in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    index = GeoIndex.build(points)
+    print(f"built the index ({len(index.cells)} cells) in {time.perf_counter() - start:.1f}s")
+
+    catalog = None
+    if args.snapshot:
+        path = os.path.join(tempfile.mkdtemp(prefix="geo-search-"), "catalog.snapshot")
+        start = time.perf_counter()
+        write_snapshot(path, synthetic_restaurants(args.points))
+        catalog = open_snapshot(path)
+        print(f"wrote and opened the snapshot in {time.perf_counter() - start:.1f}s")
+
+    searches = [(f"radius {radius:g} mi", radius, None) for radius in args.radii]
+    searches += [(f"nearest {count}", None, count) for count in args.counts]
+    queries = _queries(args.queries)
+    print(f"{'search':>16} {'method':>9} {'p50 ms':>10} {'p95 ms':>10} {'results':>8}")
+    failed = False
+    for name, radius, count in searches:
+        rows = {"index": _time(queries, lambda lat, lon: index.search(lat, lon, radius, count))}
+        if catalog is not None:
+            rows["snapshot"] = _time(queries, lambda lat, lon: catalog.nearby(lat, lon, radius, count))
+        brute_queries = queries[:args.brute_queries]
+        if brute_queries:
+            rows["scan"] = _time(brute_queries, lambda lat, lon: brute_force(points, lat, lon, radius, count))
+            for latitude, longitude in brute_queries:
+                if not _same(index.search(latitude, longitude, radius, count),
+                             brute_force(points, latitude, longitude, radius, count)):
+                    failed = True
+                    print(f"{name}: index and scan disagree at ({latitude}, {longitude})")
+        for method, stats in rows.items():
+            print(f"{name:>16} {method:>9} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f} {stats['results']:>8.0f}")
+    if catalog is not None:
+        catalog.close()
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Per-call cost of tools/list, resources/list and resources/templates/list.
+
+Compares rebuilding the listing objects on every call with serving the
+precomputed responses. Run from the repository root::
+
+    python -m benchmarks.listings --iterations 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+
+async def _run(iterations: int) -> None:
+    import main
+    import mcp.types as types
+
+    cases = [
+        ("tools/list", types.ListToolsRequest(method="tools/list"), main._build_tools),
+        ("resources/list", types.ListResourcesRequest(method="resources/list"), main._build_resources),
+        (
+            "resources/templates/list",
+            types.ListResourceTemplatesRequest(method="resources/templates/list"),
+            main._build_resource_templates,
+        ),
+    ]
+
+    print(f"{'method':>26} {'rebuild us':>11} {'cached us':>10} {'speedup':>8}")
+    for name, request, build in cases:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            build()
+        rebuild_us = (time.perf_counter() - started) * 1e6 / iterations
+
+        await main._handle_list_request(request)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await main._handle_list_request(request)
+        cached_us = (time.perf_counter() - started) * 1e6 / iterations
+
+        print(f"{name:>26} {rebuild_us:>11.1f} {cached_us:>10.2f} {rebuild_us / cached_us:>7.0f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    # Listings never touch widget HTML, so skip fetching it.
+    os.environ.setdefault("WIDGET_ASSET_MODE", "lazy")
+    asyncio.run(_run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
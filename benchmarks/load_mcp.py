@@ -0,0 +1,359 @@
+"""Open-loop load test of the deployed MCP streamable HTTP app.
+
+Starts ``uvicorn main:mcp_app`` on a free local port (or targets ``--url``)
+and sends a weighted mix of JSON-RPC requests to ``/mcp`` at a fixed
+arrival rate. Optionally it also sends REST auth traffic
+(``/register/authn``, ``/verify-code``, ``/oauth2/token``) at its own rate.
+Requests start on schedule whether or not earlier ones have finished.
+Arrivals that would exceed ``--max-in-flight`` are counted as ``shed``
+instead of silently lowering the offered load.
+
+Prints a summary and writes per-operation throughput, p50/p95/p99 latency
+and error rates as JSON (``--output``), tagged with the git commit so runs
+can be compared across commits. Run from the repository root::
+
+    python -m benchmarks.load_mcp --rate 500 --duration 20 --auth-rate 50 \\
+        --output load-results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+DEFAULT_MIX = "initialize=1,tools/list=2,recomm=4,booking=2,resources/read=1"
+MCP_HEADERS = {
+    "content-type": "application/json",
+    "accept": "application/json, text/event-stream",
+}
+_ids = itertools.count(1)
+
+
+def _rpc(method: str, params: dict) -> dict:
+    return {"jsonrpc": "2.0", "id": next(_ids), "method": method, "params": params}
+
+
+MCP_OPERATIONS: Dict[str, Callable[[], dict]] = {
+    "initialize": lambda: _rpc("initialize", {
+        "protocolVersion": "2025-06-18",
+        "capabilities": {},
+        "clientInfo": {"name": "load-mcp", "version": "1"},
+    }),
+    "tools/list": lambda: _rpc("tools/list", {}),
+    "recomm": lambda: _rpc("tools/call", {
+        "name": "Restaurant-recomm",
+        "arguments": random.choice([
+            {"city": "Phoenix", "state": "AZ", "cuisine": "Japanese"},
+            {"city": "San Francisco", "state": "CA", "cuisine": "Seafood"},
+            {"city": "New York", "state": "NY", "cuisine": "Italian"},
+        ]),
+    }),
+    "booking": lambda: _rpc("tools/call", {
+        "name": "Restaurant-booking",
+        "arguments": {"restaurant_id": random.choice(["12121212", "33333333", "77777777"])},
+    }),
+    "resources/read": lambda: _rpc("resources/read", {"uri": "ui://widget/Restaurant-booking.html"}),
+}
+
+# REST auth traffic: (method, path, body builder, statuses that count as success)
+AUTH_OPERATIONS: Dict[str, Tuple[str, str, Callable[[], dict], frozenset]] = {
+    "POST /register/authn": (
+        "POST", "/register/authn",
+        lambda: {"email": f"load{random.randrange(10**6)}@example.com"},
+        frozenset({200}),
+    ),
+    "POST /verify-code": (
+        "POST", "/verify-code",
+        lambda: {
+            "email": "load@example.com", "code": "000000",
+            "redirect_uri": "https://example.com/cb", "state": "s",
+        },
+        frozenset({400}),  # wrong code: exercises the lookup path
+    ),
+    "POST /oauth2/token": ("POST", "/oauth2/token", lambda: {}, frozenset({200})),
+}
+
+
+def _parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in MCP_OPERATIONS:
+            raise SystemExit(f"Unknown operation {name!r}, expected one of {sorted(MCP_OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _rpc_result(response: httpx.Response) -> Optional[dict]:
+    """The JSON-RPC message from a JSON or single-event SSE response."""
+    if response.headers.get("content-type", "").startswith("text/event-stream"):
+        for line in response.text.splitlines():
+            if line.startswith("data:"):
+                return json.loads(line[5:])
+        return None
+    return response.json()
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.shed: Dict[str, int] = defaultdict(int)
+
+    def record(self, operation: str, seconds: float, ok: bool) -> None:
+        self.latencies[operation].append(seconds)
+        if not ok:
+            self.errors[operation] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, dict]:
+        operations = {}
+        for operation in sorted(set(self.latencies) | set(self.shed)):
+            latencies = sorted(self.latencies.get(operation, ()))
+            count = len(latencies)
+
+            def percentile(fraction: float) -> Optional[float]:
+                if not latencies:
+                    return None
+                return round(latencies[min(count - 1, int(fraction * count))] * 1000, 3)
+
+            operations[operation] = {
+                "requests": count,
+                "throughput_rps": round(count / elapsed, 2),
+                "errors": self.errors.get(operation, 0),
+                "error_rate": round(self.errors.get(operation, 0) / count, 4) if count else None,
+                "shed": self.shed.get(operation, 0),
+                "p50_ms": percentile(0.50),
+                "p95_ms": percentile(0.95),
+                "p99_ms": percentile(0.99),
+                "max_ms": round(latencies[-1] * 1000, 3) if latencies else None,
+            }
+        return operations
+
+
+async def _mcp_request(client: httpx.AsyncClient, operation: str) -> bool:
+    response = await client.post("/mcp", json=MCP_OPERATIONS[operation](), headers=MCP_HEADERS)
+    if response.status_code != 200:
+        return False
+    message = _rpc_result(response)
+    if not message or "error" in message:
+        return False
+    return not message.get("result", {}).get("isError", False)
+
+
+async def _auth_request(client: httpx.AsyncClient, operation: str) -> bool:
+    method, path, body, ok_statuses = AUTH_OPERATIONS[operation]
+    if path == "/oauth2/token":
+        response = await client.request(method, path, data={"grant_type": "authorization_code"})
+    else:
+        response = await client.request(method, path, json=body())
+    return response.status_code in ok_statuses
+
+
+async def _drive(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    choose: Callable[[], str],
+    send: Callable[[httpx.AsyncClient, str], "asyncio.Future[bool]"],
+    rate: float,
+    duration: float,
+    max_in_flight: int,
+) -> None:
+    in_flight: set = set()
+
+    async def one(operation: str) -> None:
+        start = time.perf_counter()
+        try:
+            ok = await send(client, operation)
+        except httpx.HTTPError:
+            ok = False
+        recorder.record(operation, time.perf_counter() - start, ok)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for n in itertools.count():
+        due = start + n / rate
+        if due - start >= duration:
+            break
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        operation = choose()
+        if len(in_flight) >= max_in_flight:
+            recorder.shed[operation] += 1
+            continue
+        task = asyncio.create_task(one(operation))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int = 1, env: Optional[dict] = None) -> Tuple[subprocess.Popen, str]:
+    """Run ``uvicorn main:mcp_app`` on a free port and wait until it answers."""
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:mcp_app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ],
+        env={**os.environ, "LOG_LEVEL": "WARNING", **(env or {})},
+        stdout=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become ready within 60s")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_load(
+    url: str,
+    rate: float,
+    duration: float,
+    mix: Dict[str, float],
+    auth_rate: float = 0.0,
+    max_in_flight: int = 32,
+) -> dict:
+    recorder = Recorder()
+    names, weights = list(mix), list(mix.values())
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        drivers = [
+            _drive(client, recorder, lambda: random.choices(names, weights)[0],
+                   _mcp_request, rate, duration, max_in_flight)
+        ]
+        if auth_rate > 0:
+            auth_names = list(AUTH_OPERATIONS)
+            drivers.append(
+                _drive(client, recorder, lambda: random.choice(auth_names),
+                       _auth_request, auth_rate, duration, max_in_flight)
+            )
+        start = time.perf_counter()
+        await asyncio.gather(*drivers)
+        elapsed = time.perf_counter() - start
+
+    operations = recorder.summary(elapsed)
+    total = sum(op["requests"] for op in operations.values())
+    errors = sum(op["errors"] for op in operations.values())
+    all_latencies = sorted(itertools.chain.from_iterable(recorder.latencies.values()))
+
+    def overall_percentile(fraction: float) -> Optional[float]:
+        if not all_latencies:
+            return None
+        return round(all_latencies[min(len(all_latencies) - 1, int(fraction * len(all_latencies)))] * 1000, 3)
+
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "overall": {
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2),
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else None,
+            "shed": sum(op["shed"] for op in operations.values()),
+            "p50_ms": overall_percentile(0.50),
+            "p95_ms": overall_percentile(0.95),
+            "p99_ms": overall_percentile(0.99),
+        },
+        "operations": operations,
+    }
+
+
+def _print_summary(results: dict) -> None:
+    print(f"{'operation':<22}{'req':>8}{'rps':>10}{'err%':>8}{'shed':>7}{'p50':>9}{'p95':>9}{'p99':>9}")
+    rows = list(results["operations"].items()) + [("overall", results["overall"])]
+    for name, op in rows:
+        error_rate = op["error_rate"] * 100 if op["error_rate"] is not None else 0.0
+        print(
+            f"{name:<22}{op['requests']:>8}{op['throughput_rps']:>10.1f}{error_rate:>7.2f}%"
+            f"{op['shed']:>7}{op['p50_ms'] or 0:>8.2f}m{op['p95_ms'] or 0:>8.2f}m{op['p99_ms'] or 0:>8.2f}m"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local server")
+    parser.add_argument("--rate", type=float, default=200, help="MCP requests per second")
+    parser.add_argument("--auth-rate", type=float, default=0, help="REST auth requests per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_server(args.workers)
+    try:
+        results = asyncio.run(run_load(
+            url, args.rate, args.duration, _parse_mix(args.mix), args.auth_rate, args.max_in_flight
+        ))
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {
+            "url": args.url, "workers": args.workers, "rate": args.rate,
+            "auth_rate": args.auth_rate, "duration": args.duration, "mix": args.mix,
+            "max_in_flight": args.max_in_flight,
+        },
+        **results,
+    }
+    _print_summary(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
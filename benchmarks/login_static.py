@@ -0,0 +1,81 @@
+"""Bytes on the wire and requests per second for the /login bundle.
+
+Replays a first visit followed by repeat visits against the old
+``StaticFiles`` mount and ``staticassets.PrecompressedStaticFiles``, in
+process over ``httpx.ASGITransport``. Repeat visits send the ETags from the
+first one, as a browser would. Run from the repository root::
+
+    python -m benchmarks.login_static --visits 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from starlette.staticfiles import StaticFiles
+
+from staticassets import PrecompressedStaticFiles
+
+DIST_DIR = "./client/dist"
+PATHS = ("/", "/Restaurant-login.js", "/Restaurant-login.css")
+BROWSER_HEADERS = {"accept-encoding": "gzip, deflate, br"}
+
+
+async def _visit(client: httpx.AsyncClient, etags: dict) -> int:
+    """One page load; returns the body bytes transferred."""
+    transferred = 0
+    for path in PATHS:
+        headers = dict(BROWSER_HEADERS)
+        if path in etags:
+            headers["if-none-match"] = etags[path]
+        request = client.build_request("GET", path, headers=headers)
+        response = await client.send(request, stream=True)
+        # Raw bytes, so compressed bodies are counted as sent and not decoded.
+        async for chunk in response.aiter_raw():
+            transferred += len(chunk)
+        await response.aclose()
+        if "etag" in response.headers:
+            etags[path] = response.headers["etag"]
+    return transferred
+
+
+async def _measure(name: str, app, visits: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://login") as client:
+        first = await _visit(client, {})
+        etags: dict = {}
+        await _visit(client, etags)
+        start = time.perf_counter()
+        repeat = 0
+        for _ in range(visits):
+            repeat += await _visit(client, dict(etags))
+        elapsed = time.perf_counter() - start
+        cold = 0
+        start_cold = time.perf_counter()
+        for _ in range(visits):
+            cold += await _visit(client, {})
+        elapsed_cold = time.perf_counter() - start_cold
+    requests = visits * len(PATHS)
+    print(
+        f"{name:<14} first visit {first / 1024:8.1f} KiB | "
+        f"cold {requests / elapsed_cold:7.0f} req/s | "
+        f"repeat {repeat / visits / 1024:6.2f} KiB/visit, {requests / elapsed:7.0f} req/s"
+    )
+
+
+async def _run(visits: int) -> None:
+    await _measure("StaticFiles", StaticFiles(directory=DIST_DIR, html=True), visits)
+    await _measure("precompressed", PrecompressedStaticFiles(DIST_DIR), visits)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--visits", type=int, default=500)
+    asyncio.run(_run(parser.parse_args().visits))
+
+
+if __name__ == "__main__":
+    main()
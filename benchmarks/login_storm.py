@@ -0,0 +1,108 @@
+"""Tool-call latency while a storm of WebAuthn logins is being verified.
+
+Concurrent clients verify signed assertions through ``offload.OffloadPool``
+while a probe keeps calling ``Restaurant-recomm`` on the same event loop.
+``inline`` is the old behaviour of verifying directly in the handler. Run
+from the repository root::
+
+    python -m benchmarks.login_storm --logins 3000 --concurrency 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from webauthn import verify_authentication_response
+from webauthn.helpers import parse_authentication_credential_json
+
+from benchmarks.webauthn_fixtures import ORIGIN, RP_ID, make_credential, sign_assertion
+from offload import OffloadPool, PoolOverloadedError
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def _run(kind: str, logins: int, concurrency: int) -> None:
+    import main
+    import mcp.types as types
+
+    credential_id, private_key, public_key = make_credential()
+    challenge = os.urandom(32)
+    parsed = parse_authentication_credential_json(
+        sign_assertion(credential_id, private_key, challenge, sign_count=1)
+    )
+    request = types.CallToolRequest(
+        method="tools/call",
+        params=types.CallToolRequestParams(
+            name="Restaurant-recomm",
+            arguments={"city": "Phoenix", "state": "AZ", "cuisine": "Japanese"},
+        ),
+    )
+    pool = OffloadPool(kind=kind, max_pending=concurrency)
+    remaining = logins
+    rejected = 0
+
+    async def client() -> None:
+        nonlocal remaining, rejected
+        while remaining > 0:
+            remaining -= 1
+            try:
+                await pool.run(
+                    verify_authentication_response,
+                    credential=parsed,
+                    expected_challenge=challenge,
+                    expected_origin=ORIGIN,
+                    expected_rp_id=RP_ID,
+                    credential_public_key=public_key,
+                    credential_current_sign_count=0,
+                )
+            except PoolOverloadedError:
+                rejected += 1
+
+    latencies = []
+    done = asyncio.Event()
+
+    async def probe() -> None:
+        while not done.is_set():
+            intended = time.perf_counter() + 0.001
+            await asyncio.sleep(0.001)
+            await main._call_tool_request(request)
+            latencies.append((time.perf_counter() - intended) * 1000)
+
+    # Warm up the pool so worker start-up is not counted.
+    await asyncio.gather(*(pool.run(sum, [1]) for _ in range(concurrency)))
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+    pool.shutdown()
+
+    print(
+        f"{kind:>8} {logins / elapsed:>9.0f} {statistics.median(latencies):>8.2f} "
+        f"{_percentile(latencies, 0.99):>8.2f} {max(latencies):>8.2f} {rejected:>9}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--kinds", nargs="+", default=["inline", "thread", "process"])
+    args = parser.parse_args()
+
+    os.environ.setdefault("WIDGET_ASSET_MODE", "lazy")
+    print(f"{'executor':>8} {'logins/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'rejected':>9}")
+    for kind in args.kinds:
+        asyncio.run(_run(kind, args.logins, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
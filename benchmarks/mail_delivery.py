@@ -0,0 +1,94 @@
+"""One-time-code email throughput against a local aiosmtpd server.
+
+Compares the old one-connection-per-message delivery with ``MailDelivery``
+draining a queue over pooled connections. The stand-in server can add a
+per-connection delay to mimic the TCP/TLS/login cost of a real relay. Run
+from the repository root (needs ``pip install aiosmtpd``)::
+
+    python -m benchmarks.mail_delivery --messages 500 --workers 4 --connect-delay 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import aiosmtplib
+from aiosmtpd.controller import Controller
+
+from mailer import MailDelivery, SMTPSettings, build_message
+
+
+class _CountingHandler:
+    def __init__(self, connect_delay: float):
+        self.connect_delay = connect_delay
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        # EHLO is sent once per connection, so this is a per-connection cost.
+        await asyncio.sleep(self.connect_delay)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+async def _per_message(settings: SMTPSettings, messages, concurrency: int) -> None:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def send(message) -> None:
+        async with slots:
+            await aiosmtplib.send(message, hostname=settings.hostname, port=settings.port)
+
+    await asyncio.gather(*(send(message) for message in messages))
+
+
+async def _pooled(settings: SMTPSettings, messages, workers: int) -> dict:
+    delivery = MailDelivery(settings, workers=workers, max_queue=len(messages))
+    for message in messages:
+        await delivery.enqueue(message)
+    await delivery.stop(drain_timeout=600)
+    return delivery.stats()
+
+
+async def _run(args) -> None:
+    handler = _CountingHandler(args.connect_delay)
+    controller = Controller(handler, hostname="127.0.0.1", port=args.port)
+    controller.start()
+    try:
+        settings = SMTPSettings(hostname="127.0.0.1", port=args.port, sender="bench@example.com")
+        messages = [
+            build_message(settings, f"user{i}@example.com", "Your code", f"<b>{100000 + i}</b>")
+            for i in range(args.messages)
+        ]
+
+        start = time.perf_counter()
+        await _per_message(settings, messages, args.workers)
+        per_message = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stats = await _pooled(settings, messages, args.workers)
+        pooled = time.perf_counter() - start
+    finally:
+        controller.stop()
+
+    print(f"messages: {args.messages}, workers: {args.workers}, connect delay: {args.connect_delay}s")
+    print(f"connection per message: {args.messages / per_message:8.1f} msg/s")
+    print(f"pooled queue:           {args.messages / pooled:8.1f} msg/s  {stats}")
+    print(f"delivered to stand-in:  {handler.received}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--connect-delay", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8025)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
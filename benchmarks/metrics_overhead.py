@@ -0,0 +1,89 @@
+"""Cost of recording metrics on the MCP and REST hot paths.
+
+Times ``Restaurant-recomm`` tool calls through the bare handler and through
+``metrics.timed_mcp_handler``, ``/health`` through ``rest_api`` with and
+without ``HTTPMetricsMiddleware``, and the raw cost of one histogram
+observation and one ``/metrics`` render. Run from the repository root::
+
+    python -m benchmarks.metrics_overhead --calls 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from metrics import REGISTRY, HTTPMetricsMiddleware, Histogram, timed_mcp_handler
+
+
+async def _per_call(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await fn()
+    return (time.perf_counter() - start) / calls
+
+
+def _health_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    if instrumented:
+        app.add_middleware(HTTPMetricsMiddleware)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+async def _run(calls: int) -> None:
+    import main
+    import mcp.types as types
+
+    request = types.CallToolRequest(
+        method="tools/call",
+        params=types.CallToolRequestParams(
+            name="Restaurant-recomm",
+            arguments={"city": "Phoenix", "state": "AZ", "cuisine": "Japanese"},
+        ),
+    )
+    bare = main._call_tool_request
+    timed = timed_mcp_handler("tools/call", bare, main._tool_label)
+    await bare(request)  # warm the recommendation cache
+    bare_call = await _per_call(lambda: bare(request), calls)
+    timed_call = await _per_call(lambda: timed(request), calls)
+    print(f"tools/call       bare {bare_call * 1e6:7.2f} us  timed {timed_call * 1e6:7.2f} us  "
+          f"overhead {(timed_call - bare_call) * 1e6:6.2f} us")
+
+    http_calls = max(1, calls // 10)
+    results = {}
+    for instrumented in (False, True):
+        transport = httpx.ASGITransport(app=_health_app(instrumented))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results[instrumented] = await _per_call(lambda: client.get("/health"), http_calls)
+    print(f"GET /health      bare {results[False] * 1e6:7.2f} us  timed {results[True] * 1e6:7.2f} us  "
+          f"overhead {(results[True] - results[False]) * 1e6:6.2f} us")
+
+    histogram = Histogram("bench_seconds", "benchmark", ("method", "tool"))
+    start = time.perf_counter()
+    for i in range(calls):
+        histogram.observe(0.0004, "tools/call", "Restaurant-recomm")
+    observe = (time.perf_counter() - start) / calls
+    start = time.perf_counter()
+    body = REGISTRY.render()
+    render = time.perf_counter() - start
+    print(f"observe()        {observe * 1e9:7.0f} ns")
+    print(f"/metrics render  {render * 1e3:7.2f} ms for {len(body)} bytes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    asyncio.run(_run(parser.parse_args().calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Throughput of ``mcp_app`` at 1, 2, 4 and 8 uvicorn workers on shared stores.
+
+For each worker count this starts ``uvicorn main:mcp_app --workers N`` with
+``EPHEMERAL_STORE=sqlite`` and ``USER_STORE=sqlite`` on fresh files. It then:
+
+1. runs complete one-time-code logins (``/request-code`` -> ``/verify-code``
+   -> ``/auth/redirect``), each step on a new connection so consecutive
+   steps usually land on different workers; the code is read from the
+   shared store file in place of the email
+2. saturates the server from several client processes with a closed loop
+   of ``Restaurant-recomm`` calls and auth requests that write challenges
+   to the shared store, and reports requests per second
+
+Results are printed and optionally written as JSON. Scaling is bounded by
+the number of cores, which the client processes share with the workers.
+Run from the repository root::
+
+    python -m benchmarks.multi_worker --workers 1 2 4 8 --duration 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.load_mcp import _auth_request, _git_commit, _mcp_request, start_server, stop_server
+
+CLOSE = {"connection": "close"}
+
+
+def _read_code(store_path: str, email: str) -> str:
+    with sqlite3.connect(store_path) as connection:
+        row = connection.execute(
+            "SELECT value FROM one_time_codes WHERE key = ?", (email,)
+        ).fetchone()
+    return row[0] if row else ""
+
+
+def login_flows(url: str, store_path: str, count: int) -> int:
+    """Run ``count`` cross-connection logins; returns how many succeeded."""
+    succeeded = 0
+    for i in range(count):
+        email = f"flow{i}-{random.randrange(10**9)}@example.com"
+        httpx.post(f"{url}/request-code", json={"email": email}, headers=CLOSE).raise_for_status()
+        verified = httpx.post(
+            f"{url}/verify-code",
+            json={
+                "email": email,
+                "code": _read_code(store_path, email),
+                "redirect_uri": "https://example.com/cb",
+                "state": "s",
+            },
+            headers=CLOSE,
+        )
+        if verified.status_code != 200:
+            continue
+        redirect = httpx.post(
+            f"{url}/auth/redirect", json={"token": verified.json()["token"]}, headers=CLOSE
+        )
+        succeeded += redirect.status_code == 200
+    return succeeded
+
+
+async def _closed_loop(url: str, concurrency: int, duration: float) -> Dict[str, int]:
+    counts = {"requests": 0, "errors": 0}
+    deadline = time.perf_counter() + duration
+
+    async def client_task() -> None:
+        async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+            while time.perf_counter() < deadline:
+                try:
+                    if random.random() < 0.8:
+                        ok = await _mcp_request(client, "recomm")
+                    else:
+                        ok = await _auth_request(
+                            client, random.choice(["POST /register/authn", "POST /verify-code"])
+                        )
+                except httpx.HTTPError:
+                    ok = False
+                counts["requests"] += 1
+                counts["errors"] += not ok
+
+    await asyncio.gather(*(client_task() for _ in range(concurrency)))
+    return counts
+
+
+def _client_process(url: str, concurrency: int, duration: float, results) -> None:
+    results.put(asyncio.run(_closed_loop(url, concurrency, duration)))
+
+
+def measure(workers: int, clients: int, concurrency: int, duration: float, flows: int) -> dict:
+    directory = tempfile.mkdtemp(prefix="multi-worker-")
+    store_path = os.path.join(directory, "ephemeral.db")
+    env = {
+        "EPHEMERAL_STORE": "sqlite",
+        "EPHEMERAL_STORE_PATH": store_path,
+        "USER_STORE": "sqlite",
+        "USER_STORE_PATH": os.path.join(directory, "users.db"),
+        "MAIL_SERVER": "127.0.0.1",
+        "MAIL_PORT": "9",  # nothing listens; queued mail fails in the background
+        "LOG_LEVEL": "ERROR",
+    }
+    process, url = start_server(workers, env)
+    try:
+        # Wait until every worker answers, not just the first one up.
+        for _ in range(workers * 4):
+            httpx.get(f"{url}/health", headers=CLOSE)
+        flows_ok = login_flows(url, store_path, flows)
+
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=_client_process, args=(url, concurrency, duration, results))
+            for _ in range(clients)
+        ]
+        start = time.perf_counter()
+        for proc in procs:
+            proc.start()
+        totals = {"requests": 0, "errors": 0}
+        for _ in procs:
+            for key, value in results.get().items():
+                totals[key] += value
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        stop_server(process)
+    return {
+        "workers": workers,
+        "login_flows": flows,
+        "login_flows_ok": flows_ok,
+        "requests": totals["requests"],
+        "errors": totals["errors"],
+        "throughput_rps": round(totals["requests"] / elapsed, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 1,
+                        help="client processes generating load")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight per client")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--flows", type=int, default=20, help="cross-worker logins to verify")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    runs: List[dict] = []
+    for workers in args.workers:
+        run = measure(workers, args.clients, args.concurrency, args.duration, args.flows)
+        runs.append(run)
+        baseline = runs[0]["throughput_rps"] or 1
+        print(
+            f"workers={workers:<2} {run['throughput_rps']:>8.1f} req/s "
+            f"(x{run['throughput_rps'] / baseline:4.2f})  errors={run['errors']:<5} "
+            f"logins ok {run['login_flows_ok']}/{run['login_flows']}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"commit": _git_commit(), "cpus": os.cpu_count(), "runs": runs}, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""CPU time per login with and without the decoded public key cache.
+
+Verifies the same signed assertion repeatedly, first decoding the stored COSE
+key on every call (``verify_authentication_response``) and then through
+``keycache.verify_authentication_cached``. Run from the repository root::
+
+    python -m benchmarks.public_key_cache --logins 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+from webauthn import verify_authentication_response
+from webauthn.helpers import parse_authentication_credential_json
+
+from benchmarks.webauthn_fixtures import ORIGIN, RP_ID, make_credential, sign_assertion
+from keycache import PUBLIC_KEY_CACHE, verify_authentication_cached
+
+
+def _cpu_per_login(verify, logins: int, **kwargs) -> float:
+    start = time.process_time()
+    for _ in range(logins):
+        verify(**kwargs)
+    return (time.process_time() - start) / logins
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=5000)
+    args = parser.parse_args()
+
+    credential_id, private_key, public_key = make_credential()
+    challenge = os.urandom(32)
+    parsed = parse_authentication_credential_json(
+        sign_assertion(credential_id, private_key, challenge, sign_count=1)
+    )
+    kwargs = dict(
+        credential=parsed,
+        expected_challenge=challenge,
+        expected_origin=ORIGIN,
+        expected_rp_id=RP_ID,
+        credential_public_key=public_key,
+        credential_current_sign_count=0,
+        require_user_verification=False,
+    )
+
+    uncached = _cpu_per_login(verify_authentication_response, args.logins, **kwargs)
+    PUBLIC_KEY_CACHE.clear()
+    cached = _cpu_per_login(verify_authentication_cached, args.logins, **kwargs)
+
+    print(f"logins:            {args.logins}")
+    print(f"uncached CPU/login: {uncached * 1e6:8.1f} us")
+    print(f"cached CPU/login:   {cached * 1e6:8.1f} us")
+    print(f"saved per login:    {(uncached - cached) * 1e6:8.1f} us ({1 - cached / uncached:.1%})")
+    print(f"cache stats:        {PUBLIC_KEY_CACHE.stats()}")
+
+
+if __name__ == "__main__":
+    main()
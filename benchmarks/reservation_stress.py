@@ -0,0 +1,186 @@
+"""Hammer one reservation slot and check it is booked to exactly its capacity.
+
+Three rounds, each aiming far more claims at a single hot slot than it has
+seats for, with every claim for ``--party-size`` guests:
+
+1. threads against ``MemoryReservationBook``
+2. processes against one ``SQLiteReservationBook`` file
+3. concurrent ``book_reservation`` MCP calls to ``uvicorn main:mcp_app``
+   with ``--workers`` workers sharing ``RESERVATION_STORE=sqlite``, on a
+   one-venue catalog whose slot is a month from today (past dates are
+   refused)
+
+A round passes when the seats booked equal the slot's capacity, so nothing
+was double-booked and nothing was left unsold. The memory round also
+fails when the book's claimed and rejected counters do not add up to the
+claims made.
+Run from the repository root::
+
+    python -m benchmarks.reservation_stress --seats 50 --attempts 2000 --workers 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from typing import Callable, List
+
+import httpx
+
+from benchmarks.load_mcp import MCP_HEADERS, _rpc, _rpc_result, start_server, stop_server
+from benchmarks.synthetic import synthetic_restaurants
+from reservations import MemoryReservationBook, ReservationBook, SlotFullError, SQLiteReservationBook
+
+RESTAURANT_ID = "00000000"  # the only venue in the server round's catalog
+DAY = date.today() + timedelta(days=30)
+MINUTE = 19 * 60
+
+
+def _hammer(book: ReservationBook, attempts: int, party_size: int) -> int:
+    booked = 0
+    for _ in range(attempts):
+        try:
+            book.claim(RESTAURANT_ID, DAY, MINUTE, party_size)
+            booked += party_size
+        except SlotFullError:
+            pass
+    return booked
+
+
+def _run_threads(target: Callable[[], int], count: int) -> int:
+    totals: List[int] = []
+    threads = [threading.Thread(target=lambda: totals.append(target())) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(totals)
+
+
+def _sqlite_process(path: str, seats: int, attempts: int, party_size: int, results) -> None:
+    results.put(_hammer(SQLiteReservationBook(path, seats), attempts, party_size))
+
+
+def memory_round(seats: int, attempts: int, party_size: int, threads: int) -> int:
+    book = MemoryReservationBook(seats)
+    booked = _run_threads(lambda: _hammer(book, attempts // threads, party_size), threads)
+    claims = attempts // threads * threads
+    if book.claimed + book.rejected != claims or book.claimed * party_size != booked:
+        print(f"memory book counters {book.stats()} do not match {claims} claims")
+        return -1
+    return booked
+
+
+def sqlite_round(seats: int, attempts: int, party_size: int, processes: int) -> int:
+    path = os.path.join(tempfile.mkdtemp(prefix="reservations-"), "reservations.db")
+    SQLiteReservationBook(path, seats)  # create the tables before the race
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(
+            target=_sqlite_process, args=(path, seats, attempts // processes, party_size, results)
+        )
+        for _ in range(processes)
+    ]
+    for proc in procs:
+        proc.start()
+    booked = sum(results.get() for _ in procs)
+    for proc in procs:
+        proc.join()
+    return booked
+
+
+async def _server_claims(url: str, attempts: int, party_size: int, concurrency: int) -> int:
+    booked = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(client: httpx.AsyncClient) -> None:
+        nonlocal booked
+        payload = _rpc("tools/call", {
+            "name": "book_reservation",
+            "arguments": {
+                "restaurant_id": RESTAURANT_ID,
+                "date": DAY.strftime("%m-%d-%Y"),
+                "time": "19:00",
+                "party_size": party_size,
+            },
+        })
+        async with semaphore:
+            response = await client.post("/mcp", json=payload, headers=MCP_HEADERS)
+        result = (_rpc_result(response) or {}).get("result", {})
+        if not result.get("isError", True):
+            booked += result["structuredContent"]["reservation"]["party_size"]
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        await asyncio.gather(*(one(client) for _ in range(attempts)))
+    return booked
+
+
+def server_round(seats: int, attempts: int, party_size: int, workers: int, concurrency: int) -> int:
+    directory = tempfile.mkdtemp(prefix="reservations-")
+    catalog = os.path.join(directory, "catalog.json")
+    row = next(synthetic_restaurants(1))
+    row["availability"] = {DAY.strftime("%m-%d-%Y"): ["19:00:00"]}
+    with open(catalog, "w") as f:
+        json.dump([row], f)
+    process, url = start_server(workers, {
+        "CATALOG_PATH": catalog,
+        "RESERVATION_STORE": "sqlite",
+        "RESERVATION_STORE_PATH": os.path.join(directory, "reservations.db"),
+        "RESERVATION_SLOT_SEATS": str(seats),
+        "EPHEMERAL_STORE": "sqlite",
+        "EPHEMERAL_STORE_PATH": os.path.join(directory, "ephemeral.db"),
+        "USER_STORE": "sqlite",
+        "USER_STORE_PATH": os.path.join(directory, "users.db"),
+    })
+    try:
+        return asyncio.run(_server_claims(url, attempts, party_size, concurrency))
+    finally:
+        stop_server(process)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seats", type=int, default=50, help="capacity of the hot slot")
+    parser.add_argument("--attempts", type=int, default=2000, help="claims aimed at the slot per round")
+    parser.add_argument("--party-size", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2, help="uvicorn workers for the server round")
+    parser.add_argument("--concurrency", type=int, default=64, help="MCP calls in flight")
+    parser.add_argument("--skip-server", action="store_true")
+    args = parser.parse_args()
+
+    capacity = args.seats - args.seats % args.party_size
+    rounds = [
+        ("memory, threads", lambda: memory_round(args.seats, args.attempts, args.party_size, args.threads)),
+        ("sqlite, processes", lambda: sqlite_round(args.seats, args.attempts, args.party_size, args.processes)),
+    ]
+    if not args.skip_server:
+        rounds.append((
+            f"mcp, {args.workers} workers",
+            lambda: server_round(args.seats, args.attempts, args.party_size, args.workers, args.concurrency),
+        ))
+
+    failed = False
+    for name, run in rounds:
+        start = time.perf_counter()
+        booked = run()
+        ok = booked == capacity
+        failed |= not ok
+        print(
+            f"{name:>20}: booked {booked}/{capacity} seats with {args.attempts} claims "
+            f"in {time.perf_counter() - start:.2f}s  {'ok' if ok else 'FAILED'}"
+        )
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
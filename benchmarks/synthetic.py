@@ -0,0 +1,65 @@
+"""Synthetic catalog rows shaped like ``main.RESTAURANTS`` for benchmarks."""
+
+from __future__ import annotations
+
+import random
+from typing import Dict, Iterator
+
+CITIES = [
+    ("Phoenix", "AZ"),
+    ("San Francisco", "CA"),
+    ("New York", "NY"),
+    ("Austin", "TX"),
+    ("Chicago", "IL"),
+    ("Seattle", "WA"),
+    ("Boston", "MA"),
+    ("Denver", "CO"),
+]
+CITY_CENTERS = {
+    "Phoenix": (33.4484, -112.0740),
+    "San Francisco": (37.7749, -122.4194),
+    "New York": (40.7128, -74.0060),
+    "Austin": (30.2672, -97.7431),
+    "Chicago": (41.8781, -87.6298),
+    "Seattle": (47.6062, -122.3321),
+    "Boston": (42.3601, -71.0589),
+    "Denver": (39.7392, -104.9903),
+}
+CITY_SPREAD_DEGREES = 0.15  # standard deviation, roughly 10 miles
+CUISINES = ["Italian", "Japanese", "Mexican", "Indian", "Seafood", "Barbecue", "American", "Korean"]
+AVAILABILITY = {
+    '11-15-2025': ["19:00:00", "19:30:00", "20:00:00", "21:30:00"],
+    '11-16-2025': ["19:30:00", "20:30:00", "21:00:00", "21:30:00"],
+    '11-17-2025': ["18:00:00", "18:30:00", "19:30:00", "21:00:00"],
+    '11-18-2025': ["19:00:00", "19:30:00", "20:30:00", "21:00:00"],
+    '11-19-2025': ["17:30:00", "18:30:00", "19:30:00", "20:30:00"],
+}
+
+
+def synthetic_restaurants(count: int, seed: int = 0) -> Iterator[Dict]:
+    """Yield ``count`` rows with unique ids, names and descriptions.
+
+    Venues are scattered around their city's centre; the coordinates use
+    their own generator so the other fields match catalogs made before
+    rows had locations."""
+    rng = random.Random(seed)
+    places = random.Random(seed + 1)
+    for i in range(count):
+        city, state = CITIES[i % len(CITIES)]
+        cuisine = CUISINES[rng.randrange(len(CUISINES))]
+        latitude, longitude = CITY_CENTERS[city]
+        yield {
+            "restaurant_id": f"{i:08d}",
+            "name": f"{cuisine} Kitchen #{i}",
+            "description": f"Neighbourhood {cuisine.lower()} spot number {i}.",
+            "cuisine": cuisine,
+            "$$": "$" * rng.randint(1, 4),
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "image": f"https://images.example.com/{i}.jpg",
+            "street": "1234 W. Fifth Street",
+            "city": city,
+            "state": state,
+            "latitude": round(latitude + places.gauss(0, CITY_SPREAD_DEGREES), 6),
+            "longitude": round(longitude + places.gauss(0, CITY_SPREAD_DEGREES), 6),
+            "availability": {day: list(times) for day, times in AVAILABILITY.items()},
+        }
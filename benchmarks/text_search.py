@@ -0,0 +1,102 @@
+"""Restaurant-search latency on a large catalog, plus incremental sync cost.
+
+Builds ``textsearch.TextIndex`` over ``--venues`` synthetic restaurants and
+times a page-sized search (``--limit`` + 1 hits, as the tool asks for) for
+each query kind: exact words, several words, word prefixes and misspelled
+words. For scale, the same queries are answered by a plain scan that
+checks every venue's text for each word. Finally ``--changed`` venues get
+new names and the index is synced to the edited catalog, which is timed
+against building a fresh index. Run from the repository root::
+
+    python -m benchmarks.text_search --venues 100000 --searches 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.synthetic import synthetic_restaurants
+from catalog import RestaurantCatalog
+from records import Restaurant
+from textsearch import TextIndex, tokenize
+
+QUERIES: Dict[str, List[str]] = {
+    "exact": ["kitchen", "korean", "seafood", "neighbourhood", "spot"],
+    "words": ["japanese kitchen", "korean spot", "barbecue kitchen neighbourhood", "indian spot number"],
+    "prefix": ["kit", "jap", "neighb", "barbe", "mexic"],
+    "typo": ["kitchn", "japanees", "neighborhood", "seafod", "barbeque"],
+}
+
+
+def scan(restaurants: List[Restaurant], query: str, count: int) -> List[Restaurant]:
+    """Venues whose text contains every query word, highest rated first."""
+    words = tokenize(query)
+    found = [
+        r for r in restaurants
+        if all(word in f"{r.name} {r.description} {r.cuisine}".lower() for word in words)
+    ]
+    found.sort(key=lambda r: -r.rating)
+    return found[:count]
+
+
+def _time(queries: List[str], runs: int, search: Callable[[str], list]) -> dict:
+    timings = []
+    for i in range(runs):
+        query = queries[i % len(queries)]
+        start = time.perf_counter()
+        search(query)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings) * 1000,
+        "p99_ms": timings[int(0.99 * (len(timings) - 1))] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--venues", type=int, default=100_000)
+    parser.add_argument("--searches", type=int, default=500, help="indexed searches per query kind")
+    parser.add_argument("--scans", type=int, default=5, help="scan searches per query kind")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--changed", type=int, default=1000, help="venues renamed before the sync")
+    args = parser.parse_args()
+
+    rows = list(synthetic_restaurants(args.venues))
+    catalog = RestaurantCatalog(rows)
+    start = time.perf_counter()
+    index = TextIndex.build(catalog)
+    print(f"indexed {len(index)} venues ({index.stats()['terms']} terms) in {time.perf_counter() - start:.2f}s")
+    for queries in QUERIES.values():
+        for query in queries:
+            index.search(query, args.limit + 1)  # sort each term's postings once, as a warm server has
+
+    restaurants = list(catalog)
+    print(f"{'queries':>8} {'method':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    for kind, queries in QUERIES.items():
+        rows_out = {
+            "index": _time(queries, args.searches, lambda q: index.search(q, args.limit + 1)),
+            "scan": _time(queries, args.scans, lambda q: scan(restaurants, q, args.limit + 1)),
+        }
+        for method, stats in rows_out.items():
+            print(f"{kind:>8} {method:>7} {stats['p50_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+
+    for i in random.Random(0).sample(range(len(rows)), min(args.changed, len(rows))):
+        rows[i] = dict(rows[i], name=f"Oyster Bar #{i}")
+    edited = RestaurantCatalog(rows)
+    start = time.perf_counter()
+    reindexed, removed = asyncio.run(index.sync(edited))
+    synced = time.perf_counter() - start
+    start = time.perf_counter()
+    TextIndex.build(edited)
+    rebuilt = time.perf_counter() - start
+    print(f"sync reindexed {reindexed} and removed {removed} venues in {synced:.2f}s; a full rebuild takes {rebuilt:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
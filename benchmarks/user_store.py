@@ -0,0 +1,78 @@
+"""Concurrent login throughput against the user store backends.
+
+Each simulated login does what ``/authenticate/verify`` does with the store:
+look the credential up by id and compare-and-set its sign count. A ticker
+task records the worst event-loop stall while the logins run. Run from the
+repository root::
+
+    python -m benchmarks.user_store --users 1000 --logins 20000 --concurrency 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from userstore import MemoryUserStore, SQLiteUserStore, UserStore
+
+
+async def _loop_lag(stop: asyncio.Event, worst: list) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst[0] = max(worst[0], time.perf_counter() - started - 0.001)
+
+
+async def _bench(store: UserStore, users: int, logins: int, concurrency: int) -> tuple:
+    for i in range(users):
+        await store.add_credential(f"user{i}@example.com", i.to_bytes(16, "big"), b"k" * 77, 0)
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(logins):
+        queue.put_nowait(i % users)
+    conflicts = 0
+
+    async def worker() -> None:
+        nonlocal conflicts
+        while not queue.empty():
+            credential_id = queue.get_nowait().to_bytes(16, "big")
+            credential = await store.get_credential(credential_id)
+            if not await store.update_sign_count(credential_id, credential.sign_count, credential.sign_count + 1):
+                conflicts += 1
+
+    stop, worst = asyncio.Event(), [0.0]
+    ticker = asyncio.create_task(_loop_lag(stop, worst))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    await store.close()
+    return logins / elapsed, worst[0] * 1000, conflicts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--logins", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "memory": MemoryUserStore(),
+            "sqlite": SQLiteUserStore(os.path.join(tmp, "users.db")),
+        }
+        print(f"{'backend':>8} {'logins/s':>10} {'max loop stall ms':>18} {'cas conflicts':>14}")
+        for name, store in backends.items():
+            rate, stall_ms, conflicts = asyncio.run(
+                _bench(store, args.users, args.logins, args.concurrency)
+            )
+            print(f"{name:>8} {rate:>10.0f} {stall_ms:>18.2f} {conflicts:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Self-signed WebAuthn assertions for exercising the verification path.
+
+Builds an ES256 credential and signs authentication responses for it the
+same way an authenticator would, so benchmarks can call
+``verify_authentication_response`` without a browser."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+from typing import Dict, Tuple
+
+import cbor2
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from webauthn.helpers import bytes_to_base64url
+
+RP_ID = "tgallant-mcp-server.ngrok.app"
+ORIGIN = f"https://{RP_ID}"
+
+
+def make_credential() -> Tuple[bytes, ec.EllipticCurvePrivateKey, bytes]:
+    """Return ``(credential_id, private_key, cose_public_key)``."""
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    numbers = private_key.public_key().public_numbers()
+    cose_key = cbor2.dumps({
+        1: 2,    # kty: EC2
+        3: -7,   # alg: ES256
+        -1: 1,   # crv: P-256
+        -2: numbers.x.to_bytes(32, "big"),
+        -3: numbers.y.to_bytes(32, "big"),
+    })
+    return os.urandom(16), private_key, cose_key
+
+
+def sign_assertion(
+    credential_id: bytes,
+    private_key: ec.EllipticCurvePrivateKey,
+    challenge: bytes,
+    sign_count: int,
+) -> Dict:
+    """An authentication response in the JSON shape the login page posts."""
+    client_data = json.dumps({
+        "type": "webauthn.get",
+        "challenge": bytes_to_base64url(challenge),
+        "origin": ORIGIN,
+        "crossOrigin": False,
+    }).encode()
+    authenticator_data = (
+        hashlib.sha256(RP_ID.encode()).digest()
+        + bytes([0x01])  # user present
+        + struct.pack(">I", sign_count)
+    )
+    signature = private_key.sign(
+        authenticator_data + hashlib.sha256(client_data).digest(),
+        ec.ECDSA(hashes.SHA256()),
+    )
+    return {
+        "id": bytes_to_base64url(credential_id),
+        "rawId": bytes_to_base64url(credential_id),
+        "type": "public-key",
+        "response": {
+            "clientDataJSON": bytes_to_base64url(client_data),
+            "authenticatorData": bytes_to_base64url(authenticator_data),
+            "signature": bytes_to_base64url(signature),
+        },
+    }
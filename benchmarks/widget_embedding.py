@@ -0,0 +1,76 @@
+"""Size and serialization cost of Restaurant-booking results with and without
+the inlined widget HTML.
+
+The login bundle in ``client/dist`` stands in for the booking widget, since
+both are full React builds of similar size. Run from the repository root::
+
+    python -m benchmarks.widget_embedding --iterations 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+
+def _stage_widget_bundle() -> str:
+    dist_dir = tempfile.mkdtemp(prefix="widget-dist-")
+    for ext in ("css", "js"):
+        shutil.copy(
+            os.path.join("client", "dist", f"Restaurant-login.{ext}"),
+            os.path.join(dist_dir, f"Restaurant-booking.{ext}"),
+        )
+    return dist_dir
+
+
+async def _run(iterations: int) -> None:
+    import main
+    import mcp.types as types
+
+    request = types.CallToolRequest(
+        method="tools/call",
+        params=types.CallToolRequestParams(
+            name="Restaurant-booking",
+            arguments={"restaurant_id": "12121212"},
+        ),
+    )
+
+    print(f"{'mode':>10} {'bytes':>10} {'call ms':>9} {'serialize ms':>13}")
+    for embed in (True, False):
+        main.EMBED_WIDGET_HTML = embed
+        await main._call_tool_request(request)
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            result = await main._call_tool_request(request)
+        call_ms = (time.perf_counter() - started) * 1000 / iterations
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            payload = result.model_dump_json(by_alias=True, exclude_none=True)
+        serialize_ms = (time.perf_counter() - started) * 1000 / iterations
+
+        mode = "embedded" if embed else "reference"
+        print(f"{mode:>10} {len(payload.encode()):>10} {call_ms:>9.3f} {serialize_ms:>13.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    dist_dir = _stage_widget_bundle()
+    os.environ["WIDGET_ASSET_MODE"] = "local"
+    os.environ["WIDGET_DIST_DIR"] = dist_dir
+    try:
+        asyncio.run(_run(args.iterations))
+    finally:
+        shutil.rmtree(dist_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Indexed, read-only view over the restaurant catalog.
+
+The MCP tools in ``main`` look restaurants up by id (``Restaurant-booking``)
+and by city, state and cuisine (``Restaurant-recomm``). ``RestaurantCatalog``
+builds both indexes once when the server starts so each lookup is a single
+dict access instead of a scan over every row. Rows are stored as compact
+``records.Restaurant`` objects rather than the source dicts, and every
+location bucket is presorted in each ``SORT_ORDERS`` order so a page of
+results is a slice rather than a sort. Venues with coordinates are also
+kept in a ``geo.GeoIndex`` for radius and nearest-neighbour searches."""
+
+from __future__ import annotations
+
+import itertools
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from geo import GeoIndex
+from records import Restaurant
+
+LocationKey = Tuple[str, str, str]
+Nearby = List[Tuple[float, Restaurant]]  # (distance in miles, venue), nearest first
+
+SORT_ORDERS: Dict[str, Callable[[Restaurant], Any]] = {
+    "rating": lambda r: (-r.rating, r.price_level, r.restaurant_id),
+    "price": lambda r: (r.price_level, -r.rating, r.restaurant_id),
+}
+DEFAULT_SORT = "rating"
+
+_catalog_versions = itertools.count(1)
+
+
+class DuplicateRestaurantError(ValueError):
+    """Raised when two catalog rows share the same ``restaurant_id``."""
+
+
+class UnknownSortError(ValueError):
+    """Raised when a search asks for an order not in ``SORT_ORDERS``."""
+
+
+def next_catalog_version() -> int:
+    """Process-unique version for a newly built catalog of any kind."""
+    return next(_catalog_versions)
+
+
+def normalize_cuisine(cuisine: str) -> str:
+    return cuisine.lower()
+
+
+def location_key(city: str, state: str, cuisine: str) -> LocationKey:
+    return (city, state, normalize_cuisine(cuisine))
+
+
+class RestaurantCatalog:
+    """Restaurant rows indexed by id and by (city, state, cuisine).
+
+    City and state are matched exactly and cuisine case-insensitively, the
+    same rules the recommendation tool has always applied. Every catalog
+    gets a process-unique ``version`` that result caches use to tell when
+    their entries were computed from different data."""
+
+    def __init__(self, restaurants: Iterable[dict | Restaurant]):
+        self.version = next_catalog_version()
+        self._by_id: Dict[str, Restaurant] = {}
+        by_location: Dict[LocationKey, List[Restaurant]] = {}
+        self._located: List[Restaurant] = []
+
+        for row in restaurants:
+            restaurant = row if isinstance(row, Restaurant) else Restaurant.from_dict(row)
+            restaurant_id = restaurant.restaurant_id
+            if restaurant_id in self._by_id:
+                raise DuplicateRestaurantError(
+                    f"Duplicate restaurant_id {restaurant_id!r}: "
+                    f"{self._by_id[restaurant_id].name!r} and {restaurant.name!r}"
+                )
+            self._by_id[restaurant_id] = restaurant
+            key = location_key(restaurant.city, restaurant.state, restaurant.cuisine)
+            by_location.setdefault(key, []).append(restaurant)
+            if restaurant.has_location:
+                self._located.append(restaurant)
+
+        self._geo = GeoIndex.build(
+            (i, r.latitude, r.longitude) for i, r in enumerate(self._located)
+        )
+        self._by_location: Dict[LocationKey, Dict[str, Tuple[Restaurant, ...]]] = {
+            key: {
+                order: tuple(sorted(bucket, key=sort_key))
+                for order, sort_key in SORT_ORDERS.items()
+            }
+            for key, bucket in by_location.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Restaurant]:
+        return iter(self._by_id.values())
+
+    def __contains__(self, restaurant_id: object) -> bool:
+        return restaurant_id in self._by_id
+
+    def get(self, restaurant_id: str) -> Restaurant | None:
+        return self._by_id.get(restaurant_id)
+
+    def get_many(self, restaurant_ids: Iterable[str]) -> Dict[str, Restaurant]:
+        """The rows for ``restaurant_ids`` that exist, keyed by id."""
+        by_id = self._by_id
+        return {rid: by_id[rid] for rid in restaurant_ids if rid in by_id}
+
+    def search(
+        self,
+        city: str,
+        state: str,
+        cuisine: str,
+        sort: str = DEFAULT_SORT,
+    ) -> Tuple[Restaurant, ...]:
+        """All matches, already ordered by ``sort``; slice it to paginate."""
+        if sort not in SORT_ORDERS:
+            raise UnknownSortError(f"Unknown sort {sort!r}, expected one of {sorted(SORT_ORDERS)}")
+        orders = self._by_location.get(location_key(city, state, cuisine))
+        return orders[sort] if orders else ()
+
+    def nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_miles: Optional[float] = None,
+        count: Optional[int] = None,
+        cuisine: Optional[str] = None,
+    ) -> Nearby:
+        """Venues within ``radius_miles`` and/or the ``count`` nearest, optionally of one cuisine."""
+        located = self._located
+        accept = None
+        if cuisine:
+            wanted = normalize_cuisine(cuisine)
+            accept = lambda i: normalize_cuisine(located[i].cuisine) == wanted
+        matches = self._geo.search(latitude, longitude, radius_miles, count, accept)
+        return [(distance, located[i]) for distance, i in matches]
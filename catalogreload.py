@@ -0,0 +1,222 @@
+"""Hot catalog reloads published by a single reference swap.
+
+``CatalogHolder.current`` is the catalog tool handlers read. Catalogs are
+never mutated after they are built, so a handler that reads ``current``
+once per request sees one consistent catalog without taking a lock, and a
+reload is just building the replacement and assigning ``current``. Result
+caches keyed by ``catalog.version`` drop their entries on the next lookup.
+
+``CATALOG_PATH`` names the source, either a snapshot written by
+``snapshot.py`` or a JSON list of catalog rows. Snapshots are mapped
+directly, which takes well under a millisecond at any size. JSON sources
+are converted to a snapshot in a separate process first, so parsing and
+sorting a large catalog never holds this process's GIL and request latency
+stays flat while a reload runs. Reloads are triggered by
+``POST /admin/catalog/reload`` or, with ``CATALOG_WATCH_INTERVAL`` set, by
+polling the source file for changes; with several workers only the watcher
+reaches every one of them. Indexes derived from the catalog ``subscribe``
+to be brought up to date after each reload. A replaced snapshot is closed,
+unmapping it, ``retire_after`` seconds after the swap, once the requests
+that read it before the swap have finished."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from catalog import RestaurantCatalog
+from snapshot import MAGIC, SnapshotCatalog, open_snapshot
+
+log = logging.getLogger(__name__)
+
+Catalog = Union[RestaurantCatalog, SnapshotCatalog]
+
+_build_numbers = itertools.count(1)
+
+
+class CatalogReloadError(RuntimeError):
+    """Raised when there is no source to reload from or it cannot be converted."""
+
+
+def is_snapshot(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_catalog(path: str) -> Catalog:
+    """Load ``path`` in this process; used once at startup."""
+    if is_snapshot(path):
+        return open_snapshot(path)
+    with open(path) as f:
+        return RestaurantCatalog(json.load(f))
+
+
+def _signature(path: str) -> Tuple[int, int, int]:
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class CatalogHolder:
+    """The published catalog plus the machinery to replace it."""
+
+    def __init__(
+        self,
+        catalog: Catalog,
+        path: Optional[str] = None,
+        snapshot_dir: Optional[str] = None,
+        retire_after: float = 30.0,
+    ):
+        self.current: Catalog = catalog
+        self.path = path
+        self.snapshot_dir = snapshot_dir or tempfile.gettempdir()
+        self.retire_after = retire_after
+        self.reloads = 0
+        self.failures = 0
+        self.last_reload_seconds = 0.0
+        self._lock = asyncio.Lock()
+        self._converted: Optional[str] = None
+        self._signature = _signature(path) if path else None
+        self._listeners: List[Callable[[Catalog], Awaitable[object]]] = []
+        # Replaced snapshots waiting to be closed, and the tasks that close them.
+        self._retired: Set[SnapshotCatalog] = set()
+        self._retiring: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_env(cls, fallback_rows: Iterable[dict]) -> CatalogHolder:
+        """Load ``CATALOG_PATH``, or build from ``fallback_rows`` when unset."""
+        path = os.getenv("CATALOG_PATH")
+        catalog = load_catalog(path) if path else RestaurantCatalog(fallback_rows)
+        return cls(
+            catalog,
+            path,
+            os.getenv("CATALOG_SNAPSHOT_DIR"),
+            float(os.getenv("CATALOG_RETIRE_AFTER", "30")),
+        )
+
+    def subscribe(self, listener: Callable[[Catalog], Awaitable[object]]) -> None:
+        """Await ``listener(catalog)`` after every reload, before the next can start."""
+        self._listeners.append(listener)
+
+    @property
+    def reloading(self) -> bool:
+        return self._lock.locked()
+
+    async def _build(self, path: str) -> Tuple[Catalog, Optional[str]]:
+        if is_snapshot(path):
+            return open_snapshot(path), None
+        output = os.path.join(
+            self.snapshot_dir, f"catalog-{os.getpid()}-{next(_build_numbers)}.snapshot"
+        )
+        # snapshot.py in a fresh interpreter: the build shares no GIL with the
+        # event loop, and its memory is returned when it exits.
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "snapshot", path, output,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await process.communicate()
+        if process.returncode != 0:
+            error = stderr.decode(errors="replace").strip().splitlines()
+            raise CatalogReloadError(
+                f"Converting {path} failed: {error[-1] if error else process.returncode}"
+            )
+        return open_snapshot(output), output
+
+    async def reload(self) -> Catalog:
+        """Rebuild from ``path`` and publish it; concurrent calls run one at a time."""
+        if not self.path:
+            raise CatalogReloadError("No catalog path is configured to reload from")
+        async with self._lock:
+            start = time.perf_counter()
+            try:
+                # Recorded up front so the watcher retries a bad file only once it changes.
+                self._signature = _signature(self.path)
+                catalog, converted = await self._build(self.path)
+            except Exception:
+                self.failures += 1
+                log.exception("catalog reload failed", extra={"path": self.path})
+                raise
+            previous, self.current = self.current, catalog
+            self._retire(previous)
+            if self._converted:
+                # Unlinking leaves the old mapping valid for requests still using it.
+                os.unlink(self._converted)
+            self._converted = converted
+            self.reloads += 1
+            self.last_reload_seconds = time.perf_counter() - start
+            log.info(
+                "catalog reloaded",
+                extra={
+                    "path": self.path,
+                    "restaurants": len(catalog),
+                    "version": catalog.version,
+                    "previous_version": previous.version,
+                    "seconds": round(self.last_reload_seconds, 3),
+                },
+            )
+            for listener in self._listeners:
+                try:
+                    await listener(catalog)
+                except Exception:
+                    # The new catalog is already published; a stale index is logged, not fatal.
+                    log.exception("catalog listener failed", extra={"version": catalog.version})
+            return catalog
+
+    def _retire(self, catalog: Catalog) -> None:
+        # Only snapshots hold a mapping; a RestaurantCatalog is freed with its last reference.
+        if not isinstance(catalog, SnapshotCatalog):
+            return
+        self._retired.add(catalog)
+        task = asyncio.create_task(self._close_later(catalog))
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+
+    async def _close_later(self, catalog: SnapshotCatalog) -> None:
+        await asyncio.sleep(self.retire_after)
+        self._close_retired(catalog)
+
+    def _close_retired(self, catalog: SnapshotCatalog) -> None:
+        self._retired.discard(catalog)
+        try:
+            catalog.close()
+        except BufferError:
+            # Something still holds a view into the mapping; the GC unmaps it later.
+            log.warning("retired catalog still in use", extra={"version": catalog.version})
+
+    async def watch(self, interval: float) -> None:
+        """Reload whenever the source file is replaced or modified."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if _signature(self.path) != self._signature:
+                    await self.reload()
+            except Exception:
+                # Already logged by reload, or the file is mid-replace; retry next tick.
+                continue
+
+    def close(self) -> None:
+        for task in list(self._retiring):
+            task.cancel()
+        for catalog in list(self._retired):
+            self._close_retired(catalog)
+        if self._converted:
+            os.unlink(self._converted)
+            self._converted = None
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "version": self.current.version,
+            "restaurants": len(self.current),
+            "reloads": self.reloads,
+            "reload_failures": self.failures,
+            "retired": len(self._retired),
+            "last_reload_seconds": self.last_reload_seconds,
+        }
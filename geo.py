@@ -0,0 +1,218 @@
+"""Grid index for radius and nearest-neighbour searches over venue coordinates.
+
+Points are bucketed into square cells of ``cell_degrees`` of latitude and
+longitude, numbered row by row (``row * columns + column``), and stored
+sorted by cell. A row of adjacent cells is therefore one contiguous run of
+points, so a radius search finds the rows its bounding box covers with a
+binary search each and measures the great-circle distance only to points
+in those runs. Nearest-neighbour searches run radius searches with a
+growing radius until enough points are inside it.
+
+The index is a handful of flat arrays (``array.array`` when built in
+memory, ``memoryview`` casts when read from a catalog snapshot) and stores
+an integer payload per point that the caller maps back to a venue."""
+
+from __future__ import annotations
+
+import math
+from array import array
+from bisect import bisect_left
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LATITUDE = math.pi * EARTH_RADIUS_MILES / 180
+DEFAULT_CELL_DEGREES = 0.05  # about 3.5 miles of latitude
+
+Match = Tuple[float, int]  # distance in miles, payload
+
+
+class InvalidCoordinatesError(ValueError):
+    """Raised for a latitude, longitude or radius outside its valid range."""
+
+
+def validate_coordinates(latitude: float, longitude: float) -> None:
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise InvalidCoordinatesError(
+            f"Invalid coordinates ({latitude}, {longitude}); latitude must be within "
+            "-90..90 and longitude within -180..180"
+        )
+
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoIndex:
+    """Points sorted by grid cell.
+
+    ``cells`` holds each non-empty cell's number in ascending order and
+    ``starts`` where its run begins in ``payloads``, ``latitudes`` and
+    ``longitudes`` (with a final entry equal to the point count)."""
+
+    def __init__(
+        self,
+        cell_degrees: float,
+        cells: Sequence[int],
+        starts: Sequence[int],
+        payloads: Sequence[int],
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+    ):
+        self.cell_degrees = cell_degrees
+        self.rows = math.ceil(180 / cell_degrees)
+        self.columns = math.ceil(360 / cell_degrees)
+        self.cells = cells
+        self.starts = starts
+        self.payloads = payloads
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+
+    @classmethod
+    def build(
+        cls,
+        points: Iterable[Tuple[int, float, float]],
+        cell_degrees: float = DEFAULT_CELL_DEGREES,
+    ) -> GeoIndex:
+        """Index ``(payload, latitude, longitude)`` triples."""
+        index = cls(cell_degrees, array("Q"), array("I"), array("I"), array("d"), array("d"))
+        keyed = sorted(
+            (index._cell(latitude, longitude), payload, latitude, longitude)
+            for payload, latitude, longitude in points
+        )
+        previous = None
+        for position, (cell, payload, latitude, longitude) in enumerate(keyed):
+            if cell != previous:
+                index.cells.append(cell)
+                index.starts.append(position)
+                previous = cell
+            index.payloads.append(payload)
+            index.latitudes.append(latitude)
+            index.longitudes.append(longitude)
+        index.starts.append(len(keyed))
+        return index
+
+    def __len__(self) -> int:
+        return len(self.payloads)
+
+    def _row(self, latitude: float) -> int:
+        return min(int((latitude + 90) / self.cell_degrees), self.rows - 1)
+
+    def _column(self, longitude: float) -> int:
+        return min(int((longitude + 180) / self.cell_degrees), self.columns - 1)
+
+    def _cell(self, latitude: float, longitude: float) -> int:
+        validate_coordinates(latitude, longitude)
+        return self._row(latitude) * self.columns + self._column(longitude)
+
+    def _column_ranges(self, longitude: float, spread: float) -> List[Tuple[int, int]]:
+        """Inclusive column ranges covering ``longitude ± spread``, split at the antimeridian."""
+        if spread >= 180:
+            return [(0, self.columns - 1)]
+        west, east = longitude - spread, longitude + spread
+        if west < -180:
+            return [(0, self._column(east)), (self._column(west + 360), self.columns - 1)]
+        if east > 180:
+            return [(self._column(west), self.columns - 1), (0, self._column(east - 360))]
+        return [(self._column(west), self._column(east))]
+
+    def within(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_miles: float,
+        accept: Optional[Callable[[int], bool]] = None,
+    ) -> List[Match]:
+        """Points within ``radius_miles``, nearest first; ``accept`` filters payloads."""
+        validate_coordinates(latitude, longitude)
+        if radius_miles < 0:
+            raise InvalidCoordinatesError(f"Invalid radius {radius_miles}; it must not be negative")
+        lat_spread = radius_miles / MILES_PER_DEGREE_LATITUDE
+        south, north = max(-90.0, latitude - lat_spread), min(90.0, latitude + lat_spread)
+        # Longitude degrees shrink towards the poles; use the widest latitude in the box.
+        widest = max(abs(south), abs(north))
+        cos_widest = math.cos(math.radians(widest))
+        lon_spread = 180.0 if widest >= 89.9 else lat_spread / cos_widest
+        column_ranges = self._column_ranges(longitude, lon_spread)
+
+        lat_radians = math.radians(latitude)
+        cos_lat = math.cos(lat_radians)
+        lon_radians = math.radians(longitude)
+        # Compare haversine terms instead of distances to skip the asin per point.
+        limit = math.sin(min(math.pi / 2, radius_miles / EARTH_RADIUS_MILES / 2)) ** 2
+        sin, cos, radians = math.sin, math.cos, math.radians
+        cells, starts = self.cells, self.starts
+        latitudes, longitudes, payloads = self.latitudes, self.longitudes, self.payloads
+        found: List[Match] = []
+        for row in range(self._row(south), self._row(north) + 1):
+            for first, last in column_ranges:
+                lo = bisect_left(cells, row * self.columns + first)
+                hi = bisect_left(cells, row * self.columns + last + 1, lo)
+                if lo == hi:
+                    continue
+                for point in range(starts[lo], starts[hi]):
+                    point_lat = radians(latitudes[point])
+                    a = (
+                        sin((point_lat - lat_radians) / 2) ** 2
+                        + cos_lat * cos(point_lat) * sin((radians(longitudes[point]) - lon_radians) / 2) ** 2
+                    )
+                    if a <= limit:
+                        payload = payloads[point]
+                        if accept is None or accept(payload):
+                            found.append((2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a))), payload))
+        found.sort()
+        return found
+
+    def search(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_miles: Optional[float] = None,
+        count: Optional[int] = None,
+        accept: Optional[Callable[[int], bool]] = None,
+    ) -> List[Match]:
+        """Everything within ``radius_miles``, the ``count`` nearest, or the
+        ``count`` nearest within ``radius_miles``."""
+        if radius_miles is None:
+            if count is None:
+                raise ValueError("A geo search needs a radius, a count or both")
+            return self.nearest(latitude, longitude, count, accept)
+        found = self.within(latitude, longitude, radius_miles, accept)
+        return found if count is None else found[:count]
+
+    def _starting_radius(self, latitude: float, longitude: float, count: int) -> float:
+        """A radius expected to hold about ``count`` points, judged by the query's own cell.
+
+        Dense city cells hold thousands of points, so starting from a whole
+        cell would measure far more of them than a short list needs."""
+        cell_miles = self.cell_degrees * MILES_PER_DEGREE_LATITUDE
+        cell = self._cell(latitude, longitude)
+        position = bisect_left(self.cells, cell)
+        if position == len(self.cells) or self.cells[position] != cell:
+            return cell_miles
+        points = self.starts[position + 1] - self.starts[position]
+        area = cell_miles * cell_miles * max(0.01, math.cos(math.radians(latitude)))
+        # Twice the radius of a circle that would hold ``count`` points at this density.
+        return min(cell_miles, 2 * math.sqrt(count * area / (math.pi * points)))
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        count: int,
+        accept: Optional[Callable[[int], bool]] = None,
+    ) -> List[Match]:
+        """The ``count`` nearest accepted points, nearest first."""
+        radius = self._starting_radius(latitude, longitude, count)
+        half_circumference = math.pi * EARTH_RADIUS_MILES
+        while True:
+            found = self.within(latitude, longitude, radius, accept)
+            if len(found) >= count or radius >= half_circumference:
+                return found[:count]
+            # Grow by how sparse the neighbourhood looks, at least doubling.
+            scale = math.sqrt(count / len(found)) if found else 4.0
+            radius = min(half_circumference, radius * max(2.0, scale))
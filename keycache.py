@@ -0,0 +1,180 @@
+"""Cache of decoded WebAuthn credential public keys.
+
+``webauthn.verify_authentication_response`` receives the stored COSE bytes
+on every login and decodes them into a ``cryptography`` key each time,
+although the same credentials sign in over and over. ``PublicKeyCache``
+keeps the decoded keys per ``credential_id``, and
+``verify_authentication_cached`` is this server's own assertion check: the
+same steps as the library's, built from its public ``webauthn.helpers``,
+with the key taken from the cache. The library itself is left untouched.
+The checks mirror webauthn 3.0.1, which requirements.txt pins; tests in
+tests/test_keycache.py fail when another version is installed, so an
+upgrade means comparing this function with the new release first.
+
+Entries also remember the COSE bytes they were decoded from, so a key that
+was re-registered under the same id is never served stale, even in worker
+processes that miss an explicit ``invalidate``."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple, Union
+
+from cryptography.exceptions import InvalidSignature
+from webauthn.authentication.verify_authentication_response import VerifiedAuthentication
+from webauthn.helpers import (
+    bytes_to_base64url,
+    byteslike_to_bytes,
+    decode_credential_public_key,
+    decoded_public_key_to_cryptography,
+    parse_authentication_credential_json,
+    parse_authenticator_data,
+    parse_backup_flags,
+    parse_client_data_json,
+    verify_signature,
+)
+from webauthn.helpers.exceptions import InvalidAuthenticationResponse
+from webauthn.helpers.structs import (
+    AuthenticationCredential,
+    ClientDataType,
+    PublicKeyCredentialType,
+    TokenBindingStatus,
+)
+
+
+class PublicKeyCache:
+    """Bounded, thread-safe LRU of ``credential_id -> (cose_bytes, decoded, crypto_key)``."""
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, Tuple[bytes, Any, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, credential_id: bytes, credential_public_key: bytes) -> Tuple[Any, Any]:
+        """Return ``(decoded_key, cryptography_key)``, decoding on a miss."""
+        with self._lock:
+            entry = self._entries.get(credential_id)
+            if entry is not None and entry[0] == credential_public_key:
+                self._entries.move_to_end(credential_id)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+        decoded = decode_credential_public_key(credential_public_key)
+        crypto_key = decoded_public_key_to_cryptography(decoded)
+        with self._lock:
+            self._entries[credential_id] = (credential_public_key, decoded, crypto_key)
+            self._entries.move_to_end(credential_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return decoded, crypto_key
+
+    def invalidate(self, credential_id: bytes) -> None:
+        with self._lock:
+            self._entries.pop(credential_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Process-wide cache; each worker process of a process pool gets its own.
+PUBLIC_KEY_CACHE = PublicKeyCache(int(os.getenv("PUBLIC_KEY_CACHE_SIZE", "10000")))
+
+_TOKEN_BINDING_STATUSES = (TokenBindingStatus.SUPPORTED, TokenBindingStatus.PRESENT)
+
+
+def verify_authentication_cached(
+    *,
+    credential: Union[str, Dict[str, Any], AuthenticationCredential],
+    expected_challenge: bytes,
+    expected_rp_id: str,
+    expected_origin: Union[str, List[str]],
+    credential_public_key: bytes,
+    credential_current_sign_count: int,
+    require_user_verification: bool = False,
+    cache: PublicKeyCache = PUBLIC_KEY_CACHE,
+) -> VerifiedAuthentication:
+    """``verify_authentication_response`` with the public key from ``cache``.
+
+    Runs the library's checks in the library's order and raises its
+    ``InvalidAuthenticationResponse``; tests/test_keycache.py compares the two."""
+    if isinstance(credential, (str, dict)):
+        credential = parse_authentication_credential_json(credential)
+    if bytes_to_base64url(credential.raw_id) != credential.id:
+        raise InvalidAuthenticationResponse("id and raw_id were not equivalent")
+    if credential.type != PublicKeyCredentialType.PUBLIC_KEY:
+        raise InvalidAuthenticationResponse(
+            f'Unexpected credential type "{credential.type}", expected "public-key"'
+        )
+
+    response = credential.response
+    client_data_bytes = byteslike_to_bytes(response.client_data_json)
+    authenticator_data_bytes = byteslike_to_bytes(response.authenticator_data)
+    try:
+        client_data = parse_client_data_json(client_data_bytes)
+    except Exception as exc:
+        raise InvalidAuthenticationResponse("clientDataJSON was malformed") from exc
+    if client_data.type != ClientDataType.WEBAUTHN_GET:
+        raise InvalidAuthenticationResponse(
+            f'Unexpected client data type "{client_data.type}", expected "{ClientDataType.WEBAUTHN_GET}"'
+        )
+    if expected_challenge != client_data.challenge:
+        raise InvalidAuthenticationResponse("Client data challenge was not expected challenge")
+    origins = [expected_origin] if isinstance(expected_origin, str) else expected_origin
+    if client_data.origin not in origins:
+        raise InvalidAuthenticationResponse(
+            f'Unexpected client data origin "{client_data.origin}", expected one of {origins}'
+        )
+    if client_data.token_binding and client_data.token_binding.status not in _TOKEN_BINDING_STATUSES:
+        raise InvalidAuthenticationResponse(
+            f'Unexpected token_binding status of "{client_data.token_binding.status}"'
+        )
+
+    try:
+        auth_data = parse_authenticator_data(authenticator_data_bytes)
+    except Exception as exc:
+        raise InvalidAuthenticationResponse("authenticatorData was malformed") from exc
+    if auth_data.rp_id_hash != hashlib.sha256(expected_rp_id.encode("utf-8")).digest():
+        raise InvalidAuthenticationResponse("Unexpected RP ID hash")
+    if not auth_data.flags.up:
+        raise InvalidAuthenticationResponse("User was not present during authentication")
+    if require_user_verification and not auth_data.flags.uv:
+        raise InvalidAuthenticationResponse(
+            "User verification is required but user was not verified during authentication"
+        )
+    if (
+        auth_data.sign_count > 0 or credential_current_sign_count > 0
+    ) and auth_data.sign_count <= credential_current_sign_count:
+        # Not incremented since the last login: possibly a replayed assertion.
+        raise InvalidAuthenticationResponse(
+            f"Response sign count of {auth_data.sign_count} was not greater than "
+            f"current count of {credential_current_sign_count}"
+        )
+
+    decoded, crypto_key = cache.get(credential.raw_id, credential_public_key)
+    try:
+        verify_signature(
+            public_key=crypto_key,
+            signature_alg=decoded.alg,
+            signature=byteslike_to_bytes(response.signature),
+            data=authenticator_data_bytes + hashlib.sha256(client_data_bytes).digest(),
+        )
+    except InvalidSignature:
+        raise InvalidAuthenticationResponse("Could not verify authentication signature")
+
+    backup_flags = parse_backup_flags(auth_data.flags)
+    return VerifiedAuthentication(
+        credential_id=credential.raw_id,
+        new_sign_count=auth_data.sign_count,
+        credential_device_type=backup_flags.credential_device_type,
+        credential_backed_up=backup_flags.credential_backed_up,
+        user_verified=auth_data.flags.uv,
+    )
@@ -0,0 +1,233 @@
+"""Queued SMTP delivery over a pool of persistent connections.
+
+``server.send_code_email`` used to build a new ``FastMail`` client per
+message, paying for a TCP connect, TLS handshake and login on every
+one-time code. ``MailDelivery`` puts messages on a bounded in-process queue
+that a fixed number of workers drain through ``SMTPConnectionPool``, which
+keeps authenticated connections open between messages.
+
+* a full queue makes ``enqueue`` wait up to ``enqueue_timeout`` and then
+  raise ``MailQueueFullError``, so callers can shed load
+* connection failures and 4xx replies are retried with exponential backoff;
+  permanent 5xx rejections are dropped after one attempt"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+import aiosmtplib
+
+log = logging.getLogger(__name__)
+
+
+class MailQueueFullError(RuntimeError):
+    """Raised when the delivery queue stays full for ``enqueue_timeout``."""
+
+
+@dataclass(frozen=True)
+class SMTPSettings:
+    hostname: str
+    port: int
+    sender: str
+    username: Optional[str] = None
+    password: Optional[str] = None
+    start_tls: bool = False
+    use_tls: bool = False
+    timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "SMTPSettings":
+        """Read the ``MAIL_*`` variables the server has always used."""
+        return cls(
+            hostname=os.getenv("MAIL_SERVER", "localhost"),
+            port=int(os.getenv("MAIL_PORT", "25")),
+            sender=os.getenv("MAIL_FROM", ""),
+            username=os.getenv("MAIL_USERNAME") or None,
+            password=os.getenv("MAIL_PASSWORD") or None,
+            start_tls=os.getenv("MAIL_STARTTLS", "false").lower() == "true",
+            use_tls=os.getenv("MAIL_SSL_TLS", "false").lower() == "true",
+            timeout=float(os.getenv("MAIL_TIMEOUT", "30")),
+        )
+
+
+def build_message(settings: SMTPSettings, recipient: str, subject: str, html: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.sender
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.set_content(html, subtype="html")
+    return message
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return 400 <= error.code < 500
+    return isinstance(error, (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError))
+
+
+class SMTPConnectionPool:
+    """Up to ``size`` logged-in SMTP connections, reused across messages."""
+
+    def __init__(self, settings: SMTPSettings, size: int = 4):
+        self.settings = settings
+        self.size = size
+        self._idle: List[aiosmtplib.SMTP] = []
+        self._slots = asyncio.Semaphore(size)
+        self.connects = 0
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        settings = self.settings
+        client = aiosmtplib.SMTP(
+            hostname=settings.hostname,
+            port=settings.port,
+            timeout=settings.timeout,
+            use_tls=settings.use_tls,
+            start_tls=settings.start_tls,
+        )
+        await client.connect()
+        if settings.username:
+            await client.login(settings.username, settings.password or "")
+        self.connects += 1
+        return client
+
+    async def send(self, message: EmailMessage) -> None:
+        """Send on an idle connection, opening one if none is available.
+
+        A connection that fails mid-send is discarded instead of returned."""
+        async with self._slots:
+            client = self._idle.pop() if self._idle else None
+            if client is None or not client.is_connected:
+                client = await self._connect()
+            try:
+                await client.send_message(message)
+            except BaseException:
+                await self._discard(client)
+                raise
+            self._idle.append(client)
+
+    @staticmethod
+    async def _discard(client: aiosmtplib.SMTP) -> None:
+        try:
+            client.close()
+        except Exception:
+            pass
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for client in idle:
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
+
+
+class MailDelivery:
+    """Bounded message queue drained by ``workers`` tasks over a connection pool.
+
+    Workers start on the first ``enqueue``, so the object can be created at
+    import time, before an event loop exists."""
+
+    def __init__(
+        self,
+        settings: SMTPSettings,
+        workers: int = 4,
+        connections: Optional[int] = None,
+        max_queue: int = 1000,
+        enqueue_timeout: float = 0.5,
+        retries: int = 3,
+        backoff: float = 0.5,
+    ):
+        self.settings = settings
+        self.workers = workers
+        self.connections = connections or workers
+        self.max_queue = max_queue
+        self.enqueue_timeout = enqueue_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rejected = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._pool: Optional[SMTPConnectionPool] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _start(self) -> None:
+        self._queue = asyncio.Queue(self.max_queue)
+        self._pool = SMTPConnectionPool(self.settings, self.connections)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"mail-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def enqueue(self, message: EmailMessage) -> None:
+        if self._queue is None:
+            self._start()
+        try:
+            await asyncio.wait_for(self._queue.put(message), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise MailQueueFullError(
+                f"Mail queue full ({self.max_queue} messages waiting)"
+            ) from None
+
+    async def _deliver(self, message: EmailMessage) -> None:
+        attempt = 0
+        while True:
+            try:
+                await self._pool.send(message)
+                self.sent += 1
+                return
+            except Exception as e:
+                if not _is_transient(e) or attempt >= self.retries:
+                    self.failed += 1
+                    log.error(
+                        "could not send mail",
+                        extra={"recipient": message["To"], "attempts": attempt + 1, "error": str(e)},
+                    )
+                    return
+            self.retried += 1
+            await asyncio.sleep(self.backoff * 2 ** attempt * (0.5 + random.random()))
+            attempt += 1
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        while True:
+            message = await queue.get()
+            try:
+                await self._deliver(message)
+            finally:
+                queue.task_done()
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Wait up to ``drain_timeout`` for queued mail, then stop the workers."""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            log.warning(
+                "dropping undelivered mail on shutdown", extra={"messages": self._queue.qsize()}
+            )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._pool.close()
+        self._queue = None
+        self._tasks = []
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "rejected": self.rejected,
+            "connects": self._pool.connects if self._pool is not None else 0,
+        }
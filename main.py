@@ -9,36 +9,111 @@ handlers into an HTTP/SSE stack so you can run the server with uvicorn on port
 
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from functools import lru_cache
-from typing import Any, Dict, List
+from datetime import date
+from typing import Any, Dict, List, Literal, Optional, Set, Tuple
+import asyncio
+import hmac
 import json
-import requests
-from requests.exceptions import RequestException, HTTPError
+import logging
+import os
+import sqlite3
 
 import mcp.types as types
+from fastapi import HTTPException, Request
 from mcp.server.fastmcp import FastMCP
 from pydantic import BaseModel, ConfigDict, Field, ValidationError
 from typing import Type
-from server import rest_api
+from applog import configure_logging
+from assets import (
+    AssetFetcher,
+    AssetUnavailableError,
+    WidgetAsset,
+    WidgetAssetLoader,
+    template_uri_of,
+)
+from availability import MINUTES_PER_DAY, InvalidAvailabilityError, parse_date, parse_time
+from cache import ResultCache
+from catalog import DEFAULT_SORT, UnknownSortError
+from metrics import REGISTRY, timed_mcp_handler
+from pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    InvalidPageError,
+    decode_cursor,
+    encode_cursor,
+    page_size,
+    query_fingerprint,
+)
+from records import Restaurant
+from reservations import SlotFullError, create_reservation_book, slot_seats
+from catalogreload import CatalogHolder, CatalogReloadError
+from geo import InvalidCoordinatesError
+from textsearch import TextIndex, tokenize
+from server import MAIL_DELIVERY, rest_api
+
+log = logging.getLogger(__name__)
+
+MAX_RADIUS_MILES = float(os.getenv("MAX_RADIUS_MILES", "100"))
+RESERVATION_SLOT_SEATS = slot_seats()
 
 class RestaurantRecommend(BaseModel):
     """Schema for Restaurant recommendations tools."""
-    cuisine: str = Field(
-        ...,
+    cuisine: Optional[str] = Field(
+        None,
         alias="cuisine",
-        description="Restaurant type to mention when rendering the widget.",
-    ),
-    city: str = Field(
-        ...,
+        description="Restaurant type to mention when rendering the widget. Optional when searching by location.",
+    )
+    city: Optional[str] = Field(
+        None,
         alias="city",
         description="The city where located to mention when rendering the widget.",
-    ),
-    state: str = Field(
-        ...,
+    )
+    state: Optional[str] = Field(
+        None,
         alias="state",
         description="the state associated with city to mention when rendering the widget.",
-    ),
+    )
+    latitude: Optional[float] = Field(
+        None,
+        alias="latitude",
+        ge=-90,
+        le=90,
+        description="Latitude of the user's location. With longitude, returns the nearest restaurants instead of matching city and state.",
+    )
+    longitude: Optional[float] = Field(
+        None,
+        alias="longitude",
+        ge=-180,
+        le=180,
+        description="Longitude of the user's location.",
+    )
+    radius_miles: Optional[float] = Field(
+        None,
+        alias="radius_miles",
+        gt=0,
+        le=MAX_RADIUS_MILES,
+        description="Only return restaurants within this many miles of latitude and longitude. Without it the nearest restaurants are returned, nearest first.",
+    )
+    limit: Optional[int] = Field(
+        None,
+        alias="limit",
+        ge=1,
+        le=MAX_PAGE_SIZE,
+        description=f"Maximum number of restaurants to return. Defaults to {DEFAULT_PAGE_SIZE}.",
+    )
+    cursor: Optional[str] = Field(
+        None,
+        alias="cursor",
+        description="The next_cursor value from a previous call with the same search arguments, to fetch the next page.",
+    )
+    sort: Literal["rating", "price"] = Field(
+        DEFAULT_SORT,
+        alias="sort",
+        description="Order results by highest rating first or lowest price first. Location searches are always nearest first.",
+    )
     model_config = ConfigDict(populate_by_name=True, extra="forbid")
 
 class RestaurantBooking(BaseModel):
@@ -47,7 +122,107 @@ class RestaurantBooking(BaseModel):
         ...,
         alias="restaurant_id",
         description="Restaurant identifier number"
-    ),
+    )
+    start_date: Optional[str] = Field(
+        None,
+        alias="start_date",
+        description="First day to show availability for, as MM-DD-YYYY. Defaults to every available day.",
+    )
+    end_date: Optional[str] = Field(
+        None,
+        alias="end_date",
+        description="Last day to show availability for, as MM-DD-YYYY. Defaults to start_date.",
+    )
+    after: Optional[str] = Field(
+        None,
+        alias="after",
+        description="Only show slots at or after this time of day, as HH:MM.",
+    )
+    before: Optional[str] = Field(
+        None,
+        alias="before",
+        description="Only show slots before this time of day, as HH:MM.",
+    )
+    model_config = ConfigDict(populate_by_name=True, extra="forbid")
+
+class RestaurantAvailability(BaseModel):
+    """Schema for the batch Restaurant-availability tool."""
+    restaurant_ids: List[str] = Field(
+        ...,
+        alias="restaurant_ids",
+        min_length=1,
+        max_length=MAX_PAGE_SIZE,
+        description="Restaurant identifiers, e.g. every restaurant_id from one page of Restaurant-recomm results.",
+    )
+    start_date: Optional[str] = Field(
+        None,
+        alias="start_date",
+        description="First day to show availability for, as MM-DD-YYYY. Defaults to every available day.",
+    )
+    end_date: Optional[str] = Field(
+        None,
+        alias="end_date",
+        description="Last day to show availability for, as MM-DD-YYYY. Defaults to start_date.",
+    )
+    after: Optional[str] = Field(
+        None,
+        alias="after",
+        description="Only show slots at or after this time of day, as HH:MM.",
+    )
+    before: Optional[str] = Field(
+        None,
+        alias="before",
+        description="Only show slots before this time of day, as HH:MM.",
+    )
+    model_config = ConfigDict(populate_by_name=True, extra="forbid")
+
+class RestaurantSearch(BaseModel):
+    """Schema for the Restaurant-search tool."""
+    query: str = Field(
+        ...,
+        alias="query",
+        min_length=1,
+        max_length=200,
+        description="Words to look for in restaurant names, descriptions and cuisines, e.g. \"ramen\" or \"wood-fired pizza\". Partial words and small typos still match.",
+    )
+    limit: Optional[int] = Field(
+        None,
+        alias="limit",
+        ge=1,
+        le=MAX_PAGE_SIZE,
+        description=f"Maximum number of restaurants to return. Defaults to {DEFAULT_PAGE_SIZE}.",
+    )
+    cursor: Optional[str] = Field(
+        None,
+        alias="cursor",
+        description="The next_cursor value from a previous call with the same query, to fetch the next page.",
+    )
+    model_config = ConfigDict(populate_by_name=True, extra="forbid")
+
+class ReservationRequest(BaseModel):
+    """Schema for the book_reservation tool."""
+    restaurant_id: str = Field(
+        ...,
+        alias="restaurant_id",
+        description="Restaurant identifier number",
+    )
+    date: str = Field(
+        ...,
+        alias="date",
+        description="Day of the reservation, as MM-DD-YYYY. Must be one of the restaurant's available days.",
+    )
+    time: str = Field(
+        ...,
+        alias="time",
+        description="Time of the reservation, as HH:MM. Must be one of the available slots on that day.",
+    )
+    party_size: int = Field(
+        ...,
+        alias="party_size",
+        ge=1,
+        le=RESERVATION_SLOT_SEATS,
+        description="Number of guests.",
+    )
     model_config = ConfigDict(populate_by_name=True, extra="forbid")
 
 @dataclass(frozen=True)
@@ -57,8 +232,8 @@ class RestaurantWidget:
     template_uri: str
     invoking: str
     invoked: str
-    html: str
     response_text: str
+    read_only: bool = True
 
 ASSETS_DIR = "http://localhost:3000"
 OAUTH_URL = "https://tgallant-mcp-server.ngrok.app"
@@ -98,7 +273,7 @@ RESTAURANTS = [
             '11-16-2025': ["19:30:00","20:30:00", "21:00:00", "21:30:00"],
             '11-17-2025': ["18:00:00","18:30:00", "19:30:00", "21:00:00"],
             '11-18-2025': ["19:00:00","19:30:00", "20:30:00", "21:00:00"],
-            '11-19-2205': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
+            '11-19-2025': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
         }
     },
     {
@@ -175,7 +350,7 @@ RESTAURANTS = [
             '11-16-2025': ["19:30:00","20:30:00", "21:00:00", "21:30:00"],
             '11-17-2025': ["18:00:00","18:30:00", "19:30:00", "21:00:00"],
             '11-18-2025': ["19:00:00","19:30:00", "20:30:00", "21:00:00"],
-            '11-19-2205': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
+            '11-19-2025': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
         }
     },
     {
@@ -252,7 +427,7 @@ RESTAURANTS = [
             '11-16-2025': ["19:30:00","20:30:00", "21:00:00", "21:30:00"],
             '11-17-2025': ["18:00:00","18:30:00", "19:30:00", "21:00:00"],
             '11-18-2025': ["19:00:00","19:30:00", "20:30:00", "21:00:00"],
-            '11-19-2205': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
+            '11-19-2025': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
         }
     },
     {
@@ -328,7 +503,7 @@ RESTAURANTS = [
             '11-16-2025': ["19:30:00","20:30:00", "21:00:00", "21:30:00"],
             '11-17-2025': ["18:00:00","18:30:00", "19:30:00", "21:00:00"],
             '11-18-2025': ["19:00:00","19:30:00", "20:30:00", "21:00:00"],
-            '11-19-2205': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
+            '11-19-2025': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
         }
     },
     {
@@ -391,17 +566,92 @@ RESTAURANTS = [
     },
 ]
 
-def find_restaurant_by_id(target_id: str) -> dict | None:
-    for restaurant in RESTAURANTS:
-        if restaurant.get("restaurant_id") == target_id:
-            return restaurant
-    return None
+# CATALOG_PATH points at a snapshot built by snapshot.py (mapped read-only
+# and shared by workers) or a JSON list of rows; RESTAURANTS is the fallback.
+# Handlers read CATALOG.current once per request; reloads swap it whole.
+CATALOG = CatalogHolder.from_env(RESTAURANTS)
+CATALOG_WATCH_INTERVAL = float(os.getenv("CATALOG_WATCH_INTERVAL", "0"))
+
+# Inverted index over names, descriptions and cuisines for Restaurant-search,
+# brought in line with each reloaded catalog by reindexing what changed.
+TEXT_INDEX = TextIndex.build(CATALOG.current)
+CATALOG.subscribe(TEXT_INDEX.sync)
 
-def dam_fetch_text(path: str) -> str:
-    url = f"{ASSETS_DIR}{path}"
-    r = requests.get(url, timeout=10)
-    r.raise_for_status()
-    return r.text
+# Recommendation results keyed by normalized query and tagged with the catalog version.
+# Entries are the built ServerResult, not encoded JSON: the SDK's session dumps
+# every result and the transport encodes the whole JSON-RPC message itself, so
+# a cached payload could only be sent by overriding SDK internals.
+RECOMMENDATION_CACHE = ResultCache(
+    maxsize=int(os.getenv("RECOMM_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RECOMM_CACHE_TTL", "300")),
+)
+
+# Seats claimed per (restaurant, date, time) slot; RESERVATION_STORE=sqlite
+# shares them between workers.
+RESERVATIONS = create_reservation_book(seats_per_slot=RESERVATION_SLOT_SEATS)
+
+def find_restaurant_by_id(target_id: str) -> Restaurant | None:
+    return CATALOG.current.get(target_id)
+
+AvailabilityWindow = Tuple[date, date, int, int]
+
+def parse_window(arguments: Dict[str, Any]) -> AvailabilityWindow | None:
+    """Resolve the optional start_date, end_date, after and before filters."""
+    start_date = arguments.get("start_date")
+    end_date = arguments.get("end_date")
+    after = arguments.get("after")
+    before = arguments.get("before")
+    if not (start_date or end_date or after or before):
+        return None
+    start = parse_date(start_date) if start_date else date.min
+    end = parse_date(end_date) if end_date else (start if start_date else date.max)
+    start_minute = parse_time(after) if after else 0
+    end_minute = parse_time(before) if before else MINUTES_PER_DAY
+    return start, end, start_minute, end_minute
+
+def open_slots(
+    restaurant: Restaurant,
+    window: AvailabilityWindow | None,
+    full: Set[Tuple[date, int]],
+) -> Dict[str, List[str]]:
+    """Slots inside ``window`` (default: all) minus the fully booked ones."""
+    slots = restaurant.availability.query(*window) if window else None
+    if full:
+        if slots is None:
+            slots = restaurant.availability.query(date.min, date.max)
+        slots = {
+            day: open_minutes
+            for day, minutes in slots.items()
+            if (open_minutes := [minute for minute in minutes if (day, minute) not in full])
+        }
+    return restaurant.availability.to_dict(slots)
+
+async def availability_window(restaurant: Restaurant, arguments: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Open slots for Restaurant-booking; fully booked slots are not offered."""
+    window = parse_window(arguments)
+    return open_slots(restaurant, window, await RESERVATIONS.full_slots_async(restaurant.restaurant_id))
+
+def restaurant_card(r: Restaurant) -> Dict[str, Any]:
+    """One result card for the recommendation and search tools."""
+    return {
+        "restaurant_id": r.restaurant_id,
+        "name": r.name,
+        "description": r.description,
+        "street": r.street,
+        "city": r.city,
+        "state": r.state,
+        "cuisine": r.cuisine,
+        "price_range": r.price_range,
+        "rating": r.rating,
+        "image": r.image,
+        "book_action": {
+            "type": "tool_call",
+            "tool_name": "Restaurant-booking",
+            "parameters": {
+                "restaurant_id": r.restaurant_id
+            }
+        }
+    }
 
 def get_title(name: str) -> str:
     match name:
@@ -412,28 +662,6 @@ def get_title(name: str) -> str:
         case _:
             return "Unknown"
 
-@lru_cache(maxsize=None)
-def _load_widget_html(component_name: str) -> str:
-    print(f'Component name is {component_name}')
-    css = dam_fetch_text(f"/{component_name}.css")
-    js  = dam_fetch_text(f"/{component_name}.js")
-    title = get_title(component_name)
-
-    html = f"""<!doctype html>
-    <html lang="en">
-    <head>
-      <meta charset="UTF-8" />
-      <meta name="viewport" content="width=device-width, initial-scale=1" />
-      <title>{title}</title>
-      <style>{css}</style>
-    </head>
-    <body>
-      <div id="root"></div>
-      <script type="module">{js}</script>
-    </body>
-    </html>"""
-    return html
-
 
 widgets: List[RestaurantWidget] = [
     RestaurantWidget(
@@ -443,8 +671,14 @@ widgets: List[RestaurantWidget] = [
         template_uri="",
         invoking="Retrieving a list",
         invoked="Received a fresh map",
-#        html=_load_widget_html("Restaurant-recomm"),
-        html="",
+        response_text="Rendered a restaurant list!",
+    ),
+    RestaurantWidget(
+        identifier="Restaurant-search",
+        title="Finds restaurants whose name, description or cuisine matches free text such as a dish, e.g. ramen or oysters. The client will display these options as selectable cards.",
+        template_uri="",
+        invoking="Searching restaurants",
+        invoked="Received matching restaurants",
         response_text="Rendered a restaurant list!",
     ),
     RestaurantWidget(
@@ -453,14 +687,48 @@ widgets: List[RestaurantWidget] = [
         template_uri="ui://widget/Restaurant-booking.html",
         invoking="Getting reservation details",
         invoked="Received reservation details",
-        html=_load_widget_html("Restaurant-booking"),
         response_text="Rendered reservation options!",
     ),
+    RestaurantWidget(
+        identifier="Restaurant-availability",
+        title="Lists open reservation slots for several restaurants at once, optionally within a date and time window.",
+        template_uri="",
+        invoking="Checking availability",
+        invoked="Received availability",
+        response_text="Listed open slots!",
+    ),
+    RestaurantWidget(
+        identifier="book_reservation",
+        title="Reserve a table at a restaurant for a party at one of its available date and time slots.",
+        template_uri="",
+        invoking="Reserving a table",
+        invoked="Reservation made",
+        response_text="Reserved a table!",
+        read_only=False,
+    ),
 ]
 
 
 MIME_TYPE = "text/html+skybridge"
 
+# Widget HTML is rendered by ASSET_LOADER instead of at import time, so a slow
+# or missing asset server can no longer stall or crash startup.
+ASSET_LOADER = WidgetAssetLoader(
+    {widget.identifier: get_title(widget.identifier) for widget in widgets if widget.template_uri},
+    mode=os.getenv("WIDGET_ASSET_MODE", "startup"),
+    dist_dir=os.getenv("WIDGET_DIST_DIR", "./client/dist"),
+    fetcher=AssetFetcher(
+        ASSETS_DIR,
+        timeout=float(os.getenv("ASSET_FETCH_TIMEOUT", "10")),
+        max_connections_per_host=int(os.getenv("ASSET_MAX_CONNECTIONS", "8")),
+        retries=int(os.getenv("ASSET_FETCH_RETRIES", "2")),
+    ),
+    failure_backoff=float(os.getenv("ASSET_FAILURE_BACKOFF", "5")),
+)
+# When false, Restaurant-booking results carry only the template URI and
+# widgetVersion instead of the whole inlined HTML shell.
+EMBED_WIDGET_HTML = os.getenv("EMBED_WIDGET_HTML", "true").lower() == "true"
+
 WIDGETS_BY_ID: Dict[str, RestaurantWidget] = {
     widget.identifier: widget for widget in widgets
 }
@@ -475,7 +743,10 @@ mcp = FastMCP(
 
 SCHEMA_MAP: dict[str, Type[BaseModel]] = {
     "Restaurant-recomm": RestaurantRecommend,
+    "Restaurant-search": RestaurantSearch,
     "Restaurant-booking": RestaurantBooking,
+    "Restaurant-availability": RestaurantAvailability,
+    "book_reservation": ReservationRequest,
 }
 
 def _resource_description(widget: RestaurantWidget) -> str:
@@ -492,19 +763,18 @@ def _tool_meta(widget: RestaurantWidget) -> Dict[str, Any]:
     }
 
 
-def _embedded_widget_resource(widget: RestaurantWidget) -> types.EmbeddedResource:
+def _embedded_widget_resource(widget: RestaurantWidget, asset: WidgetAsset) -> types.EmbeddedResource:
     return types.EmbeddedResource(
         type="resource",
         resource=types.TextResourceContents(
             uri=widget.template_uri,
             mimeType=MIME_TYPE,
-            text=widget.html,
+            text=asset.html,
             title=widget.title,
         ),
     )
 
-@mcp._mcp_server.list_tools()
-async def _list_tools() -> List[types.Tool]:
+def _build_tools() -> List[types.Tool]:
     return [
         types.Tool(
             name=widget.identifier,
@@ -533,15 +803,14 @@ async def _list_tools() -> List[types.Tool]:
             annotations={
                 "destructiveHint": False,
                 "openWorldHint": False,
-                "readOnlyHint": True,
+                "readOnlyHint": widget.read_only,
             },
         )
         for widget in widgets
     ]
 
 
-@mcp._mcp_server.list_resources()
-async def _list_resources() -> List[types.Resource]:
+def _build_resources() -> List[types.Resource]:
     return [
         types.Resource(
             name=widget.title,
@@ -552,11 +821,11 @@ async def _list_resources() -> List[types.Resource]:
             _meta=_tool_meta(widget),
         )
         for widget in widgets
+        if widget.template_uri
     ]
 
 
-@mcp._mcp_server.list_resource_templates()
-async def _list_resource_templates() -> List[types.ResourceTemplate]:
+def _build_resource_templates() -> List[types.ResourceTemplate]:
     return [
         types.ResourceTemplate(
             name=widget.title,
@@ -567,14 +836,46 @@ async def _list_resource_templates() -> List[types.ResourceTemplate]:
             _meta=_tool_meta(widget),
         )
         for widget in widgets
+        if widget.template_uri
     ]
 
 
+def _listing_signature() -> tuple:
+    """Everything the tools/resources listings are derived from."""
+    return (tuple(widgets), tuple(SCHEMA_MAP.items()))
+
+
+@lru_cache(maxsize=1)
+def _listings(signature: tuple) -> Dict[type, types.ServerResult]:
+    """Listing responses, built once per signature and then served from memory.
+
+    MCP clients list tools and resources on every connection, which with
+    stateless_http means on almost every request."""
+    return {
+        types.ListToolsRequest: types.ServerResult(
+            types.ListToolsResult(tools=_build_tools())
+        ),
+        types.ListResourcesRequest: types.ServerResult(
+            types.ListResourcesResult(resources=_build_resources())
+        ),
+        types.ListResourceTemplatesRequest: types.ServerResult(
+            types.ListResourceTemplatesResult(resourceTemplates=_build_resource_templates())
+        ),
+    }
+
+
+async def _handle_list_request(
+    req: types.ListToolsRequest | types.ListResourcesRequest | types.ListResourceTemplatesRequest,
+) -> types.ServerResult:
+    return _listings(_listing_signature())[type(req)]
+
+
 async def _handle_read_resource(req: types.ReadResourceRequest) -> types.ServerResult:
-    widget = WIDGETS_BY_URI.get(str(req.params.uri))
+    template_uri = template_uri_of(str(req.params.uri))
+    widget = WIDGETS_BY_URI.get(template_uri) if template_uri else None
 
     if widget is None:
-        print(f'Widget not found')
+        log.warning("unknown resource requested", extra={"uri": str(req.params.uri)})
         return types.ServerResult(
             types.ReadResourceResult(
                 contents=[],
@@ -582,18 +883,34 @@ async def _handle_read_resource(req: types.ReadResourceRequest) -> types.ServerR
             )
         )
 
+    try:
+        asset = await ASSET_LOADER.get(widget.identifier)
+    except AssetUnavailableError as e:
+        return types.ServerResult(
+            types.ReadResourceResult(
+                contents=[],
+                _meta={"error": str(e)},
+            )
+        )
+
     contents = [
         types.TextResourceContents(
-            uri=widget.template_uri,
+            uri=str(req.params.uri),
             mimeType=MIME_TYPE,
-            text=widget.html,
-            _meta=_tool_meta(widget),
+            text=asset.html,
+            _meta={**_tool_meta(widget), "widgetVersion": asset.content_hash},
         )
     ]
 
     return types.ServerResult(types.ReadResourceResult(contents=contents))
 
 
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, detail['loc']))}: {detail['msg']}" for detail in error.errors()
+    )
+
+
 async def _call_tool_request(req: types.CallToolRequest) -> types.ServerResult:
     widget = WIDGETS_BY_ID.get(req.params.name)
     if widget is None:
@@ -609,41 +926,73 @@ async def _call_tool_request(req: types.CallToolRequest) -> types.ServerResult:
     match req.params.name:
         # =============== RECOMMENDATIONS — ONLY DATA, NO WIDGET ===============
         case "Restaurant-recomm":
-            cuisine = arguments.get("cuisine", "Japanese")
-            city = arguments.get("city", "New York")
-            state = arguments.get("state", "NY")
+            try:
+                request = RestaurantRecommend.model_validate(arguments)
+            except ValidationError as e:
+                return types.ServerResult(
+                    types.CallToolResult(
+                        content=[types.TextContent(type="text", text=f"Invalid request: {_validation_message(e)}")],
+                        isError=True,
+                    )
+                )
+            latitude, longitude, radius = request.latitude, request.longitude, request.radius_miles
+            near = latitude is not None or longitude is not None
+            sort = request.sort
+            if near:
+                cuisine = request.cuisine or ""
+                # Built from the validated floats, so "33.4" and 33.4 share an entry.
+                fingerprint = query_fingerprint(
+                    "near", repr(latitude), repr(longitude), repr(radius), cuisine.lower()
+                )
+            else:
+                # An explicit null means the same as leaving the argument out.
+                cuisine = request.cuisine or "Japanese"
+                city = request.city or "New York"
+                state = request.state or "NY"
+                fingerprint = query_fingerprint(city, state, cuisine.lower(), sort)
+
+            distances: Dict[str, float] = {}
+            try:
+                limit = page_size(request.limit)
+                offset = decode_cursor(request.cursor, fingerprint) if request.cursor else 0
+                cache_key = (fingerprint, offset, limit)
+                catalog = CATALOG.current
+                cached = RECOMMENDATION_CACHE.get(cache_key, catalog.version)
+                if cached is not None:
+                    return cached
+                if near:
+                    if latitude is None or longitude is None:
+                        raise InvalidCoordinatesError("latitude and longitude must be given together")
+                    # One venue past the page says whether another page exists
+                    # without decoding every venue in a large radius.
+                    nearby = catalog.nearby(latitude, longitude, radius, offset + limit + 1, cuisine or None)
+                    matches = [r for _, r in nearby]
+                    distances = {r.restaurant_id: round(distance, 2) for distance, r in nearby}
+                else:
+                    matches = catalog.search(city, state, cuisine, sort)
+            except (InvalidPageError, UnknownSortError, InvalidCoordinatesError) as e:
+                return types.ServerResult(
+                    types.CallToolResult(
+                        content=[types.TextContent(type="text", text=str(e))],
+                        isError=True,
+                    )
+                )
 
-            results = [
-                rest for rest in RESTAURANTS
-                if rest["city"] == city and rest["state"] == state and rest["cuisine"].lower() == cuisine.lower()
-            ]
+            # Matches are presorted by the catalog, so a page is just a slice.
+            results = matches[offset:offset + limit]
+            next_offset = offset + len(results)
+            next_cursor = encode_cursor(next_offset, fingerprint) if next_offset < len(matches) else None
 
             structured_content = {
-                "restaurants": [
-                    {
-                        "restaurant_id": r["restaurant_id"],
-                        "name": r["name"],
-                        "description": r["description"],
-                        "street": r["street"],
-                        "city": r["city"],
-                        "state": r["state"],
-                        "cuisine": r["cuisine"],
-                        "price_range": r["$$"],
-                        "rating": r["rating"],
-                        "image": r["image"],
-                        "book_action": {
-                            "type": "tool_call",
-                            "tool_name": "Restaurant-booking",
-                            "parameters": {
-                                "restaurant_id": r["restaurant_id"]
-                            }
-                        }
-                    }
-                    for r in results
-                ]
+                "restaurants": [restaurant_card(r) for r in results],
+                "total": None if near else len(matches),
+                "next_cursor": next_cursor,
             }
+            if near:
+                for card in structured_content["restaurants"]:
+                    card["distance_miles"] = distances[card["restaurant_id"]]
 
-            return types.ServerResult(
+            result = types.ServerResult(
                 types.CallToolResult(
                     content=[
                         types.TextContent(
@@ -654,11 +1003,72 @@ async def _call_tool_request(req: types.CallToolRequest) -> types.ServerResult:
                     structuredContent=structured_content,
                 )
             )
+            RECOMMENDATION_CACHE.put(cache_key, catalog.version, result)
+            return result
+
+        # ================= FREE-TEXT SEARCH — ONLY DATA, NO WIDGET =================
+        case "Restaurant-search":
+            try:
+                request = RestaurantSearch.model_validate(arguments)
+            except ValidationError as e:
+                return types.ServerResult(
+                    types.CallToolResult(
+                        content=[types.TextContent(type="text", text=f"Invalid request: {_validation_message(e)}")],
+                        isError=True,
+                    )
+                )
+            query = " ".join(tokenize(request.query))
+            fingerprint = query_fingerprint("search", query)
+            try:
+                if not query:
+                    raise ValueError("query must contain at least one word to search for")
+                limit = page_size(request.limit)
+                offset = decode_cursor(request.cursor, fingerprint) if request.cursor else 0
+            except ValueError as e:
+                # InvalidPageError is a ValueError.
+                return types.ServerResult(
+                    types.CallToolResult(
+                        content=[types.TextContent(type="text", text=str(e))],
+                        isError=True,
+                    )
+                )
+
+            # One hit past the page says whether another page exists.
+            hits = TEXT_INDEX.search(query, offset + limit + 1)
+            page = [restaurant_id for _, restaurant_id in hits[offset:offset + limit]]
+            # Mid-reload the index can briefly name venues the catalog no longer has.
+            found = CATALOG.current.get_many(page)
+            results = [found[restaurant_id] for restaurant_id in page if restaurant_id in found]
+            next_offset = offset + len(page)
+            next_cursor = encode_cursor(next_offset, fingerprint) if next_offset < len(hits) else None
+            return types.ServerResult(
+                types.CallToolResult(
+                    content=[
+                        types.TextContent(
+                            type="text",
+                            text="Here are the restaurants that best match the search. Tap “Book” on any card to make a reservation. Always display restaurant images."
+                            if results else f"No restaurants match “{request.query}”.",
+                        )
+                    ],
+                    structuredContent={
+                        "restaurants": [restaurant_card(r) for r in results],
+                        "next_cursor": next_cursor,
+                    },
+                )
+            )
 
         # ========================= BOOKING — WITH WIDGET =========================
         case "Restaurant-booking":
-            target_id = arguments.get("restaurant_id")
-            restaurant = find_restaurant_by_id(target_id)
+            try:
+                request = RestaurantBooking.model_validate(arguments)
+            except ValidationError as e:
+                return types.ServerResult(
+                    types.CallToolResult(
+                        content=[types.TextContent(type="text", text=f"Invalid request: {_validation_message(e)}")],
+                        isError=True,
+                    )
+                )
+            restaurant = find_restaurant_by_id(request.restaurant_id)
             if not restaurant:
                 return types.ServerResult(
                     types.CallToolResult(
@@ -667,11 +1077,19 @@ async def _call_tool_request(req: types.CallToolRequest) -> types.ServerResult:
                     )
                 )
 
-            # Embed the actual widget HTML
-            widget_resource = _embedded_widget_resource(widget)
+            try:
+                availability = await availability_window(restaurant, arguments)
+            except InvalidAvailabilityError as e:
+                return types.ServerResult(
+                    types.CallToolResult(
+                        content=[types.TextContent(type="text", text=str(e))],
+                        isError=True,
+                    )
+                )
+            restaurant_data = restaurant.to_dict()
+            restaurant_data["availability"] = availability
 
             meta = {
-                "openai.com/widget": widget_resource,
                 "openai/outputTemplate": widget.template_uri,
                 "openai/toolInvocation/invoking": widget.invoking,
                 "openai/toolInvocation/invoked": widget.invoked,
@@ -679,6 +1097,19 @@ async def _call_tool_request(req: types.CallToolRequest) -> types.ServerResult:
                 "openai/resultCanProduceWidget": True,
             }
 
+            # Embed the actual widget HTML, or only reference it by URI and hash so
+            # the client fetches it once through resources/read and caches it.
+            # Without assets the client falls back to fetching outputTemplate.
+            try:
+                asset = await ASSET_LOADER.get(widget.identifier)
+                meta["widgetVersion"] = asset.content_hash
+                if EMBED_WIDGET_HTML:
+                    meta["openai.com/widget"] = _embedded_widget_resource(widget, asset)
+            except AssetUnavailableError as e:
+                log.warning(
+                    "widget assets unavailable", extra={"widget": widget.identifier, "error": str(e)}
+                )
+
             return types.ServerResult(
                 types.CallToolResult(
                     _meta=meta,
@@ -688,7 +1119,126 @@ async def _call_tool_request(req: types.CallToolRequest) -> types.ServerResult:
                             text="Do not add any commentary, prefatory text, or explanations. Once tool output is displayed, do not add any more text on the chat",
                         )
                     ],
-                    structuredContent={"restaurant": restaurant},  # optional extra data
+                    structuredContent={"restaurant": restaurant_data},  # optional extra data
+                )
+            )
+
+        # ============== AVAILABILITY — MANY RESTAURANTS, ONE CALL ==============
+        case "Restaurant-availability":
+            try:
+                request = RestaurantAvailability.model_validate(arguments)
+                window = parse_window(arguments)
+            except ValidationError as e:
+                return types.ServerResult(
+                    types.CallToolResult(
+                        content=[types.TextContent(type="text", text=f"Invalid request: {_validation_message(e)}")],
+                        isError=True,
+                    )
+                )
+            except InvalidAvailabilityError as e:
+                return types.ServerResult(
+                    types.CallToolResult(
+                        content=[types.TextContent(type="text", text=str(e))],
+                        isError=True,
+                    )
+                )
+
+            # One catalog and one reservation-book lookup for the whole batch.
+            restaurant_ids = list(dict.fromkeys(request.restaurant_ids))
+            found = CATALOG.current.get_many(restaurant_ids)
+            full = await RESERVATIONS.full_slots_many_async(found)
+            availability = {
+                restaurant_id: open_slots(restaurant, window, full.get(restaurant_id, set()))
+                for restaurant_id, restaurant in found.items()
+            }
+            not_found = [restaurant_id for restaurant_id in restaurant_ids if restaurant_id not in found]
+            return types.ServerResult(
+                types.CallToolResult(
+                    content=[
+                        types.TextContent(
+                            type="text",
+                            text=f"Open slots for {len(availability)} restaurants.",
+                        )
+                    ],
+                    structuredContent={
+                        "availability": {
+                            restaurant_id: availability[restaurant_id]
+                            for restaurant_id in restaurant_ids
+                            if restaurant_id in availability
+                        },
+                        "not_found": not_found,
+                    },
+                )
+            )
+
+        # ===================== RESERVATION — CLAIMS A SLOT =====================
+        case "book_reservation":
+            try:
+                request = ReservationRequest.model_validate(arguments)
+                restaurant = find_restaurant_by_id(request.restaurant_id)
+                if not restaurant:
+                    raise LookupError("Restaurant not found.")
+                day = parse_date(request.date)
+                minute = parse_time(request.time)
+                if day < date.today():
+                    raise ValueError(f"{request.date} is in the past; choose a date from today on.")
+                if not restaurant.availability.has_slot(day, minute):
+                    raise LookupError(
+                        f"{restaurant.name} has no slot at {request.time} on {request.date}."
+                    )
+                reservation, seats_remaining = await RESERVATIONS.claim_async(
+                    restaurant.restaurant_id, day, minute, request.party_size
+                )
+            except ValidationError as e:
+                return types.ServerResult(
+                    types.CallToolResult(
+                        content=[types.TextContent(type="text", text=f"Invalid reservation: {_validation_message(e)}")],
+                        isError=True,
+                    )
+                )
+            except (LookupError, ValueError, SlotFullError) as e:
+                # InvalidAvailabilityError is a ValueError.
+                return types.ServerResult(
+                    types.CallToolResult(
+                        content=[types.TextContent(type="text", text=str(e))],
+                        isError=True,
+                    )
+                )
+            except sqlite3.OperationalError:
+                # Another worker held the write lock past the busy timeout; nothing was booked.
+                log.warning("reservation store busy", extra={"restaurant_id": arguments.get("restaurant_id")})
+                return types.ServerResult(
+                    types.CallToolResult(
+                        content=[types.TextContent(
+                            type="text",
+                            text="The reservation system is busy and nothing was booked. Please try again.",
+                        )],
+                        isError=True,
+                    )
+                )
+
+            log.info(
+                "reservation booked",
+                extra={
+                    "reservation_id": reservation.reservation_id,
+                    "restaurant_id": reservation.restaurant_id,
+                    "party_size": reservation.party_size,
+                },
+            )
+            reservation_data = reservation.to_dict()
+            reservation_data["restaurant_name"] = restaurant.name
+            # From the claim itself; a later read could include other callers' seats.
+            reservation_data["seats_remaining"] = seats_remaining
+            return types.ServerResult(
+                types.CallToolResult(
+                    content=[
+                        types.TextContent(
+                            type="text",
+                            text=f"Reserved a table for {reservation.party_size} at {restaurant.name} "
+                            f"on {reservation_data['date']} at {reservation_data['time']}.",
+                        )
+                    ],
+                    structuredContent={"reservation": reservation_data},
                 )
             )
 
@@ -700,14 +1250,106 @@ async def _call_tool_request(req: types.CallToolRequest) -> types.ServerResult:
                 )
             )
 
-mcp._mcp_server.request_handlers[types.CallToolRequest] = _call_tool_request
-mcp._mcp_server.request_handlers[types.ReadResourceRequest] = _handle_read_resource
+def _tool_label(req: types.CallToolRequest) -> str:
+    # Bounded label set: arbitrary client-supplied names share one series.
+    return req.params.name if req.params.name in WIDGETS_BY_ID else "unknown"
+
+
+mcp._mcp_server.request_handlers[types.CallToolRequest] = timed_mcp_handler(
+    "tools/call", _call_tool_request, _tool_label
+)
+mcp._mcp_server.request_handlers[types.ReadResourceRequest] = timed_mcp_handler(
+    "resources/read", _handle_read_resource
+)
+mcp._mcp_server.request_handlers[types.ListToolsRequest] = timed_mcp_handler(
+    "tools/list", _handle_list_request
+)
+mcp._mcp_server.request_handlers[types.ListResourcesRequest] = timed_mcp_handler(
+    "resources/list", _handle_list_request
+)
+mcp._mcp_server.request_handlers[types.ListResourceTemplatesRequest] = timed_mcp_handler(
+    "resources/templates/list", _handle_list_request
+)
+
+REGISTRY.register_stats(
+    "recommendation_cache", "Restaurant-recomm result cache", RECOMMENDATION_CACHE.stats,
+    counters=("hits", "misses", "evictions", "expirations", "invalidations"),
+)
+REGISTRY.register_stats(
+    "widget_assets", "Rendered widget HTML shells", ASSET_LOADER.stats,
+    counters=("hits", "loads", "failures", "fast_failures"),
+)
+REGISTRY.register_stats(
+    "reservations", "Reservation slot claims", RESERVATIONS.stats,
+    counters=("claimed", "rejected"),
+)
+REGISTRY.register_stats(
+    "catalog", "Published restaurant catalog", CATALOG.stats,
+    counters=("reloads", "reload_failures"),
+)
+REGISTRY.register_stats(
+    "text_index", "Restaurant-search inverted index", TEXT_INDEX.stats,
+    counters=("syncs",),
+)
+
+# Bearer token for /admin routes; they answer 404 when it is not set.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+@rest_api.post("/admin/catalog/reload")
+async def reload_catalog(request: Request):
+    """Rebuild the catalog from CATALOG_PATH and publish it to this worker."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("authorization", "").removeprefix("Bearer ")
+    if not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    if not CATALOG.path:
+        raise HTTPException(status_code=409, detail="CATALOG_PATH is not set; nothing to reload")
+    try:
+        await CATALOG.reload()
+    except (CatalogReloadError, OSError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Catalog reload failed: {e}")
+    return CATALOG.stats()
 
 mcp_app = mcp.streamable_http_app()
+_mcp_lifespan = mcp_app.router.lifespan_context
+
+@asynccontextmanager
+async def _lifespan(app):
+    # Here and in __main__ rather than at import, so importing this module
+    # from tests or another app leaves their logging handlers in place.
+    configure_logging()
+    await ASSET_LOADER.preload()
+    watcher = None
+    if CATALOG_WATCH_INTERVAL > 0 and CATALOG.path:
+        watcher = asyncio.create_task(CATALOG.watch(CATALOG_WATCH_INTERVAL))
+    try:
+        async with _mcp_lifespan(app):
+            yield
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        CATALOG.close()
+        await ASSET_LOADER.fetcher.aclose()
+        await MAIL_DELIVERY.stop()
+
+mcp_app.router.lifespan_context = _lifespan
 mcp_app.mount("/", rest_api, name="rest_api_server")
 
 if __name__ == "__main__":
     import uvicorn
-    # To run this server, execute: python server.py
-    # or uvicorn server:app --reload
-    uvicorn.run(mcp_app, host="0.0.0.0", port=8000)
+    # To run this server, execute: python main.py
+    # or uvicorn main:mcp_app --workers N with the shared stores below.
+    configure_logging()
+    workers = int(os.getenv("WORKERS", "1"))
+    if workers > 1:
+        # Auth state and reservations must be visible to every worker; each
+        # worker imports this module afresh and picks these settings up from
+        # the environment.
+        for name in ("EPHEMERAL_STORE", "USER_STORE", "RESERVATION_STORE"):
+            if os.getenv(name, "sqlite") != "sqlite":
+                raise SystemExit(f"{name}={os.getenv(name)} cannot be shared by {workers} workers; use sqlite")
+            os.environ[name] = "sqlite"
+        uvicorn.run("main:mcp_app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run(mcp_app, host="0.0.0.0", port=8000)
@@ -0,0 +1,262 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Counters and histograms are plain dicts keyed by label values, so recording
+a sample costs a dict lookup, a ``bisect`` and a couple of additions. They
+are updated from the event loop only, which keeps them lock-free. Sizes and
+hit counts that components already track in their ``stats()`` methods are
+read at scrape time through ``register_stats`` instead of being
+double-counted on the hot path. ``render_async`` reads the ones registered
+as ``blocking`` (SQLite-backed stores) on a worker thread.
+
+``REGISTRY`` is shared by ``server`` (REST routes, auth stores) and
+``main`` (MCP methods, widget and recommendation caches); ``server``
+serves it at ``/metrics`` to requests bearing ``METRICS_TOKEN``."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labelvalues, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labelvalues, series in self._series.items():
+            cumulative = 0
+            for bound, observed in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += observed
+                labels = _labels(self.labelnames, labelvalues, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {_number(series[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+StatsFn = Callable[[], Mapping[str, object]]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[object] = []
+        self._stats: List[Tuple[str, str, StatsFn, Optional[str], frozenset, bool]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_stats(
+        self,
+        prefix: str,
+        documentation: str,
+        stats: StatsFn,
+        label: Optional[str] = None,
+        counters: Iterable[str] = (),
+        blocking: bool = False,
+    ) -> None:
+        """Export a ``stats()`` dict at scrape time.
+
+        Each field becomes ``<prefix>_<field>``; fields named in ``counters``
+        are monotonic and exported as ``<prefix>_<field>_total``. With
+        ``label``, ``stats`` returns ``{label_value: {field: value}}``.
+        ``blocking`` stats may wait on disk or on other processes, so
+        ``render_async`` calls them off the event loop."""
+        self._stats.append((prefix, documentation, stats, label, frozenset(counters), blocking))
+
+    def _render_stats(self, collected: Sequence[Mapping[str, object]]) -> Iterable[str]:
+        for (prefix, documentation, _, label, counters, _), rows in zip(self._stats, collected):
+            series: Dict[str, List[Tuple[str, object]]] = {}
+            for key, value in rows.items():
+                fields = value if label else {key: value}
+                labels = _labels((label,), (key,)) if label else ""
+                for field, number in fields.items():
+                    if isinstance(number, (int, float)) and not isinstance(number, bool):
+                        series.setdefault(field, []).append((labels, number))
+            for field, samples in series.items():
+                kind = "counter" if field in counters else "gauge"
+                name = f"{prefix}_{field}" + ("_total" if kind == "counter" else "")
+                yield f"# HELP {name} {documentation}: {field.replace('_', ' ')}"
+                yield f"# TYPE {name} {kind}"
+                for labels, number in samples:
+                    yield f"{name}{labels} {_number(number)}"
+
+    def _render(self, collected: Sequence[Mapping[str, object]]) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        lines.extend(self._render_stats(collected))
+        return "\n".join(lines) + "\n"
+
+    def render(self) -> str:
+        return self._render([entry[2]() for entry in self._stats])
+
+    async def render_async(self) -> str:
+        """``render`` for the event loop: blocking stats are read on one worker thread."""
+        blocking = [entry[2] for entry in self._stats if entry[5]]
+        offloaded = iter(await asyncio.to_thread(lambda: [stats() for stats in blocking]))
+        return self._render([next(offloaded) if entry[5] else entry[2]() for entry in self._stats])
+
+
+REGISTRY = MetricsRegistry()
+
+MCP_REQUEST_SECONDS = REGISTRY.histogram(
+    "mcp_request_duration_seconds",
+    "MCP request handling time by method and tool",
+    ("method", "tool"),
+)
+MCP_REQUEST_ERRORS = REGISTRY.counter(
+    "mcp_request_errors_total",
+    "MCP requests that raised or returned an error result",
+    ("method", "tool"),
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "REST request handling time by route template",
+    ("method", "route", "status"),
+)
+HTTP_REQUEST_ERRORS = REGISTRY.counter(
+    "http_request_errors_total",
+    "REST requests answered with a 5xx status or an unhandled exception",
+    ("method", "route"),
+)
+
+
+def timed_mcp_handler(method: str, handler, tool_of: Optional[Callable[[object], str]] = None):
+    """Wrap a low-level MCP request handler to record latency and errors.
+
+    ``tool_of`` maps a request to the tool label (``tools/call`` only)."""
+
+    async def timed(req):
+        tool = tool_of(req) if tool_of is not None else ""
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await handler(req)
+            failed = bool(getattr(result.root, "isError", False))
+            return result
+        finally:
+            MCP_REQUEST_SECONDS.observe(time.perf_counter() - start, method, tool)
+            if failed:
+                MCP_REQUEST_ERRORS.inc(method, tool)
+
+    return timed
+
+
+class HTTPMetricsMiddleware:
+    """ASGI middleware timing each request under its route template.
+
+    Mounted apps are labelled with their mount path, taken from the
+    ``root_path`` the mount adds to the scope. Requests that match no route
+    share the ``unmatched`` label, so scanning clients cannot blow up the
+    number of series."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+        root_path = scope.get("root_path", "")
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            if not route:
+                mount_path = scope.get("root_path", "")[len(root_path):]
+                route = mount_path or "unmatched"
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method, route, str(status))
+            if status >= 500:
+                HTTP_REQUEST_ERRORS.inc(method, route)
@@ -0,0 +1,73 @@
+"""Run CPU-bound work off the asyncio event loop with a bounded backlog.
+
+WebAuthn attestation and signature checks are pure CPU work. Run inline in
+an async handler they stall every other request served by the same loop,
+including MCP tool calls. ``OffloadPool`` hands such calls to a thread or
+process pool and refuses new work once ``max_pending`` calls are queued or
+running, so a login storm turns into fast overload errors instead of
+unbounded latency for everyone."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+EXECUTOR_KINDS = ("thread", "process", "inline")
+
+
+class PoolOverloadedError(RuntimeError):
+    """Raised when the pool already has ``max_pending`` calls outstanding."""
+
+
+class OffloadPool:
+    """Bounded front for a thread or process pool.
+
+    ``kind="inline"`` runs calls directly on the event loop, which is only
+    useful as a baseline for benchmarks. Process pools need picklable
+    functions and arguments."""
+
+    def __init__(self, kind: str = "thread", workers: Optional[int] = None, max_pending: int = 64):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind {kind!r}, expected one of {EXECUTOR_KINDS}")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="offload"
+                )
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PoolOverloadedError(
+                f"{self.pending} calls already pending (limit {self.max_pending})"
+            )
+        self.pending += 1
+        try:
+            if self.kind == "inline":
+                return fn(*args, **kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), partial(fn, *args, **kwargs))
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending": self.pending, "max_pending": self.max_pending, "rejected": self.rejected}
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
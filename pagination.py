@@ -0,0 +1,51 @@
+"""Opaque continuation cursors for paginated tool results.
+
+A cursor records the offset of the next page together with a fingerprint
+of the query that produced it, so a cursor handed back with different
+search arguments is rejected instead of silently paging a different list."""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+
+
+class InvalidPageError(ValueError):
+    """Raised for a malformed cursor, a cursor from another query or a bad limit."""
+
+
+def query_fingerprint(*parts: str) -> str:
+    digest = hashlib.blake2b("\x1f".join(parts).encode(), digest_size=8)
+    return digest.hexdigest()
+
+
+def encode_cursor(offset: int, fingerprint: str) -> str:
+    payload = json.dumps([offset, fingerprint], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> int:
+    """Return the offset stored in ``cursor`` for the query ``fingerprint``."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset, cursor_fingerprint = json.loads(base64.urlsafe_b64decode(padded))
+    except (TypeError, ValueError):
+        raise InvalidPageError("Malformed cursor") from None
+    if cursor_fingerprint != fingerprint or not isinstance(offset, int) or offset < 0:
+        raise InvalidPageError("Cursor does not match this query")
+    return offset
+
+
+def page_size(limit: object) -> int:
+    """Clamp a requested ``limit`` into ``1..MAX_PAGE_SIZE``."""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(limit)
+    except (TypeError, ValueError):
+        raise InvalidPageError(f"Invalid limit {limit!r}") from None
+    return max(1, min(size, MAX_PAGE_SIZE))
@@ -0,0 +1,124 @@
+"""Compact in-memory representation of restaurant catalog rows.
+
+Catalog rows arrive as plain dicts (see ``main.RESTAURANTS``) where every
+venue repeats the same string keys and keeps its availability as nested
+dicts of date strings mapped to lists of time strings. ``Restaurant`` stores
+the same data in a ``__slots__`` object with interned city, state and cuisine
+strings, numeric rating and price columns, optional ``latitude`` and
+``longitude``, and availability parsed into an ``availability.Availability``
+integer index. ``Restaurant.to_dict`` rebuilds the original row shape for
+tool responses."""
+
+from __future__ import annotations
+
+import sys
+
+from availability import Availability
+from geo import InvalidCoordinatesError, validate_coordinates
+
+
+class Restaurant:
+    """A single catalog venue."""
+
+    __slots__ = (
+        "restaurant_id",
+        "name",
+        "description",
+        "cuisine",
+        "price_level",
+        "rating",
+        "image",
+        "street",
+        "city",
+        "state",
+        "availability",
+        "latitude",
+        "longitude",
+    )
+
+    def __init__(
+        self,
+        restaurant_id: str,
+        name: str,
+        description: str,
+        cuisine: str,
+        price_level: int,
+        rating: float,
+        image: str,
+        street: str,
+        city: str,
+        state: str,
+        availability: Availability,
+        latitude: float | None = None,
+        longitude: float | None = None,
+    ):
+        self.restaurant_id = restaurant_id
+        self.name = name
+        self.description = description
+        self.cuisine = sys.intern(cuisine)
+        self.price_level = price_level
+        self.rating = rating
+        self.image = image
+        self.street = sys.intern(street)
+        self.city = sys.intern(city)
+        self.state = sys.intern(state)
+        self.availability = availability
+        self.latitude = latitude
+        self.longitude = longitude
+
+    @classmethod
+    def from_dict(cls, row: dict) -> Restaurant:
+        latitude, longitude = row.get("latitude"), row.get("longitude")
+        if (latitude is None) != (longitude is None):
+            raise InvalidCoordinatesError(
+                f"Restaurant {row.get('restaurant_id')!r} needs both latitude and longitude, or neither"
+            )
+        if latitude is not None:
+            latitude, longitude = float(latitude), float(longitude)
+            validate_coordinates(latitude, longitude)
+        return cls(
+            restaurant_id=row["restaurant_id"],
+            name=row["name"],
+            description=row["description"],
+            cuisine=row["cuisine"],
+            price_level=len(row["$$"]),
+            rating=float(row["rating"]),
+            image=row["image"],
+            street=row["street"],
+            city=row["city"],
+            state=row["state"],
+            availability=Availability.from_dict(row.get("availability", {})),
+            latitude=latitude,
+            longitude=longitude,
+        )
+
+    @property
+    def price_range(self) -> str:
+        return "$" * self.price_level
+
+    @property
+    def has_location(self) -> bool:
+        return self.latitude is not None
+
+    def to_dict(self) -> dict:
+        """Rebuild the original catalog row shape."""
+        row = {
+            "restaurant_id": self.restaurant_id,
+            "name": self.name,
+            "description": self.description,
+            "cuisine": self.cuisine,
+            "$$": self.price_range,
+            "rating": self.rating,
+            "image": self.image,
+            "street": self.street,
+            "city": self.city,
+            "state": self.state,
+            "availability": self.availability.to_dict(),
+        }
+        if self.has_location:
+            row["latitude"] = self.latitude
+            row["longitude"] = self.longitude
+        return row
+
+    def __repr__(self) -> str:
+        return f"Restaurant({self.restaurant_id!r}, {self.name!r})"
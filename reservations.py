@@ -0,0 +1,310 @@
+"""Seat inventory for reservation slots, claimed atomically.
+
+Every (restaurant, date, time) slot in a restaurant's availability seats
+``seats_per_slot`` guests. ``claim`` either books the whole party into the
+slot, returning the reservation and the seats it left free, or raises
+``SlotFullError``; two callers can never both take the last seats.
+
+``MemoryReservationBook`` guards the seat counts with one lock; a claim
+holds it for a dict lookup and an addition, so splitting it by restaurant
+buys nothing under the GIL (the stress benchmark measured no gain from 64
+shards). ``SQLiteReservationBook`` keeps the same data in a SQLite file that
+every worker process opens; a claim is one conditional upsert that adds
+the party only while the slot has room, and it commits together with the
+reservation row. Pick one with ``create_reservation_book`` and
+``RESERVATION_STORE``.
+
+The methods themselves block, so benchmarks and scripts can call them from
+threads or processes. Async code uses the ``*_async`` variants, which run
+the SQLite book's queries on worker threads: a claim that waits for
+another process's write lock must not stall the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from availability import format_date, format_time
+
+SlotKey = Tuple[int, int]  # date ordinal, minute of day
+Claim = Tuple["Reservation", int]  # the reservation, seats left in its slot right after it
+
+
+class SlotFullError(Exception):
+    """Raised when a slot has fewer free seats than the party needs."""
+
+    def __init__(self, remaining: int):
+        if remaining > 0:
+            super().__init__(f"Only {remaining} seats left in this slot")
+        else:
+            super().__init__("This slot is fully booked")
+        self.remaining = remaining
+
+
+@dataclass(frozen=True)
+class Reservation:
+    reservation_id: str
+    restaurant_id: str
+    day: date
+    minute: int
+    party_size: int
+    created_at: float
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["date"] = format_date(data.pop("day"))
+        data["time"] = format_time(data.pop("minute"))
+        return data
+
+
+def _new_reservation(restaurant_id: str, day: date, minute: int, party_size: int) -> Reservation:
+    return Reservation(uuid.uuid4().hex, restaurant_id, day, minute, party_size, time.time())
+
+
+class ReservationBook(ABC):
+    """Interface shared by the memory and SQLite books."""
+
+    def __init__(self, seats_per_slot: int):
+        if seats_per_slot < 1:
+            raise ValueError("seats_per_slot must be at least 1")
+        self.seats_per_slot = seats_per_slot
+        self.claimed = 0
+        self.rejected = 0
+        # Claims run on several threads at once, so the counters need their own lock.
+        self._counts_lock = threading.Lock()
+
+    @abstractmethod
+    def claim(self, restaurant_id: str, day: date, minute: int, party_size: int) -> Claim:
+        ...
+
+    @abstractmethod
+    def remaining(self, restaurant_id: str, day: date, minute: int) -> int:
+        ...
+
+    def full_slots(self, restaurant_id: str) -> Set[Tuple[date, int]]:
+        """Slots at ``restaurant_id`` with no seats left."""
+        return self.full_slots_many([restaurant_id]).get(restaurant_id, set())
+
+    @abstractmethod
+    def full_slots_many(self, restaurant_ids: Iterable[str]) -> Dict[str, Set[Tuple[date, int]]]:
+        """``full_slots`` for several restaurants; ids with none are omitted."""
+
+    @abstractmethod
+    def get(self, reservation_id: str) -> Optional[Reservation]:
+        ...
+
+    def _check_party(self, party_size: int) -> None:
+        if party_size < 1:
+            raise ValueError("party_size must be at least 1")
+        if party_size > self.seats_per_slot:
+            raise ValueError(f"Parties larger than {self.seats_per_slot} cannot be booked into one slot")
+
+    def _count(self, claimed: bool) -> None:
+        with self._counts_lock:
+            if claimed:
+                self.claimed += 1
+            else:
+                self.rejected += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"claimed": self.claimed, "rejected": self.rejected}
+
+    # True when calls can wait on disk or on another process's lock.
+    blocking = False
+
+    async def _run(self, method: Callable[..., Any], *args: Any) -> Any:
+        if self.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def claim_async(self, restaurant_id: str, day: date, minute: int, party_size: int) -> Claim:
+        return await self._run(self.claim, restaurant_id, day, minute, party_size)
+
+    async def full_slots_async(self, restaurant_id: str) -> Set[Tuple[date, int]]:
+        return await self._run(self.full_slots, restaurant_id)
+
+    async def full_slots_many_async(self, restaurant_ids: Iterable[str]) -> Dict[str, Set[Tuple[date, int]]]:
+        return await self._run(self.full_slots_many, list(restaurant_ids))
+
+
+class MemoryReservationBook(ReservationBook):
+    def __init__(self, seats_per_slot: int):
+        super().__init__(seats_per_slot)
+        # Guards _taken, _reservations and, for this book, the claimed/rejected counters too.
+        self._lock = threading.Lock()
+        # restaurant_id -> seats taken per slot.
+        self._taken: Dict[str, Dict[SlotKey, int]] = {}
+        self._reservations: Dict[str, Reservation] = {}
+
+    def claim(self, restaurant_id: str, day: date, minute: int, party_size: int) -> Claim:
+        self._check_party(party_size)
+        key = (day.toordinal(), minute)
+        with self._lock:
+            slots = self._taken.setdefault(restaurant_id, {})
+            taken = slots.get(key, 0)
+            if taken + party_size > self.seats_per_slot:
+                self.rejected += 1
+                raise SlotFullError(self.seats_per_slot - taken)
+            taken += party_size
+            slots[key] = taken
+            reservation = _new_reservation(restaurant_id, day, minute, party_size)
+            self._reservations[reservation.reservation_id] = reservation
+            self.claimed += 1
+        return reservation, self.seats_per_slot - taken
+
+    def remaining(self, restaurant_id: str, day: date, minute: int) -> int:
+        slots = self._taken.get(restaurant_id, {})
+        return self.seats_per_slot - slots.get((day.toordinal(), minute), 0)
+
+    def full_slots_many(self, restaurant_ids: Iterable[str]) -> Dict[str, Set[Tuple[date, int]]]:
+        full: Dict[str, Set[Tuple[date, int]]] = {}
+        for restaurant_id in restaurant_ids:
+            slots = self._taken.get(restaurant_id)
+            if not slots:
+                continue
+            with self._lock:
+                booked_out = {
+                    (date.fromordinal(ordinal), minute)
+                    for (ordinal, minute), taken in slots.items()
+                    if taken >= self.seats_per_slot
+                }
+            if booked_out:
+                full[restaurant_id] = booked_out
+        return full
+
+    def get(self, reservation_id: str) -> Optional[Reservation]:
+        return self._reservations.get(reservation_id)
+
+
+class SQLiteReservationBook(ReservationBook):
+    """Seat counts and reservations in a SQLite file shared by workers.
+
+    Unlike the ephemeral auth stores this is durable data, so the file runs
+    with ``synchronous=NORMAL``. SQLite admits one writer at a time; a claim
+    holds the write lock only for its two statements. A claim that cannot
+    get the lock within ``busy_timeout`` raises ``sqlite3.OperationalError``
+    and can be retried."""
+
+    blocking = True
+
+    def __init__(self, path: str, seats_per_slot: int, busy_timeout: float = 5.0):
+        super().__init__(seats_per_slot)
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        connection = self._connect()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS reservation_slots ("
+            "restaurant_id TEXT NOT NULL, day INTEGER NOT NULL, minute INTEGER NOT NULL, "
+            "taken INTEGER NOT NULL, PRIMARY KEY (restaurant_id, day, minute))"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS reservations ("
+            "reservation_id TEXT PRIMARY KEY, restaurant_id TEXT NOT NULL, day INTEGER NOT NULL, "
+            "minute INTEGER NOT NULL, party_size INTEGER NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def claim(self, restaurant_id: str, day: date, minute: int, party_size: int) -> Claim:
+        self._check_party(party_size)
+        reservation = _new_reservation(restaurant_id, day, minute, party_size)
+        ordinal = day.toordinal()
+        connection = self._connect()
+        # IMMEDIATE takes the write lock up front, so the seat check and the
+        # insert cannot interleave with another process's claim.
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            booked = connection.execute(
+                "INSERT INTO reservation_slots(restaurant_id, day, minute, taken) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(restaurant_id, day, minute) DO UPDATE SET taken = taken + excluded.taken "
+                "WHERE taken + excluded.taken <= ? RETURNING taken",
+                (restaurant_id, ordinal, minute, party_size, self.seats_per_slot),
+            ).fetchall()
+            if not booked:
+                connection.execute("ROLLBACK")
+                self._count(claimed=False)
+                raise SlotFullError(self.remaining(restaurant_id, day, minute))
+            connection.execute(
+                "INSERT INTO reservations VALUES (?, ?, ?, ?, ?, ?)",
+                (reservation.reservation_id, restaurant_id, ordinal, minute, party_size,
+                 reservation.created_at),
+            )
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+        self._count(claimed=True)
+        return reservation, self.seats_per_slot - booked[0][0]
+
+    def remaining(self, restaurant_id: str, day: date, minute: int) -> int:
+        row = self._connect().execute(
+            "SELECT taken FROM reservation_slots WHERE restaurant_id = ? AND day = ? AND minute = ?",
+            (restaurant_id, day.toordinal(), minute),
+        ).fetchone()
+        return self.seats_per_slot - (row[0] if row else 0)
+
+    def full_slots_many(self, restaurant_ids: Iterable[str]) -> Dict[str, Set[Tuple[date, int]]]:
+        restaurant_ids = list(dict.fromkeys(restaurant_ids))
+        if not restaurant_ids:
+            return {}
+        rows = self._connect().execute(
+            "SELECT restaurant_id, day, minute FROM reservation_slots "
+            f"WHERE restaurant_id IN ({', '.join('?' * len(restaurant_ids))}) AND taken >= ?",
+            (*restaurant_ids, self.seats_per_slot),
+        ).fetchall()
+        full: Dict[str, Set[Tuple[date, int]]] = {}
+        for restaurant_id, ordinal, minute in rows:
+            full.setdefault(restaurant_id, set()).add((date.fromordinal(ordinal), minute))
+        return full
+
+    def get(self, reservation_id: str) -> Optional[Reservation]:
+        row = self._connect().execute(
+            "SELECT reservation_id, restaurant_id, day, minute, party_size, created_at "
+            "FROM reservations WHERE reservation_id = ?",
+            (reservation_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        reservation_id, restaurant_id, ordinal, minute, party_size, created_at = row
+        return Reservation(reservation_id, restaurant_id, date.fromordinal(ordinal), minute, party_size, created_at)
+
+
+def slot_seats() -> int:
+    """Seats per slot from ``RESERVATION_SLOT_SEATS``."""
+    return int(os.getenv("RESERVATION_SLOT_SEATS", "20"))
+
+
+def create_reservation_book(
+    backend: str | None = None,
+    path: str | None = None,
+    seats_per_slot: int | None = None,
+) -> ReservationBook:
+    """Build the book selected by ``RESERVATION_STORE`` (memory or sqlite)."""
+    backend = backend or os.getenv("RESERVATION_STORE", "memory")
+    seats = seats_per_slot or slot_seats()
+    if backend == "memory":
+        return MemoryReservationBook(seats)
+    if backend == "sqlite":
+        return SQLiteReservationBook(path or os.getenv("RESERVATION_STORE_PATH", "reservations.db"), seats)
+    raise ValueError(f"Unknown RESERVATION_STORE backend {backend!r}, expected 'memory' or 'sqlite'")
@@ -1,28 +1,47 @@
+import hmac
+import logging
 import os
 import secrets
 import random
 import uuid
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, Form, HTTPException, Request, BackgroundTasks, Response
+from fastapi import FastAPI, Form, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
-from fastapi.staticfiles import StaticFiles
-from starlette.responses import RedirectResponse
+from starlette.responses import PlainTextResponse, RedirectResponse
 from pydantic import BaseModel, EmailStr
 #from main import find_restaurant_by_id
 from webauthn import (
     generate_registration_options,
     generate_authentication_options,
     verify_registration_response,
-    verify_authentication_response,
     options_to_json )
 from webauthn.helpers.structs import PublicKeyCredentialDescriptor, PublicKeyCredentialType
 from webauthn.helpers import parse_registration_credential_json, parse_authentication_credential_json
+from applog import logging_stats
+from keycache import PUBLIC_KEY_CACHE, verify_authentication_cached
+from mailer import MailDelivery, MailQueueFullError, SMTPSettings, build_message
+from metrics import CONTENT_TYPE, REGISTRY, HTTPMetricsMiddleware
+from offload import OffloadPool, PoolOverloadedError
+from staticassets import PrecompressedStaticFiles
+from ttlstore import create_expiring_store
+from userstore import create_user_store
+
+log = logging.getLogger(__name__)
+# High-volume per-request events; sample them with LOG_SAMPLE_RATES=server.requests=<rate>.
+request_log = logging.getLogger(f"{__name__}.requests")
 
 rest_api = FastAPI()
 
-one_time_codes = {}
+# Short-lived auth state expires on its own and is capped in size, so
+# abandoned logins and /request-code floods cannot grow memory unbounded.
+# EPHEMERAL_STORE=sqlite shares it between worker processes.
+EPHEMERAL_MAX_ENTRIES = int(os.getenv("EPHEMERAL_MAX_ENTRIES", "100000"))
+OTP_TTL_SECONDS = 10 * 60
+CHALLENGE_TTL_SECONDS = 5 * 60
+TEMP_TOKEN_TTL_SECONDS = 2 * 60
+
+one_time_codes = create_expiring_store("one_time_codes", OTP_TTL_SECONDS, EPHEMERAL_MAX_ENTRIES)
 class BookingRequest(BaseModel):
     restaurant_id: str
 
@@ -47,14 +66,16 @@ class CodeVerification(BaseModel):
 
 load_dotenv()
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=os.getenv("MAIL_USERNAME"),
-    MAIL_PASSWORD=os.getenv("MAIL_PASSWORD"),
-    MAIL_FROM=os.getenv("MAIL_FROM"),
-    MAIL_PORT=int(os.getenv("MAIL_PORT")),
-    MAIL_SERVER=os.getenv("MAIL_SERVER"),
-    MAIL_STARTTLS=os.getenv("MAIL_STARTTLS").lower() == 'true',
-    MAIL_SSL_TLS=os.getenv("MAIL_SSL_TLS").lower() == 'true',
+SMTP_SETTINGS = SMTPSettings.from_env()
+
+# One-time codes go out through a queue drained over persistent SMTP
+# connections instead of a fresh connection and TLS handshake per message.
+MAIL_DELIVERY = MailDelivery(
+    SMTP_SETTINGS,
+    workers=int(os.getenv("MAIL_WORKERS", "4")),
+    connections=int(os.getenv("MAIL_MAX_CONNECTIONS", "0")) or None,
+    max_queue=int(os.getenv("MAIL_QUEUE_SIZE", "1000")),
+    retries=int(os.getenv("MAIL_RETRIES", "3")),
 )
 
 # Function to generate a random 6-digit code
@@ -65,16 +86,8 @@ async def send_code_email(recipient: str, code: str):
     subject = "Your One-Time Verification Code"
     body = f"Your one-time code is: **{code}**"
 
-    message = MessageSchema(
-        subject=subject,
-        recipients=[recipient],
-        body=body,
-        subtype="html"
-    )
-
-    print(f'The email configuration is {conf}')
-    fm = FastMail(conf)
-    await fm.send_message(message)
+    message = build_message(SMTP_SETTINGS, recipient, subject, body)
+    await MAIL_DELIVERY.enqueue(message)
 
 OAUTH_URL = "https://tgallant-mcp-server.ngrok.app"
 LOGIN_URL= f"{OAUTH_URL}/login"
@@ -82,10 +95,45 @@ ORIGIN = OAUTH_URL # The domain name of your site
 RP_NAME = "Restaurant Assistant"
 RP_ID = "tgallant-mcp-server.ngrok.app"
 
-users_db = {}
-pending_registrations = {}
-pending_authentication_challenges = {}
-temp_token_store = {}
+users_db = create_user_store()
+# Decoded public keys are cached per credential; drop them whenever the
+# stored key is replaced or deleted.
+users_db.subscribe(PUBLIC_KEY_CACHE.invalidate)
+
+# Attestation and signature checks are CPU-bound, so they run on a pool
+# instead of stalling every other request on the event loop.
+VERIFY_POOL = OffloadPool(
+    kind=os.getenv("WEBAUTHN_VERIFY_EXECUTOR", "thread"),
+    workers=int(os.getenv("WEBAUTHN_VERIFY_WORKERS", "0")) or None,
+    max_pending=int(os.getenv("WEBAUTHN_VERIFY_MAX_PENDING", "64")),
+)
+
+async def run_verification(verify, **kwargs):
+    try:
+        return await VERIFY_POOL.run(verify, **kwargs)
+    except PoolOverloadedError:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-ins in progress, please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+pending_registrations = create_expiring_store(
+    "pending_registrations", CHALLENGE_TTL_SECONDS, EPHEMERAL_MAX_ENTRIES
+)
+pending_authentication_challenges = create_expiring_store(
+    "pending_authentication_challenges", CHALLENGE_TTL_SECONDS, EPHEMERAL_MAX_ENTRIES
+)
+temp_token_store = create_expiring_store("temp_token_store", TEMP_TOKEN_TTL_SECONDS, EPHEMERAL_MAX_ENTRIES)
+
+
+def ephemeral_store_stats() -> dict:
+    """Live entries, expirations and evictions for each short-lived store."""
+    return {
+        "one_time_codes": one_time_codes.stats(),
+        "pending_registrations": pending_registrations.stats(),
+        "pending_authentication_challenges": pending_authentication_challenges.stats(),
+        "temp_token_store": temp_token_store.stats(),
+    }
 
 rest_api.add_middleware(
     CORSMiddleware,
@@ -94,9 +142,36 @@ rest_api.add_middleware(
     allow_methods=["*"],           # Allow all standard HTTP methods (GET, POST, etc.)
     allow_headers=["*"],           # Allow all headers
 )
+rest_api.add_middleware(HTTPMetricsMiddleware)
+
+REGISTRY.register_stats(
+    "auth_store", "Short-lived auth state", ephemeral_store_stats,
+    label="store", counters=("expirations", "evictions"), blocking=one_time_codes.blocking,
+)
+REGISTRY.register_stats(
+    "webauthn_verify_pool", "WebAuthn verification pool", VERIFY_POOL.stats,
+    counters=("rejected",),
+)
+REGISTRY.register_stats(
+    "public_key_cache", "Decoded credential public keys", PUBLIC_KEY_CACHE.stats,
+    counters=("hits", "misses"),
+)
+REGISTRY.register_stats(
+    "mail_delivery", "One-time code email delivery", MAIL_DELIVERY.stats,
+    counters=("sent", "failed", "retried", "rejected", "connects"),
+)
+REGISTRY.register_stats(
+    "log_records", "Queued log records", logging_stats,
+    counters=("dropped", "sampled_out"),
+)
 
 STATIC_CLIENT_DIR = "./client/dist"
-rest_api.mount("/login", StaticFiles(directory=STATIC_CLIENT_DIR, html=True), name="login")
+# Indexed and compressed once at import; see staticassets for caching rules.
+rest_api.mount(
+    "/login",
+    PrecompressedStaticFiles(STATIC_CLIENT_DIR, url_prefix="/login"),
+    name="login",
+)
 
 
 @rest_api.get("/oauth2/authorize")
@@ -115,6 +190,19 @@ async def authorize(
 async def health():
     return {"status": "ok"}
 
+# Bearer token Prometheus scrapes /metrics with; the route answers 404 when
+# it is not set, since rest_api is reachable from the internet.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+@rest_api.get("/metrics")
+async def metrics(request: Request):
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("authorization", "").removeprefix("Bearer ")
+    if not hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(await REGISTRY.render_async(), media_type=CONTENT_TYPE)
+
 @rest_api.get("/.well-known/openid-configuration")
 async def openid_configuration():
     config = {
@@ -170,7 +258,7 @@ async def oauth_register():
 
 @rest_api.post("/register/authn")
 async def register_webauthn(request: WebAuthNRequest):
-    print(f'The request login user is {request}')
+    request_log.info("registration options requested", extra={"email": request.email})
     username = request.email.lower()
     if not username:
         raise HTTPException(status_code=400, detail="No user name was sent")
@@ -185,16 +273,13 @@ async def register_webauthn(request: WebAuthNRequest):
         challenge=random_bytes # Generate a unique, random challenge per session
     )
 
-    pending_registrations[username] = options.challenge
+    await pending_registrations.set_async(username, options.challenge)
     return options_to_json(options)
 
 @rest_api.post("/register/verify")
 async def register_complete(credential_response: dict):
     username = credential_response['email'].lower()
-    challenge = None
-
-    if username in pending_registrations:
-        challenge = pending_registrations.pop(username)
+    challenge = await pending_registrations.pop_async(username, None)
 
     if challenge is None:
         raise HTTPException(
@@ -206,59 +291,60 @@ async def register_complete(credential_response: dict):
         credential_response
     )
 
-    print(f'The parsed credential is {parsed_credential}')
+    request_log.debug("registration credential parsed", extra={"email": username})
     try:
-        verification = verify_registration_response(
+        verification = await run_verification(
+            verify_registration_response,
             credential=parsed_credential,
             expected_challenge=challenge,
             expected_origin=ORIGIN,
             expected_rp_id=RP_ID,
         )
 
-        if username not in users_db:
-            users_db[username] = {"credentials": []}
-        users_db[username]["credentials"].append(verification)
+        await users_db.add_credential(
+            username,
+            verification.credential_id,
+            verification.credential_public_key,
+            verification.sign_count,
+        )
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f'Got an exception: {e}')
+        log.warning("registration verification failed", extra={"email": username, "error": str(e)})
         raise HTTPException(status_code=400, detail=f"Invalid credential format: {e}")
 
-    finally:
-        redirect_uri = credential_response["redirect_uri"]
-        state = credential_response["state"]
-        chatgpt_url = f"{redirect_uri}?code={generate_code()}&state={state}"
-        return {"status": "success", "redirect_uri": chatgpt_url}
+    redirect_uri = credential_response["redirect_uri"]
+    state = credential_response["state"]
+    chatgpt_url = f"{redirect_uri}?code={generate_code()}&state={state}"
+    return {"status": "success", "redirect_uri": chatgpt_url}
 
 @rest_api.post("/authenticate/verify")
 async def authenticate_complete(credential_response: dict):
     username = credential_response["email"].lower()
     cred_type = credential_response.get("type")
     if cred_type != "public-key":
-        print(f'Cred type is {cred_type}')
+        log.warning("unexpected credential type", extra={"email": username, "cred_type": cred_type})
         raise HTTPException(
             status_code=400,
             detail=f"Expected public-key credential for authentication, got '{cred_type}'. "
                    "Are you accidentally sending registration data to the login endpoint?"
         )
 
-    challenge = pending_authentication_challenges.pop(username, None)
+    challenge = await pending_authentication_challenges.pop_async(username, None)
     if not challenge:
         raise HTTPException(status_code=400, detail="No pending authentication")
 
     parsed = parse_authentication_credential_json(credential_response)
 
-    # Get the user's stored credentials
-    user_creds = users_db.get(username, {}).get("credentials", [])
-    if not user_creds:
-        raise HTTPException(status_code=400, detail="User not found")
-
-    # Find the matching credential (by credential_id)
+    # Look up the matching credential by credential_id
     credential_id = parsed.raw_id  # this is bytes
-    stored_cred = next((c for c in user_creds if c.credential_id == credential_id), None)
-    if not stored_cred:
+    stored_cred = await users_db.get_credential(credential_id)
+    if not stored_cred or stored_cred.email != username:
         raise HTTPException(status_code=400, detail="Unknown credential")
 
-    verification = verify_authentication_response(
+    verification = await run_verification(
+        verify_authentication_cached,
         credential=parsed,
         expected_challenge=challenge,
         expected_origin=ORIGIN,
@@ -268,30 +354,35 @@ async def authenticate_complete(credential_response: dict):
         require_user_verification=False,
     )
 
-    # Update sign count to prevent replay attacks
-    stored_cred.sign_count = verification.new_sign_count
+    # Update sign count to prevent replay attacks; losing the race to a
+    # concurrent login with the same counter means one of them is a replay.
+    updated = await users_db.update_sign_count(
+        credential_id, stored_cred.sign_count, verification.new_sign_count
+    )
+    if not updated:
+        raise HTTPException(status_code=400, detail="Credential was used concurrently")
     redirect_uri = credential_response["redirect_uri"]
     state = credential_response["state"]
     chatgpt_url = f"{redirect_uri}?code={generate_code()}&state={state}"
     return {"status": "success", "redirect_uri": chatgpt_url}
 
 @rest_api.post("/request-code")
-async def request_one_time_code(request: EmailRequest, background_tasks: BackgroundTasks):
-    print(f'The request data is {request}')
+async def request_one_time_code(request: EmailRequest):
     email = str(request.email).strip().lower()
-    user_data = users_db.get(email)
-    print(f"user_data type: {type(user_data)}")
-    print(f"user_data: {user_data}")
-    if user_data and user_data.get('credentials'):
+    credentials = await users_db.get_credentials(email)
+    request_log.info(
+        "one-time code requested", extra={"email": email, "credentials": len(credentials)}
+    )
+    if credentials:
         # Scenario: User exists and has credentials -> Initiate Authentication ---
-        print(f"User {email} exists, initiating authentication challenge.")
+        request_log.info("authentication challenge issued", extra={"email": email})
 
         allowed_credentials_list = [
             PublicKeyCredentialDescriptor(
                 id=cred.credential_id,
                 type=PublicKeyCredentialType.PUBLIC_KEY,
             )
-            for cred in user_data['credentials']
+            for cred in credentials
         ]
 
         options = generate_authentication_options(
@@ -299,35 +390,42 @@ async def request_one_time_code(request: EmailRequest, background_tasks: Backgro
             allow_credentials=allowed_credentials_list,
         )
 
-        pending_authentication_challenges[email] = options.challenge
-        if email in pending_registrations: del pending_registrations[email]
+        await pending_authentication_challenges.set_async(email, options.challenge)
+        await pending_registrations.pop_async(email, None)
         return options_to_json(options)
 
     else:
         code = generate_code()
-        print(f'The newly generated code is {code}')
-        one_time_codes[email] = code # Store the code temporarily
+        request_log.info("one-time code issued", extra={"email": email})
+        await one_time_codes.set_async(email, code) # Store the code temporarily
 
-    # Send the email in a background task to avoid blocking the API response
-    background_tasks.add_task(send_code_email, email, code)
+    # Queue the email; delivery happens on the mail workers, not in this request
+    try:
+        await send_code_email(email, code)
+    except MailQueueFullError:
+        await one_time_codes.pop_async(email, None)
+        raise HTTPException(
+            status_code=503,
+            detail="Too many codes being sent, please retry shortly.",
+            headers={"Retry-After": "5"},
+        )
 
     return {"message": f"One-time code requested for {email}. Check your inbox."}
 
 @rest_api.post("/verify-code")
 async def verify_one_time_code(request: CodeVerification):
-    print(f'Verifying otc with following request {request}')
     email = str(request.email).strip().lower()
+    request_log.info("verifying one-time code", extra={"email": email})
     code = request.code
     redirect_uri = request.redirect_uri
     state = request.state
 
-    if email in one_time_codes and one_time_codes[email] == code:
-        # Code is valid, remove it after use
-        del one_time_codes[email]
-
+    # pop is atomic in every backend, so a code is redeemed only once even
+    # when two workers receive the same request.
+    if await one_time_codes.get_async(email) == code and await one_time_codes.pop_async(email, None) == code:
         temp_token = secrets.token_urlsafe(32)
         chatgpt_url = f"{redirect_uri}?state={state}"
-        temp_token_store[temp_token] = chatgpt_url
+        await temp_token_store.set_async(temp_token, chatgpt_url)
         return {"status": "success", "token": temp_token}
     else:
         raise HTTPException(status_code=400, detail="Invalid or expired code")
@@ -336,13 +434,13 @@ async def verify_one_time_code(request: CodeVerification):
 async def final_login(request: SecurityToken):
     temp_token = request.token
 
-    url = temp_token_store.pop(temp_token, None) # Pop ensures the token is single-use
-    redirect = f'{url}&code={generate_code()}'
-    print(f'Sending redirect {redirect}')
-
-    if not redirect:
+    url = await temp_token_store.pop_async(temp_token, None) # Pop ensures the token is single-use
+    if not url:
         raise HTTPException(status_code=401, detail="Invalid or expired temporary token.")
 
+    redirect = f'{url}&code={generate_code()}'
+    request_log.info("sending authorization redirect", extra={"redirect_uri": url.split("?", 1)[0]})
+
     return {"status": "success", "redirect_uri": redirect}
 
 @rest_api.post("/oauth2/token")
@@ -366,7 +464,7 @@ async def oauth_token(request: Request):
             "refresh_token": new_refresh_token,
             "scope": scope
         }
-        print("response :", token_response)
+        request_log.info("token issued", extra={"grant_type": grant_type, "client_id": client_id})
 
         return token_response
     elif grant_type == "refresh_token":
@@ -402,7 +500,7 @@ async def oauth_token(request: Request):
         "expires_in": 7776000,  # 90 days (or however long you want)
         "scope": scope
     }
-    print("response :", token_response)
+    request_log.info("token issued", extra={"grant_type": grant_type, "client_id": client_id})
 
     return token_response
 
@@ -0,0 +1,541 @@
+"""Memory-mapped binary catalog snapshots.
+
+``RestaurantCatalog`` parses every row into Python objects at startup, so
+each uvicorn worker pays the JSON decode, the ``Restaurant`` allocations and
+the index build, and keeps a private copy of all of it. ``write_snapshot``
+does that work once and stores the result in a flat little-endian file;
+``open_snapshot`` maps the file read-only and returns a ``SnapshotCatalog``
+with the same lookup API. Opening costs a header read, lookups are binary
+searches over the mapped indexes, and rows are only decoded into
+``Restaurant`` objects when a request touches them. The mapped pages live in
+the OS page cache and are shared by every process that opens the file.
+
+Layout, all integers little-endian and every section 8-byte aligned:
+
+* header: magic, format version, counts and section offsets (``HEADER``)
+* strings: ``uint64`` offsets followed by the deduplicated UTF-8 data
+* records: one fixed-size ``RECORD`` per venue, in input order, holding
+  string indexes, rating, coordinates (NaN when absent), availability
+  index and price level
+* id order: ``uint32`` record indexes sorted by ``restaurant_id``
+* locations: ``LOCATION`` entries sorted by (city, state, cuisine) that
+  point at a run in the two sort-order sections
+* rating order, price order: ``uint32`` record indexes, each location's run
+  presorted like ``catalog.SORT_ORDERS``
+* availability: ``uint64`` offsets followed by deduplicated
+  ``Availability.to_bytes`` blobs
+* geo: the arrays of a ``geo.GeoIndex`` over venues with coordinates, whose
+  payloads are record indexes
+
+Build one with::
+
+    python snapshot.py catalog.json catalog.snapshot
+    python snapshot.py main catalog.snapshot   # the rows built into main.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import math
+import struct
+import sys
+import tempfile
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, overload
+
+from availability import Availability
+from catalog import (
+    DEFAULT_SORT,
+    SORT_ORDERS,
+    DuplicateRestaurantError,
+    LocationKey,
+    Nearby,
+    UnknownSortError,
+    location_key,
+    next_catalog_version,
+    normalize_cuisine,
+)
+from geo import DEFAULT_CELL_DEGREES, GeoIndex
+from records import Restaurant
+
+MAGIC = b"RCAT"
+FORMAT_VERSION = 2
+SECTIONS = (
+    "string_offsets",
+    "string_data",
+    "records",
+    "id_order",
+    "locations",
+    "rating_order",
+    "price_order",
+    "availability_offsets",
+    "availability_data",
+    "geo_cells",
+    "geo_starts",
+    "geo_payloads",
+    "geo_latitudes",
+    "geo_longitudes",
+)
+# magic, format version, restaurants, strings, locations, availabilities,
+# geo cells, geo points, geo cell size in degrees, section offsets
+HEADER = struct.Struct("<4s7Id" + "Q" * len(SECTIONS))
+# id, name, description, cuisine, image, street, city, state (string indexes),
+# rating, latitude, longitude, availability index, price level
+RECORD = struct.Struct("<8IdddIB3x")
+CUISINE_FIELD = struct.Struct("<I")  # the cuisine string index, 12 bytes into a RECORD
+CUISINE_OFFSET = 12
+# city, state, normalized cuisine (string indexes), start and length of the run
+LOCATION = struct.Struct("<5I")
+ORDER_SECTIONS = {"rating": "rating_order", "price": "price_order"}
+
+
+class SnapshotError(ValueError):
+    """Raised when a file is not a snapshot this version can read."""
+
+
+def _pad(size: int) -> bytes:
+    return b"\0" * (-size % 8)
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class _StringTable:
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+        self._encoded: List[bytes] = []
+
+    def add(self, value: str) -> int:
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self._encoded)
+            self._encoded.append(value.encode())
+        return index
+
+    def sections(self) -> Tuple[bytes, bytes]:
+        offsets = [0]
+        for encoded in self._encoded:
+            offsets.append(offsets[-1] + len(encoded))
+        return struct.pack(f"<{len(offsets)}Q", *offsets), b"".join(self._encoded)
+
+    def __len__(self) -> int:
+        return len(self._encoded)
+
+
+def write_snapshot(path: str, restaurants: Iterable[dict | Restaurant]) -> int:
+    """Write ``restaurants`` to ``path`` atomically; returns the venue count.
+
+    Rows are validated exactly as ``RestaurantCatalog`` validates them, so a
+    snapshot never holds data the JSON path would have rejected."""
+    if SORT_ORDERS.keys() != ORDER_SECTIONS.keys():
+        raise SnapshotError(f"Snapshot format has no section for sort orders {sorted(SORT_ORDERS)}")
+    strings = _StringTable()
+    availability_index: Dict[bytes, int] = {}
+    records = bytearray()
+    ids: Dict[str, int] = {}
+    by_location: Dict[LocationKey, List[Tuple[int, Restaurant]]] = {}
+    located: List[Tuple[int, float, float]] = []
+
+    for row in restaurants:
+        restaurant = row if isinstance(row, Restaurant) else Restaurant.from_dict(row)
+        if restaurant.restaurant_id in ids:
+            raise DuplicateRestaurantError(
+                f"Duplicate restaurant_id {restaurant.restaurant_id!r} "
+                f"(rows {ids[restaurant.restaurant_id]} and {len(ids)})"
+            )
+        index = ids[restaurant.restaurant_id] = len(ids)
+        blob = restaurant.availability.to_bytes()
+        records += RECORD.pack(
+            strings.add(restaurant.restaurant_id),
+            strings.add(restaurant.name),
+            strings.add(restaurant.description),
+            strings.add(restaurant.cuisine),
+            strings.add(restaurant.image),
+            strings.add(restaurant.street),
+            strings.add(restaurant.city),
+            strings.add(restaurant.state),
+            restaurant.rating,
+            restaurant.latitude if restaurant.has_location else math.nan,
+            restaurant.longitude if restaurant.has_location else math.nan,
+            availability_index.setdefault(blob, len(availability_index)),
+            restaurant.price_level,
+        )
+        # Keep only what sorting needs; the full rows are already encoded.
+        slim = Restaurant(
+            restaurant.restaurant_id, "", "", restaurant.cuisine, restaurant.price_level,
+            restaurant.rating, "", "", restaurant.city, restaurant.state, None,
+        )
+        key = location_key(restaurant.city, restaurant.state, restaurant.cuisine)
+        by_location.setdefault(key, []).append((index, slim))
+        if restaurant.has_location:
+            located.append((index, restaurant.latitude, restaurant.longitude))
+
+    id_order = [index for _, index in sorted(ids.items())]
+    locations = bytearray()
+    orders: Dict[str, List[int]] = {order: [] for order in SORT_ORDERS}
+    for key in sorted(by_location):
+        bucket = by_location[key]
+        city, state, cuisine = key
+        locations += LOCATION.pack(
+            strings.add(city), strings.add(state), strings.add(cuisine),
+            len(orders[DEFAULT_SORT]), len(bucket),
+        )
+        for order, sort_key in SORT_ORDERS.items():
+            orders[order].extend(index for index, _ in sorted(bucket, key=lambda item: sort_key(item[1])))
+
+    blobs = list(availability_index)
+    blob_offsets = [0]
+    for blob in blobs:
+        blob_offsets.append(blob_offsets[-1] + len(blob))
+    string_offsets, string_data = strings.sections()
+    geo = GeoIndex.build(located, DEFAULT_CELL_DEGREES)
+
+    payloads = {
+        "string_offsets": string_offsets,
+        "string_data": string_data,
+        "records": bytes(records),
+        "id_order": struct.pack(f"<{len(id_order)}I", *id_order),
+        "locations": bytes(locations),
+        "rating_order": struct.pack(f"<{len(orders['rating'])}I", *orders["rating"]),
+        "price_order": struct.pack(f"<{len(orders['price'])}I", *orders["price"]),
+        "availability_offsets": struct.pack(f"<{len(blob_offsets)}Q", *blob_offsets),
+        "availability_data": b"".join(blobs),
+        "geo_cells": _little_endian(geo.cells),
+        "geo_starts": _little_endian(geo.starts),
+        "geo_payloads": _little_endian(geo.payloads),
+        "geo_latitudes": _little_endian(geo.latitudes),
+        "geo_longitudes": _little_endian(geo.longitudes),
+    }
+    offsets = []
+    position = HEADER.size
+    for name in SECTIONS:
+        offsets.append(position)
+        position += len(payloads[name]) + len(_pad(len(payloads[name])))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(
+                MAGIC, FORMAT_VERSION, len(ids), len(strings), len(by_location), len(blobs),
+                len(geo.cells), len(geo), geo.cell_degrees, *offsets
+            ))
+            for name in SECTIONS:
+                f.write(payloads[name])
+                f.write(_pad(len(payloads[name])))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(ids)
+
+
+class SnapshotMatches(Sequence[Restaurant]):
+    """One location's matches in a sort order, decoded only when indexed.
+
+    Slicing returns a tuple, like ``RestaurantCatalog.search`` results."""
+
+    __slots__ = ("_catalog", "_order", "_start", "_length")
+
+    def __init__(self, catalog: SnapshotCatalog, order: memoryview, start: int, length: int):
+        self._catalog = catalog
+        self._order = order
+        self._start = start
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, index: int) -> Restaurant: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Tuple[Restaurant, ...]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            restaurant = self._catalog._restaurant
+            order = self._order
+            base = self._start
+            return tuple(restaurant(order[base + i]) for i in range(start, stop, step))
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("match index out of range")
+        return self._catalog._restaurant(self._order[self._start + index])
+
+
+class SnapshotCatalog:
+    """``RestaurantCatalog`` lookups served from a mapped snapshot file.
+
+    Decoded rows are kept in an LRU of ``cache_size`` entries so popular
+    venues are not rebuilt on every request. Iteration follows input order.
+    ``close`` unmaps the file; the catalog must not be used afterwards."""
+
+    def __init__(self, path: str, cache_size: int = 4096):
+        if sys.byteorder != "little":
+            raise SnapshotError("Snapshots can only be mapped on little-endian hosts")
+        self.path = path
+        self.version = next_catalog_version()
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except BaseException:
+            self._mmap.close()
+            raise
+        self._restaurant = lru_cache(maxsize=cache_size)(self._decode)
+        # Cities, cuisines and images repeat across venues; ids and names do not.
+        self._string = lru_cache(maxsize=1024)(self._raw_string)
+
+    def _open(self) -> None:
+        if len(self._mmap) < HEADER.size or struct.unpack_from("<4sI", self._mmap) != (MAGIC, FORMAT_VERSION):
+            raise SnapshotError(
+                f"{self.path} is not a version {FORMAT_VERSION} catalog snapshot"
+            )
+        (_, _, restaurants, strings, locations, availabilities,
+         geo_cells, geo_points, cell_degrees, *offsets) = HEADER.unpack_from(self._mmap)
+        sizes = {
+            "string_offsets": (strings + 1) * 8,
+            "string_data": None,
+            "records": restaurants * RECORD.size,
+            "id_order": restaurants * 4,
+            "locations": locations * LOCATION.size,
+            "rating_order": restaurants * 4,
+            "price_order": restaurants * 4,
+            "availability_offsets": (availabilities + 1) * 8,
+            "availability_data": None,
+            "geo_cells": geo_cells * 8,
+            "geo_starts": (geo_cells + 1) * 4,
+            "geo_payloads": geo_points * 4,
+            "geo_latitudes": geo_points * 8,
+            "geo_longitudes": geo_points * 8,
+        }
+        ends = offsets[1:] + [len(self._mmap)]
+        view = memoryview(self._mmap)
+        self._views: List[memoryview] = [view]
+        sections: Dict[str, memoryview] = {}
+        for name, start, end in zip(SECTIONS, offsets, ends):
+            size = sizes[name]
+            if size is None:
+                size = end - start
+            if start + size > end or end > len(self._mmap):
+                raise SnapshotError(f"{self.path} is truncated in section {name!r}")
+            sections[name] = view[start:start + size]
+            self._views.append(sections[name])
+
+        def cast(name: str, fmt: str) -> memoryview:
+            typed = sections[name].cast(fmt)
+            self._views.append(typed)
+            return typed
+
+        self._count = restaurants
+        self._location_count = locations
+        self._string_offsets = cast("string_offsets", "Q")
+        self._string_data = sections["string_data"]
+        self._records = sections["records"]
+        self._id_order = cast("id_order", "I")
+        self._locations = sections["locations"]
+        self._orders = {order: cast(section, "I") for order, section in ORDER_SECTIONS.items()}
+        self._availability_offsets = cast("availability_offsets", "Q")
+        self._availability_data = sections["availability_data"]
+        self._geo = GeoIndex(
+            cell_degrees,
+            cast("geo_cells", "Q"),
+            cast("geo_starts", "I"),
+            cast("geo_payloads", "I"),
+            cast("geo_latitudes", "d"),
+            cast("geo_longitudes", "d"),
+        )
+
+    def close(self) -> None:
+        self._restaurant.cache_clear()
+        self._string.cache_clear()
+        self._geo = None
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self) -> SnapshotCatalog:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _raw_string(self, index: int) -> str:
+        return str(self._string_data[self._string_offsets[index]:self._string_offsets[index + 1]], "utf-8")
+
+    def _decode(self, index: int) -> Restaurant:
+        (restaurant_id, name, description, cuisine, image, street, city, state,
+         rating, latitude, longitude, availability, price_level) = RECORD.unpack_from(
+            self._records, index * RECORD.size
+        )
+        located = not math.isnan(latitude)
+        start, end = self._availability_offsets[availability], self._availability_offsets[availability + 1]
+        raw = self._raw_string
+        shared = self._string
+        return Restaurant(
+            restaurant_id=raw(restaurant_id),
+            name=raw(name),
+            description=raw(description),
+            cuisine=shared(cuisine),
+            price_level=price_level,
+            rating=rating,
+            image=shared(image),
+            street=shared(street),
+            city=shared(city),
+            state=shared(state),
+            availability=Availability.from_bytes(self._availability_data[start:end]),
+            latitude=latitude if located else None,
+            longitude=longitude if located else None,
+        )
+
+    def _id_at(self, position: int) -> bytes:
+        # UTF-8 bytes sort like the strings they encode, so ids compare undecoded.
+        record = self._id_order[position]
+        (string,) = struct.unpack_from("<I", self._records, record * RECORD.size)
+        return bytes(self._string_data[self._string_offsets[string]:self._string_offsets[string + 1]])
+
+    def _location_at(self, position: int) -> Tuple[LocationKey, int, int]:
+        city, state, cuisine, start, length = LOCATION.unpack_from(
+            self._locations, position * LOCATION.size
+        )
+        shared = self._string
+        return (shared(city), shared(state), shared(cuisine)), start, length
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Restaurant]:
+        for index in range(self._count):
+            yield self._restaurant(index)
+
+    def __contains__(self, restaurant_id: object) -> bool:
+        return self.get(restaurant_id) is not None
+
+    def _find_id(self, target: bytes, lo: int = 0) -> int:
+        """Position of ``target`` in the id order, searching from ``lo``.
+
+        A missing id returns ``-1 - i``, where ``i`` is where it would be inserted."""
+        hi = self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._id_at(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._id_at(lo) == target:
+            return lo
+        return -1 - lo
+
+    def get(self, restaurant_id: str) -> Restaurant | None:
+        # Ids are strings; anything else is missing, as it is for RestaurantCatalog.
+        if not isinstance(restaurant_id, str):
+            return None
+        position = self._find_id(restaurant_id.encode())
+        return self._restaurant(self._id_order[position]) if position >= 0 else None
+
+    def get_many(self, restaurant_ids: Iterable[str]) -> Dict[str, Restaurant]:
+        """The rows for ``restaurant_ids`` that exist, keyed by id.
+
+        Ids are looked up in sorted order, each search starting where the
+        previous one ended."""
+        found: Dict[str, Restaurant] = {}
+        lo = 0
+        for restaurant_id in sorted({rid for rid in restaurant_ids if isinstance(rid, str)}):
+            position = self._find_id(restaurant_id.encode(), lo)
+            if position >= 0:
+                found[restaurant_id] = self._restaurant(self._id_order[position])
+                lo = position + 1
+            else:
+                lo = -1 - position
+        return found
+
+    def search(
+        self,
+        city: str,
+        state: str,
+        cuisine: str,
+        sort: str = DEFAULT_SORT,
+    ) -> Sequence[Restaurant]:
+        """All matches, already ordered by ``sort``; slice it to paginate."""
+        if sort not in SORT_ORDERS:
+            raise UnknownSortError(f"Unknown sort {sort!r}, expected one of {sorted(SORT_ORDERS)}")
+        key = location_key(city, state, cuisine)
+        lo, hi = 0, self._location_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._location_at(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._location_count:
+            found, start, length = self._location_at(lo)
+            if found == key:
+                return SnapshotMatches(self, self._orders[sort], start, length)
+        return ()
+
+    def nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_miles: Optional[float] = None,
+        count: Optional[int] = None,
+        cuisine: Optional[str] = None,
+    ) -> Nearby:
+        """Venues within ``radius_miles`` and/or the ``count`` nearest, optionally of one cuisine.
+
+        The cuisine filter reads only each candidate's cuisine field, so
+        rejected venues are never decoded."""
+        accept = None
+        if cuisine:
+            wanted = normalize_cuisine(cuisine)
+            records, shared = self._records, self._string
+
+            def accept(index: int) -> bool:
+                (string,) = CUISINE_FIELD.unpack_from(records, index * RECORD.size + CUISINE_OFFSET)
+                return normalize_cuisine(shared(string)) == wanted
+
+        matches = self._geo.search(latitude, longitude, radius_miles, count, accept)
+        return [(distance, self._restaurant(index)) for distance, index in matches]
+
+    def __repr__(self) -> str:
+        return f"SnapshotCatalog({self.path!r}, restaurants={self._count})"
+
+
+def open_snapshot(path: str, cache_size: int | None = None) -> SnapshotCatalog:
+    """Map ``path``; ``cache_size`` defaults to ``CATALOG_SNAPSHOT_CACHE_SIZE``."""
+    if cache_size is None:
+        cache_size = int(os.getenv("CATALOG_SNAPSHOT_CACHE_SIZE", "4096"))
+    return SnapshotCatalog(path, cache_size)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build a catalog snapshot.")
+    parser.add_argument("source", help="JSON file holding a list of catalog rows, or 'main'")
+    parser.add_argument("output", help="snapshot path to write")
+    args = parser.parse_args()
+
+    if args.source == "main":
+        from main import RESTAURANTS as rows
+    else:
+        with open(args.source) as f:
+            rows = json.load(f)
+    count = write_snapshot(args.output, rows)
+    print(f"wrote {count} restaurants to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Precompressed, cache-friendly serving of a built static bundle.
+
+``StaticFiles`` sent the login bundle uncompressed on every request with
+only mtime-based validators. ``PrecompressedStaticFiles`` indexes the
+directory once at startup and:
+
+* keeps small files in memory together with gzip (and, when the optional
+  ``brotli`` package is installed, brotli) variants, reusing prebuilt
+  ``<file>.gz`` / ``<file>.br`` siblings when the build produced them
+* picks a variant from ``Accept-Encoding`` and sends ``Vary: Accept-Encoding``
+* sends strong, content-derived ETags and answers ``If-None-Match`` with 304
+* marks hashed assets ``immutable`` for a year. That covers file names with
+  a build hash and requests whose ``?v=`` matches the content hash; HTML
+  pages get their asset references rewritten to such URLs, and are
+  themselves always revalidated.
+
+Only files present at startup are served, so request paths never reach the
+filesystem directly."""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional; gzip alone covers every browser
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+)
+# Vite-style build hashes: "index-BfXk3a9Q.js", "chunk.2f1a9c8e.css".
+_HASHED_NAME = re.compile(r"[-.](?=[A-Za-z0-9_]*\d)[A-Za-z0-9_]{8,}\.\w+$")
+_ASSET_REFERENCE = re.compile(r'((?:src|href)=["\'])([^"\'?#]+)(["\'])')
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _file_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """``_content_hash`` of a file read in chunks (``hashlib.file_digest`` needs 3.11)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def _is_compressible(media_type: str) -> bool:
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """``{"br": 1.0, "gzip": 0.8, ...}`` from an ``Accept-Encoding`` header."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+@dataclass
+class StaticAsset:
+    path: str
+    media_type: str
+    content_hash: str
+    hashed_name: bool
+    # encoding ("identity", "gzip", "br") -> body; empty for disk-served files
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    def etag(self, encoding: str) -> str:
+        suffix = "" if encoding == "identity" else f"-{encoding}"
+        return f'"{self.content_hash}{suffix}"'
+
+    def choose_encoding(self, accept_encoding: str) -> str:
+        if len(self.variants) <= 1:
+            return "identity"
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+                return encoding
+        return "identity"
+
+
+class PrecompressedStaticFiles:
+    """ASGI app serving a static directory with negotiated compression.
+
+    ``url_prefix`` is the mount path, used when rewriting references in HTML
+    pages. Files larger than ``max_memory_size`` are streamed from disk
+    uncompressed, still with content-hash ETags."""
+
+    def __init__(
+        self,
+        directory: str,
+        url_prefix: str = "",
+        html: bool = True,
+        max_memory_size: int = 1024 * 1024,
+        min_compress_size: int = 512,
+        gzip_level: int = 9,
+        brotli_quality: int = 11,
+    ):
+        self.directory = os.path.abspath(directory)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.html = html
+        self.max_memory_size = max_memory_size
+        self.min_compress_size = min_compress_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.assets: Dict[str, StaticAsset] = {}
+        self._load()
+
+    def _files(self) -> Iterable[Tuple[str, str]]:
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith((".gz", ".br")):
+                    continue
+                full_path = os.path.join(root, name)
+                yield os.path.relpath(full_path, self.directory).replace(os.sep, "/"), full_path
+
+    def _variants(
+        self, full_path: str, data: bytes, media_type: str, use_prebuilt: bool = True
+    ) -> Dict[str, bytes]:
+        variants = {"identity": data}
+        if len(data) < self.min_compress_size or not _is_compressible(media_type):
+            return variants
+        for encoding, suffix in (("gzip", ".gz"), ("br", ".br")):
+            prebuilt = full_path + suffix
+            if use_prebuilt and os.path.exists(prebuilt):
+                with open(prebuilt, "rb") as f:
+                    variants[encoding] = f.read()
+            elif encoding == "gzip":
+                variants[encoding] = gzip.compress(data, self.gzip_level, mtime=0)
+            elif brotli is not None:
+                variants[encoding] = brotli.compress(data, quality=self.brotli_quality)
+        # A variant that does not shrink the file is not worth negotiating.
+        return {
+            encoding: body
+            for encoding, body in variants.items()
+            if encoding == "identity" or len(body) < len(data)
+        }
+
+    def _load(self) -> None:
+        pages: List[Tuple[str, str, bytes]] = []
+        for relative_path, full_path in self._files():
+            media_type = mimetypes.guess_type(relative_path)[0] or "application/octet-stream"
+            hashed_name = bool(_HASHED_NAME.search(relative_path))
+            if os.path.getsize(full_path) > self.max_memory_size:
+                self.assets[relative_path] = StaticAsset(
+                    full_path, media_type, _file_hash(full_path), hashed_name
+                )
+                continue
+            with open(full_path, "rb") as f:
+                data = f.read()
+            if media_type == "text/html":
+                pages.append((relative_path, full_path, data))
+                continue
+            self.assets[relative_path] = StaticAsset(
+                full_path,
+                media_type,
+                _content_hash(data),
+                hashed_name,
+                self._variants(full_path, data, media_type),
+            )
+        # Pages last, once every asset they may reference has a content hash.
+        for relative_path, full_path, data in pages:
+            data = self._version_references(data.decode("utf-8")).encode("utf-8")
+            self.assets[relative_path] = StaticAsset(
+                full_path,
+                "text/html",
+                _content_hash(data),
+                False,
+                # Prebuilt siblings predate the rewrite, so compress afresh.
+                self._variants(full_path, data, "text/html", use_prebuilt=False),
+            )
+
+    def _version_references(self, page: str) -> str:
+        """Point ``src``/``href`` references at ``?v=<hash>`` URLs."""
+
+        def replace(match: re.Match) -> str:
+            reference = match.group(2)
+            if self.url_prefix and reference.startswith(self.url_prefix + "/"):
+                relative_path = reference[len(self.url_prefix) + 1:]
+            elif self.url_prefix and reference.startswith("/"):
+                return match.group(0)  # outside this mount
+            else:
+                relative_path = reference.lstrip("/").removeprefix("./")
+            asset = self.assets.get(relative_path)
+            if asset is None or asset.hashed_name:
+                return match.group(0)
+            return f"{match.group(1)}{reference}?v={asset.content_hash}{match.group(3)}"
+
+        return _ASSET_REFERENCE.sub(replace, page)
+
+    def _lookup(self, route_path: str) -> Optional[StaticAsset]:
+        relative_path = route_path.lstrip("/")
+        if self.html and (relative_path == "" or relative_path.endswith("/")):
+            relative_path += "index.html"
+        return self.assets.get(relative_path)
+
+    def _cache_control(self, asset: StaticAsset, query_string: bytes) -> str:
+        if asset.hashed_name:
+            return IMMUTABLE_CACHE_CONTROL
+        version = parse_qs(query_string.decode("latin-1")).get("v")
+        if version and version[0] == asset.content_hash:
+            return IMMUTABLE_CACHE_CONTROL
+        return REVALIDATE_CACHE_CONTROL
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        assert scope["type"] == "http"
+        if scope["method"] not in ("GET", "HEAD"):
+            response: Response = PlainTextResponse(
+                "Method Not Allowed", status_code=405, headers={"allow": "GET, HEAD"}
+            )
+            await response(scope, receive, send)
+            return
+
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        asset = self._lookup(path)
+        if asset is None:
+            await PlainTextResponse("Not Found", status_code=404)(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = asset.choose_encoding(request_headers.get("accept-encoding", ""))
+        etag = asset.etag(encoding)
+        headers = {
+            "etag": etag,
+            "cache-control": self._cache_control(asset, scope.get("query_string", b"")),
+            "vary": "Accept-Encoding",
+        }
+        if _etag_matches(request_headers.get("if-none-match", ""), etag):
+            await Response(status_code=304, headers=headers)(scope, receive, send)
+            return
+
+        if not asset.variants:
+            response = FileResponse(asset.path, media_type=asset.media_type, headers=headers)
+        else:
+            if encoding != "identity":
+                headers["content-encoding"] = encoding
+            body = asset.variants[encoding]
+            if scope["method"] == "HEAD":
+                headers["content-length"] = str(len(body))
+                body = b""
+            response = Response(body, media_type=asset.media_type, headers=headers)
+        await response(scope, receive, send)
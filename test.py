@@ -7,6 +7,9 @@ import requests
 import uvicorn
 import logging
 
+from applog import configure_logging
+from catalog import RestaurantCatalog
+
 ASSETS_DIR = "http://localhost:3000"
 OAUTH_URL = "https://tgallant-mcp-server.ngrok.app"
 RESTAURANTS = [
@@ -45,7 +48,7 @@ RESTAURANTS = [
             '11-16-2025': ["19:30:00","20:30:00", "21:00:00", "21:30:00"],
             '11-17-2025': ["18:00:00","18:30:00", "19:30:00", "21:00:00"],
             '11-18-2025': ["19:00:00","19:30:00", "20:30:00", "21:00:00"],
-            '11-19-2205': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
+            '11-19-2025': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
         }
     },
     {
@@ -122,7 +125,7 @@ RESTAURANTS = [
             '11-16-2025': ["19:30:00","20:30:00", "21:00:00", "21:30:00"],
             '11-17-2025': ["18:00:00","18:30:00", "19:30:00", "21:00:00"],
             '11-18-2025': ["19:00:00","19:30:00", "20:30:00", "21:00:00"],
-            '11-19-2205': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
+            '11-19-2025': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
         }
     },
     {
@@ -145,7 +148,7 @@ RESTAURANTS = [
         }
     },
     {
-        "restaurant_id": "12345678",
+        "restaurant_id": "98769876",
         "name": "Uchi",
         "description": "Fresh Sushi. Bold Flavors. Creative Menus",
         "cuisine": "Japanese",
@@ -199,7 +202,7 @@ RESTAURANTS = [
             '11-16-2025': ["19:30:00","20:30:00", "21:00:00", "21:30:00"],
             '11-17-2025': ["18:00:00","18:30:00", "19:30:00", "21:00:00"],
             '11-18-2025': ["19:00:00","19:30:00", "20:30:00", "21:00:00"],
-            '11-19-2205': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
+            '11-19-2025': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
         }
     },
     {
@@ -275,7 +278,7 @@ RESTAURANTS = [
             '11-16-2025': ["19:30:00","20:30:00", "21:00:00", "21:30:00"],
             '11-17-2025': ["18:00:00","18:30:00", "19:30:00", "21:00:00"],
             '11-18-2025': ["19:00:00","19:30:00", "20:30:00", "21:00:00"],
-            '11-19-2205': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
+            '11-19-2025': ["17:30:00","18:30:00", "19:30:00", "20:30:00"],
         }
     },
     {
@@ -338,7 +341,11 @@ RESTAURANTS = [
     },
 ]
 
-logging.basicConfig(level=logging.INFO, format='[SERVER] %(message)s')
+CATALOG = RestaurantCatalog(RESTAURANTS)
+
+configure_logging()
+# One record per request; sample it with LOG_SAMPLE_RATES=test.requests=<rate>.
+request_log = logging.getLogger("test.requests")
 
 app = FastMCP(
     name="Restaurant Assistant",
@@ -374,12 +381,9 @@ def get_recommendations(
         cuisine: str  = "Japanese",
 ) -> RecommendationResponse:
     """Get personalized restaurant recommendations."""
-    results = []
-    for rest in RESTAURANTS:
-        if rest["city"] == city and rest["state"] == state and rest["cuisine"] == cuisine:
-            results.append(rest)
+    results = CATALOG.search(city, state, cuisine)
 
-    return RecommendationResponse(restaurants=results)
+    return RecommendationResponse(restaurants=[r.to_dict() for r in results])
 
 # ──────────────────────────────────────────────────────────────
 # 3. SINGLE UI Widget for booking (this is what the user sees)
@@ -480,7 +484,7 @@ def get_recommendations(
 # ──────────────────────────────────────────────────────────────
 class InitialRequestLogger(Middleware):
     async def process_request(self, context: Context, call_next):
-        logging.info(f'Received request: {context.request.dict()}')
+        request_log.info("received request", extra={"method": context.method})
         return await call_next(context)
 
 app.add_middleware(InitialRequestLogger())
@@ -0,0 +1,143 @@
+"""Widget bundles are fetched through AssetFetcher against a stand-in asset server."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from assets import AssetFetcher, AssetUnavailableError, WidgetAssetLoader
+
+TITLES = {"restaurant": "Restaurant"}
+
+
+class AssetServer:
+    """``httpx.MockTransport`` handler serving bundles, counting requests per path."""
+
+    def __init__(self, failures: int = 0, status: int = 200):
+        self.failures = failures  # leading requests per path answered with 503
+        self.status = status
+        self.requests: dict = {}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests[path] = self.requests.get(path, 0) + 1
+        if self.requests[path] <= self.failures:
+            return httpx.Response(503)
+        return httpx.Response(self.status, text=f"/* {path} */")
+
+
+def _fetcher(handler, **kwargs) -> AssetFetcher:
+    kwargs.setdefault("backoff", 0.001)
+    return AssetFetcher("http://assets.test", transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_loader_fails_fast_after_a_failed_load():
+    server = AssetServer(status=404)
+    loader = WidgetAssetLoader(TITLES, mode="lazy", fetcher=_fetcher(server), failure_backoff=60)
+
+    async def run():
+        results = await asyncio.gather(*(loader.get("restaurant") for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, AssetUnavailableError) for result in results)
+        with pytest.raises(AssetUnavailableError, match="failed recently"):
+            await loader.get("restaurant")
+
+    asyncio.run(run())
+    # One load for the first caller; the two queued behind it and the later call fail fast.
+    assert server.requests == {"/restaurant.css": 1, "/restaurant.js": 1}
+    assert loader.stats()["fast_failures"] == 3
+
+
+def test_loader_retries_once_the_backoff_has_passed():
+    server = AssetServer(status=404)
+    loader = WidgetAssetLoader(TITLES, mode="lazy", fetcher=_fetcher(server), failure_backoff=0)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(AssetUnavailableError):
+                await loader.get("restaurant")
+        server.status = 200
+        return await loader.get("restaurant")
+
+    asset = asyncio.run(run())
+    assert "/restaurant.js" in asset.html
+    assert server.requests["/restaurant.js"] == 3
+
+
+def test_retries_server_errors_until_the_limit():
+    server = AssetServer(failures=2)
+    assert asyncio.run(_fetcher(server, retries=2).fetch_text("/a.js")) == "/* /a.js */"
+    assert server.requests == {"/a.js": 3}
+
+    server = AssetServer(failures=2)
+    with pytest.raises(AssetUnavailableError, match="503"):
+        asyncio.run(_fetcher(server, retries=1).fetch_text("/a.js"))
+    assert server.requests == {"/a.js": 2}
+
+
+def test_retries_transport_errors():
+    attempts = []
+
+    def handler(request):
+        attempts.append(request.url.path)
+        if len(attempts) == 1:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, text="ok")
+
+    assert asyncio.run(_fetcher(handler, retries=1).fetch_text("/a.css")) == "ok"
+    assert len(attempts) == 2
+
+
+@pytest.mark.parametrize("respond", [
+    lambda: httpx.Response(404),
+    # Claims gzip but is not: reading the body raises httpx.DecodingError.
+    lambda: httpx.Response(200, stream=httpx.ByteStream(b"not gzip"), headers={"Content-Encoding": "gzip"}),
+])
+def test_other_http_errors_fail_at_once(respond):
+    attempts = []
+
+    def handler(request):
+        attempts.append(request.url.path)
+        return respond()
+
+    with pytest.raises(AssetUnavailableError):
+        asyncio.run(_fetcher(handler, retries=3).fetch_text("/a.js"))
+    assert len(attempts) == 1
+
+
+def test_concurrent_requests_for_a_path_share_one_fetch():
+    server = AssetServer()
+
+    async def handler(request):
+        await asyncio.sleep(0.01)
+        return server(request)
+
+    async def run():
+        fetcher = _fetcher(handler)
+        return await asyncio.gather(*(fetcher.fetch_text("/a.js") for _ in range(10)))
+
+    assert asyncio.run(run()) == ["/* /a.js */"] * 10
+    assert server.requests == {"/a.js": 1}
+
+
+def test_requests_per_host_are_limited():
+    active = {}
+    peak = {}
+
+    async def handler(request):
+        host = request.url.host
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+        await asyncio.sleep(0.01)
+        active[host] -= 1
+        return httpx.Response(200, text="ok")
+
+    async def run():
+        fetcher = _fetcher(handler, max_connections_per_host=2)
+        other = "http://other.test"
+        await asyncio.gather(
+            *(fetcher.fetch_text(f"/{i}.js") for i in range(8)),
+            *(fetcher._fetch_with_retry(f"{other}/{i}.js") for i in range(8)),
+        )
+
+    asyncio.run(run())
+    assert peak == {"assets.test": 2, "other.test": 2}
@@ -0,0 +1,33 @@
+"""Both catalog types treat ids that are not strings as missing."""
+
+import pytest
+
+from benchmarks.synthetic import synthetic_restaurants
+from catalog import RestaurantCatalog
+from snapshot import open_snapshot, write_snapshot
+
+ROWS = list(synthetic_restaurants(50))
+
+
+@pytest.fixture(params=["memory", "snapshot"])
+def catalog(request, tmp_path):
+    if request.param == "memory":
+        yield RestaurantCatalog(ROWS)
+        return
+    path = str(tmp_path / "catalog.snapshot")
+    write_snapshot(path, ROWS)
+    snapshot = open_snapshot(path)
+    yield snapshot
+    snapshot.close()
+
+
+@pytest.mark.parametrize("restaurant_id", [None, 12121212, 1.5, b"00000000"])
+def test_non_string_ids_are_missing(catalog, restaurant_id):
+    assert catalog.get(restaurant_id) is None
+    assert restaurant_id not in catalog
+    assert catalog.get_many([restaurant_id]) == {}
+
+
+def test_get_many_skips_non_string_ids(catalog):
+    known = ROWS[3]["restaurant_id"]
+    assert list(catalog.get_many([None, known, 7])) == [known]
@@ -0,0 +1,33 @@
+"""Reloads publish the new catalog and unmap the replaced snapshot after a grace period."""
+
+import asyncio
+
+from benchmarks.synthetic import synthetic_restaurants
+from catalogreload import CatalogHolder
+from snapshot import open_snapshot, write_snapshot
+
+
+def test_replaced_snapshot_is_closed_after_the_grace_period(tmp_path):
+    path = str(tmp_path / "catalog.snapshot")
+    write_snapshot(path, synthetic_restaurants(20))
+
+    async def run():
+        holder = CatalogHolder(open_snapshot(path), path, retire_after=0.05)
+        first = holder.current
+        await holder.reload()
+        second = holder.current
+        # Requests that read the old catalog before the swap can still use it.
+        assert not first._mmap.closed
+        assert len(list(first)) == 20
+        await holder.reload()
+        await asyncio.sleep(0.1)
+        assert first._mmap.closed and second._mmap.closed
+        assert not holder.current._mmap.closed
+        assert holder.stats()["retired"] == 0
+
+        third = holder.current
+        await holder.reload()
+        holder.close()
+        assert third._mmap.closed
+
+    asyncio.run(run())
@@ -0,0 +1,102 @@
+"""The cached login check accepts and refuses exactly what the library does."""
+
+import os
+import re
+from importlib.metadata import version
+from pathlib import Path
+
+import pytest
+import webauthn
+from webauthn.authentication import verify_authentication_response as library_module
+from webauthn.helpers import base64url_to_bytes, bytes_to_base64url
+from webauthn.helpers.exceptions import InvalidAuthenticationResponse
+
+from benchmarks.webauthn_fixtures import ORIGIN, RP_ID, make_credential, sign_assertion
+from keycache import PublicKeyCache, verify_authentication_cached
+
+CHALLENGE = b"login-challenge-0123456789abcdef"
+REQUIREMENTS = Path(__file__).resolve().parent.parent / "requirements.txt"
+
+
+@pytest.fixture
+def credential():
+    return make_credential()
+
+
+def _verify(verify, response, cose_key, **overrides):
+    kwargs = dict(
+        credential=response,
+        expected_challenge=CHALLENGE,
+        expected_rp_id=RP_ID,
+        expected_origin=ORIGIN,
+        credential_public_key=cose_key,
+        credential_current_sign_count=0,
+    )
+    kwargs.update(overrides)
+    return verify(**kwargs)
+
+
+def _cached(cache):
+    return lambda **kwargs: verify_authentication_cached(cache=cache, **kwargs)
+
+
+def _tampered(response):
+    signature = bytearray(base64url_to_bytes(response["response"]["signature"]))
+    signature[-1] ^= 0x01
+    return dict(response, response=dict(response["response"], signature=bytes_to_base64url(bytes(signature))))
+
+
+def test_valid_login_matches_library(credential):
+    credential_id, private_key, cose_key = credential
+    response = sign_assertion(credential_id, private_key, CHALLENGE, 7)
+    cached = _verify(_cached(PublicKeyCache()), response, cose_key)
+    assert cached == _verify(webauthn.verify_authentication_response, response, cose_key)
+    assert cached.new_sign_count == 7
+
+
+@pytest.mark.parametrize("name, change, overrides", [
+    ("challenge", None, {"expected_challenge": os.urandom(32)}),
+    ("origin", None, {"expected_origin": "https://elsewhere.example"}),
+    ("rp id", None, {"expected_rp_id": "elsewhere.example"}),
+    ("replayed count", None, {"credential_current_sign_count": 7}),
+    ("signature", _tampered, {}),
+])
+def test_refuses_what_library_refuses(credential, name, change, overrides):
+    credential_id, private_key, cose_key = credential
+    response = sign_assertion(credential_id, private_key, CHALLENGE, 7)
+    if change is not None:
+        response = change(response)
+    with pytest.raises(InvalidAuthenticationResponse):
+        _verify(webauthn.verify_authentication_response, response, cose_key, **overrides)
+    with pytest.raises(InvalidAuthenticationResponse):
+        _verify(_cached(PublicKeyCache()), response, cose_key, **overrides)
+
+
+def test_cache_hits_on_later_logins_and_tracks_new_keys(credential):
+    credential_id, private_key, cose_key = credential
+    cache = PublicKeyCache()
+    for sign_count in (1, 2, 3):
+        response = sign_assertion(credential_id, private_key, CHALLENGE, sign_count)
+        _verify(_cached(cache), response, cose_key, credential_current_sign_count=sign_count - 1)
+    assert cache.stats() == {"size": 1, "hits": 2, "misses": 1}
+
+    # Re-registered under the same id: the old key must not verify the new one's signatures.
+    _, new_private_key, new_cose_key = make_credential()
+    response = sign_assertion(credential_id, new_private_key, CHALLENGE, 4)
+    _verify(_cached(cache), response, new_cose_key, credential_current_sign_count=3)
+    assert cache.stats()["misses"] == 2
+
+
+def test_library_is_not_patched():
+    from webauthn.helpers import decode_credential_public_key, decoded_public_key_to_cryptography
+
+    assert library_module.decode_credential_public_key is decode_credential_public_key
+    assert library_module.decoded_public_key_to_cryptography is decoded_public_key_to_cryptography
+
+
+def test_installed_webauthn_is_the_mirrored_version():
+    # verify_authentication_cached copies this release's checks; compare them
+    # with the new release's before changing the pin.
+    pinned = re.search(r"^webauthn==(\S+)$", REQUIREMENTS.read_text(), re.MULTILINE)
+    assert pinned is not None, "requirements.txt must pin webauthn"
+    assert version("webauthn") == pinned.group(1)
@@ -0,0 +1,14 @@
+"""Importing the apps leaves the host's logging alone; serving them configures it."""
+
+import importlib
+import logging
+
+import applog
+
+
+def test_import_keeps_existing_handlers(caplog):
+    importlib.import_module("server")
+    importlib.import_module("main")
+    logging.getLogger("tests").warning("still captured")
+    assert "still captured" in caplog.text
+    assert applog._listener is None
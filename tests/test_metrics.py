@@ -0,0 +1,30 @@
+"""Blocking stats are read off the event loop and render like the rest."""
+
+import asyncio
+import threading
+
+from metrics import MetricsRegistry
+
+
+def test_render_async_reads_blocking_stats_on_a_worker_thread():
+    threads = {}
+
+    def stats(name):
+        def read():
+            threads[name] = threading.current_thread()
+            return {"live": 3}
+        return read
+
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests").inc()
+    registry.register_stats("memory_store", "In-process store", stats("memory"))
+    registry.register_stats("sqlite_store", "Shared store", stats("sqlite"), blocking=True)
+
+    async def render():
+        return threading.current_thread(), await registry.render_async()
+
+    loop_thread, body = asyncio.run(render())
+    assert threads["memory"] is loop_thread
+    assert threads["sqlite"] is not loop_thread
+    assert body == registry.render()
+    assert "sqlite_store_live 3" in body
@@ -0,0 +1,107 @@
+"""A slot is booked to exactly its capacity however many claims race for it."""
+
+import asyncio
+import multiprocessing
+import threading
+from datetime import date
+
+import pytest
+
+from reservations import MemoryReservationBook, ReservationBook, SlotFullError, SQLiteReservationBook
+
+SEATS = 20
+CLAIMS = 200
+DAY = date(2030, 1, 15)
+MINUTE = 19 * 60
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def book(request, tmp_path):
+    if request.param == "memory":
+        return MemoryReservationBook(SEATS)
+    return SQLiteReservationBook(str(tmp_path / "reservations.db"), SEATS)
+
+
+def _claim(book, party_size):
+    try:
+        return book.claim("venue", DAY, MINUTE, party_size)
+    except SlotFullError:
+        return None
+
+
+@pytest.mark.parametrize("party_size", [1, 3])
+def test_concurrent_threads_book_exactly_capacity(book, party_size):
+    results = []
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        for _ in range(CLAIMS // 8):
+            results.append(_claim(book, party_size))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    claimed = [result for result in results if result is not None]
+    capacity = SEATS - SEATS % party_size
+    assert len(claimed) * party_size == capacity
+    assert book.remaining("venue", DAY, MINUTE) == SEATS - capacity
+    assert book.stats() == {"claimed": len(claimed), "rejected": CLAIMS - len(claimed)}
+    # Every claim saw a different seat count, ending at what is left.
+    assert sorted(remaining for _, remaining in claimed) == list(range(SEATS - capacity, SEATS, party_size))
+    assert all(book.get(reservation.reservation_id) == reservation for reservation, _ in claimed)
+
+
+def test_concurrent_async_claims_book_exactly_capacity(book):
+    async def claim():
+        try:
+            return await book.claim_async("venue", DAY, MINUTE, 1)
+        except SlotFullError:
+            return None
+
+    async def run():
+        return await asyncio.gather(*(claim() for _ in range(CLAIMS)))
+
+    claimed = [result for result in asyncio.run(run()) if result is not None]
+    assert len(claimed) == SEATS
+    assert asyncio.run(book.full_slots_async("venue")) == {(DAY, MINUTE)}
+
+
+def _process_claims(path, attempts, results):
+    book = SQLiteReservationBook(path, SEATS)
+    results.put(sum(_claim(book, 1) is not None for _ in range(attempts)))
+
+
+def test_sqlite_processes_book_exactly_capacity(tmp_path):
+    path = str(tmp_path / "reservations.db")
+    SQLiteReservationBook(path, SEATS)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=_process_claims, args=(path, CLAIMS // 4, results))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    booked = sum(results.get(timeout=60) for _ in processes)
+    for process in processes:
+        process.join()
+    assert booked == SEATS
+    assert SQLiteReservationBook(path, SEATS).remaining("venue", DAY, MINUTE) == 0
+
+
+def test_party_larger_than_a_slot_is_refused(book):
+    with pytest.raises(ValueError):
+        book.claim("venue", DAY, MINUTE, SEATS + 1)
+    assert book.remaining("venue", DAY, MINUTE) == SEATS
+
+
+def test_incomplete_book_fails_at_construction():
+    class ClaimsOnly(ReservationBook):
+        def claim(self, restaurant_id, day, minute, party_size):
+            raise SlotFullError(0)
+
+    with pytest.raises(TypeError, match="abstract"):
+        ClaimsOnly(SEATS)
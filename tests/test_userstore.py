@@ -0,0 +1,36 @@
+"""Both user store backends implement the whole interface."""
+
+import asyncio
+
+import pytest
+
+from userstore import MemoryUserStore, SQLiteUserStore, UserStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryUserStore()
+    return SQLiteUserStore(str(tmp_path / "users.db"))
+
+
+def test_incomplete_backend_fails_at_construction():
+    class NoSignCounts(UserStore):
+        async def get_credentials(self, email):
+            return []
+
+    with pytest.raises(TypeError, match="abstract"):
+        NoSignCounts()
+
+
+def test_sign_count_compare_and_set(store):
+    async def run():
+        await store.add_credential("a@example.com", b"cred", b"key", 1)
+        first = await store.update_sign_count(b"cred", 1, 2)
+        stale = await store.update_sign_count(b"cred", 1, 3)
+        stored = await store.get_credential(b"cred")
+        await store.close()
+        return first, stale, stored.sign_count
+
+    assert isinstance(store, UserStore)
+    assert asyncio.run(run()) == (True, False, 2)
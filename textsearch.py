@@ -0,0 +1,318 @@
+"""Free-text search over venue names, descriptions and cuisines.
+
+``TextIndex`` is an in-memory inverted index from normalized terms to the
+venues that contain them, weighted by field (a term in the name counts
+more than one in the description) plus a small rating prior. A query
+matches venues containing every query term, where each term may also
+match as a prefix of a longer term ("oys" finds "oysters") and, when it is
+not itself in the index, a term a bounded number of typos away
+("raemn" finds "ramen"). Typo candidates come from a deletion index, so
+finding them never compares the query against the whole vocabulary.
+
+Queries only need the best few venues, so they use the threshold
+algorithm: each term's postings are kept sorted by weight, the lists are
+read in step from the top, every new venue is scored in full by dict
+lookups, and reading stops once the page is full and nothing unread can
+outscore it. A common term therefore costs a page's worth of work, not a
+pass over every venue that contains it.
+
+The index is built once from the catalog and afterwards kept in step with
+it by ``sync``, which reindexes only the venues whose text or rating
+changed and drops the ones that are gone. It stores restaurant ids; callers
+resolve them against the current catalog."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from records import Restaurant
+
+FIELD_WEIGHTS = {"name": 3.0, "cuisine": 2.0, "description": 1.0}
+RATING_PRIOR = 0.01  # per rating star; orders otherwise equal matches by rating
+PREFIX_WEIGHT = 0.8
+TYPO_WEIGHT = 0.6  # per edit
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_SCAN = 256  # vocabulary terms examined per prefix
+MAX_EXPANSIONS = 16  # prefix completions kept per query term, most common first
+MIN_TYPO_LENGTH = 4  # shorter terms must match exactly or as a prefix
+TWO_TYPO_LENGTH = 8  # terms this long tolerate two edits
+MAX_QUERY_TERMS = 8
+STOPWORDS = frozenset({
+    "a", "an", "and", "at", "by", "for", "from", "in", "its", "of", "on", "or", "our",
+    "the", "to", "with", "your",
+})
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+Hit = Tuple[float, str]  # score, restaurant_id
+Signature = Tuple[str, str, str, float]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, accent-free alphanumeric words minus stopwords."""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return [word for word in _WORD.findall(folded) if word not in STOPWORDS]
+
+
+def _deletions(word: str, edits: int) -> Set[str]:
+    """``word`` and every string made by deleting up to ``edits`` characters from it."""
+    found = {word}
+    frontier = {word}
+    for _ in range(edits):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+def edit_distance(left: str, right: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` once it is known to exceed ``limit``."""
+    if abs(len(left) - len(right)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(right) + 1))
+    for i in range(1, len(left) + 1):
+        current = [i] + [0] * len(right)
+        for j in range(1, len(right) + 1):
+            cost = left[i - 1] != right[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and left[i - 1] == right[j - 2] and left[i - 2] == right[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _typo_edits(term: str) -> int:
+    if len(term) < MIN_TYPO_LENGTH or not term.isalpha():
+        return 0
+    return 2 if len(term) >= TWO_TYPO_LENGTH else 1
+
+
+def _scaled(ranked: List[Tuple[float, str]], multiplier: float) -> Iterator[Tuple[float, str]]:
+    for negative, restaurant_id in ranked:
+        yield negative * multiplier, restaurant_id
+
+
+def _signature(restaurant: Restaurant) -> Signature:
+    return restaurant.name, restaurant.description, restaurant.cuisine, restaurant.rating
+
+
+class TextIndex:
+    """Inverted index over the catalog's text fields."""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._documents: Dict[str, Tuple[Signature, Tuple[str, ...]]] = {}
+        # Postings sorted by (-weight, restaurant_id), rebuilt on first use after a change.
+        self._ranked: Dict[str, List[Tuple[float, str]]] = {}
+        # Terms whose sorted postings were in use when a change dropped them.
+        self._stale: Set[str] = set()
+        # Deleted-character variants -> vocabulary terms they came from.
+        self._deletes: Dict[str, Set[str]] = {}
+        self._terms: Optional[List[str]] = None
+        self.syncs = 0
+        self.last_sync_seconds = 0.0
+
+    @classmethod
+    def build(cls, restaurants: Iterable[Restaurant]) -> TextIndex:
+        index = cls()
+        for restaurant in restaurants:
+            index.add(restaurant)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, restaurant_id: object) -> bool:
+        return restaurant_id in self._documents
+
+    def add(self, restaurant: Restaurant) -> None:
+        """Index ``restaurant``, replacing any earlier entry with its id."""
+        restaurant_id = restaurant.restaurant_id
+        if restaurant_id in self._documents:
+            self.remove(restaurant_id)
+        weights: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in set(tokenize(getattr(restaurant, field))):
+                weights[term] = weights.get(term, 0.0) + weight
+        prior = restaurant.rating * RATING_PRIOR
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._add_term(term)
+            postings[restaurant_id] = weight + prior
+            self._invalidate(term)
+        self._documents[restaurant_id] = (_signature(restaurant), tuple(weights))
+
+    def remove(self, restaurant_id: str) -> bool:
+        document = self._documents.pop(restaurant_id, None)
+        if document is None:
+            return False
+        for term in document[1]:
+            postings = self._postings[term]
+            del postings[restaurant_id]
+            self._invalidate(term)
+            if not postings:
+                del self._postings[term]
+                self._remove_term(term)
+        return True
+
+    def _invalidate(self, term: str) -> None:
+        if self._ranked.pop(term, None) is not None:
+            self._stale.add(term)
+
+    def _add_term(self, term: str) -> None:
+        self._terms = None
+        for variant in _deletions(term, _typo_edits(term)):
+            self._deletes.setdefault(variant, set()).add(term)
+
+    def _remove_term(self, term: str) -> None:
+        self._terms = None
+        for variant in _deletions(term, _typo_edits(term)):
+            terms = self._deletes[variant]
+            terms.discard(term)
+            if not terms:
+                del self._deletes[variant]
+
+    async def sync(self, restaurants: Iterable[Restaurant], batch_size: int = 1000) -> Tuple[int, int]:
+        """Bring the index in line with ``restaurants``; returns (reindexed, removed).
+
+        Only venues whose name, description, cuisine or rating changed are
+        reindexed. The event loop gets control back after every
+        ``batch_size`` venues, so searches keep being answered meanwhile."""
+        start = time.perf_counter()
+        seen: Set[str] = set()
+        reindexed = 0
+        for position, restaurant in enumerate(restaurants, 1):
+            seen.add(restaurant.restaurant_id)
+            document = self._documents.get(restaurant.restaurant_id)
+            if document is None or document[0] != _signature(restaurant):
+                self.add(restaurant)
+                reindexed += 1
+            if position % batch_size == 0:
+                await asyncio.sleep(0)
+        gone = [restaurant_id for restaurant_id in self._documents if restaurant_id not in seen]
+        for position, restaurant_id in enumerate(gone, 1):
+            self.remove(restaurant_id)
+            if position % batch_size == 0:
+                await asyncio.sleep(0)
+        # Re-sort the postings searches were using now, rather than in the next search.
+        while self._stale:
+            term = self._stale.pop()
+            if term in self._postings:
+                self._ranked_postings(term)
+                await asyncio.sleep(0)
+        self.syncs += 1
+        self.last_sync_seconds = time.perf_counter() - start
+        return reindexed, len(gone)
+
+    def _ranked_postings(self, term: str) -> List[Tuple[float, str]]:
+        ranked = self._ranked.get(term)
+        if ranked is None:
+            ranked = self._ranked[term] = sorted(
+                (-weight, restaurant_id) for restaurant_id, weight in self._postings[term].items()
+            )
+        return ranked
+
+    def _prefixed(self, prefix: str) -> Iterator[str]:
+        if self._terms is None:
+            self._terms = sorted(self._postings)
+        terms = self._terms
+        start = bisect_left(terms, prefix)
+        for term in terms[start:start + MAX_PREFIX_SCAN]:
+            if not term.startswith(prefix):
+                break
+            if term != prefix:
+                yield term
+
+    def expand(self, token: str) -> Dict[str, float]:
+        """Index terms ``token`` may stand for, each with its score multiplier."""
+        variants: Dict[str, float] = {}
+        if token in self._postings:
+            variants[token] = 1.0
+        if len(token) >= MIN_PREFIX_LENGTH:
+            completions = sorted(self._prefixed(token), key=lambda term: -len(self._postings[term]))
+            for term in completions[:MAX_EXPANSIONS]:
+                variants[term] = PREFIX_WEIGHT
+        edits = _typo_edits(token)
+        if not variants.get(token) and edits:
+            candidates: Set[str] = set()
+            for variant in _deletions(token, edits):
+                candidates.update(self._deletes.get(variant, ()))
+            # A prefix match already outscores any typo match.
+            candidates.difference_update(variants)
+            for term in candidates:
+                distance = edit_distance(token, term, edits)
+                if distance <= edits:
+                    variants[term] = TYPO_WEIGHT ** distance
+        return variants
+
+    def search(self, query: str, count: int) -> List[Hit]:
+        """The ``count`` best venues containing every query term, best first.
+
+        Ties keep the order the postings were read in, so a search for more
+        results returns a longer list with the same beginning."""
+        tokens = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        if not tokens or count < 1:
+            return []
+        expansions = [self.expand(token) for token in tokens]
+        if not all(expansions):
+            return []
+        groups = [
+            [(self._postings[term], multiplier) for term, multiplier in variants.items()]
+            for variants in expansions
+        ]
+        # Each term's postings, merged across its variants, strongest first.
+        streams = [
+            heapq.merge(*(
+                _scaled(self._ranked_postings(term), multiplier) for term, multiplier in variants.items()
+            ))
+            for variants in expansions
+        ]
+        bounds = [0.0] * len(streams)
+        best: List[Tuple[float, int, str]] = []  # min-heap of (score, -arrival, restaurant_id)
+        seen: Set[str] = set()
+        arrival = 0
+        while True:
+            for position, stream in enumerate(streams):
+                item = next(stream, None)
+                if item is None:
+                    # Every match contains this term, so every match has been read.
+                    return [(score, restaurant_id) for score, _, restaurant_id in sorted(best, reverse=True)]
+                negative, restaurant_id = item
+                bounds[position] = -negative
+                if restaurant_id in seen:
+                    continue
+                seen.add(restaurant_id)
+                score = 0.0
+                for group in groups:
+                    term_score = max(postings.get(restaurant_id, 0.0) * multiplier for postings, multiplier in group)
+                    if not term_score:
+                        break
+                    score += term_score
+                else:
+                    arrival += 1
+                    entry = (score, -arrival, restaurant_id)
+                    if len(best) < count:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+            if len(best) == count and best[0][0] >= sum(bounds):
+                return [(score, restaurant_id) for score, _, restaurant_id in sorted(best, reverse=True)]
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "restaurants": len(self._documents),
+            "terms": len(self._postings),
+            "syncs": self.syncs,
+            "last_sync_seconds": self.last_sync_seconds,
+        }
@@ -0,0 +1,333 @@
+"""Memory-bounded key-value store whose entries expire.
+
+The auth flow in ``server`` keeps one-time codes, WebAuthn challenges and
+temporary tokens between requests. Abandoned flows used to leave those
+entries behind forever; ``ExpiringDict`` gives every entry a TTL and a hard
+cap on the number of live entries, so memory stays bounded under floods of
+``/request-code`` calls.
+
+``SQLiteExpiringDict`` offers the same interface on a SQLite file, so that
+several worker processes see the same codes, challenges and tokens; pick it
+with ``create_expiring_store`` and ``EPHEMERAL_STORE=sqlite``.
+
+Request handlers use ``get_async``, ``set_async`` and ``pop_async``: the
+SQLite store runs those on worker threads, because a write can wait up to
+``busy_timeout`` for another process's lock and must not stall the event
+loop meanwhile. The in-memory store answers them inline."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+_MISSING = object()
+
+
+class ExpiringDict:
+    """Dict-like mapping with per-entry TTLs and a maximum size.
+
+    Expiry times live in a min-heap next to the entries. Expired entries are
+    dropped lazily from the front of the heap on every write and on reads of
+    expired keys, so each entry is removed once at O(log n) cost. When the
+    store is full, the entry closest to expiring is evicted to make room."""
+
+    # True when calls can wait on disk or on another process's lock.
+    blocking = False
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: Dict[Hashable, Tuple[Any, float, int]] = {}
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._generations = itertools.count()
+        self.expirations = 0
+        self.evictions = 0
+
+    def _is_current(self, generation: int, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[2] == generation
+
+    def _purge_expired(self, now: float) -> None:
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, generation, key = heapq.heappop(heap)
+            if self._is_current(generation, key):
+                del self._entries[key]
+                self.expirations += 1
+
+    def _evict_one(self) -> None:
+        while self._heap:
+            _, generation, key = heapq.heappop(self._heap)
+            if self._is_current(generation, key):
+                del self._entries[key]
+                self.evictions += 1
+                return
+
+    def _compact(self) -> None:
+        # Overwrites leave stale heap items behind; rebuild once they dominate.
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [
+                (expires_at, generation, key)
+                for key, (_, expires_at, generation) in self._entries.items()
+            ]
+            heapq.heapify(self._heap)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        now = self._clock()
+        self._purge_expired(now)
+        if key not in self._entries:
+            while len(self._entries) >= self.max_entries:
+                self._evict_one()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        generation = next(self._generations)
+        self._entries[key] = (value, expires_at, generation)
+        heapq.heappush(self._heap, (expires_at, generation, key))
+        self._compact()
+
+    def _live_entry(self, key: Hashable) -> Optional[Tuple[Any, float, int]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._live_entry(key)
+        return default if entry is None else entry[0]
+
+    def pop(self, key: Hashable, default: Any = _MISSING) -> Any:
+        entry = self._live_entry(key)
+        if entry is None:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        del self._entries[key]
+        return entry[0]
+
+    async def get_async(self, key: Hashable, default: Any = None) -> Any:
+        return self.get(key, default)
+
+    async def set_async(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self.set(key, value, ttl)
+
+    async def pop_async(self, key: Hashable, default: Any = _MISSING) -> Any:
+        return self.pop(key, default)
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.set(key, value)
+
+    def __getitem__(self, key: Hashable) -> Any:
+        entry = self._live_entry(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry[0]
+
+    def __delitem__(self, key: Hashable) -> None:
+        self.pop(key)
+
+    def __contains__(self, key: object) -> bool:
+        return self._live_entry(key) is not None
+
+    def __len__(self) -> int:
+        self._purge_expired(self._clock())
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        self._purge_expired(self._clock())
+        return iter(list(self._entries))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "live": len(self),
+            "max_entries": self.max_entries,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteExpiringDict:
+    """``ExpiringDict`` counterpart stored in a table of a shared SQLite file.
+
+    Every process opens the same file in WAL mode, so a challenge issued by
+    one worker can be consumed by another, and ``pop`` is a single
+    ``DELETE ... RETURNING`` that lets exactly one caller consume an entry.
+    Keys and values are stored as-is (``str`` or ``bytes``). Expiry uses wall
+    clock time, because monotonic clocks are not comparable across
+    processes. Reads ignore expired rows; they are deleted, and the size cap
+    enforced, every ``maintenance_interval`` writes, so the cap can be
+    overshot by at most that many entries.
+
+    The sync methods block the calling thread; the ``*_async`` ones run
+    them on worker threads, each with its own connection."""
+
+    blocking = True
+
+    def __init__(
+        self,
+        path: str,
+        name: str,
+        ttl: float,
+        max_entries: int = 100_000,
+        maintenance_interval: int = 256,
+        busy_timeout: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", name):
+            raise ValueError(f"Invalid store name {name!r}")
+        self.path = path
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.maintenance_interval = maintenance_interval
+        self.busy_timeout = busy_timeout
+        self._clock = clock
+        self._local = threading.local()
+        self._writes = 0
+        # Writes arrive from several worker threads; guards the counters above and below.
+        self._counts_lock = threading.Lock()
+        self.expirations = 0
+        self.evictions = 0
+        connection = self._connect()
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} ("
+            "key PRIMARY KEY, value NOT NULL, expires_at REAL NOT NULL)"
+        )
+        connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {name}_expires_at ON {name}(expires_at)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Ephemeral state: losing the last commits in a power cut is fine.
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+        return connection
+
+    def _maintain(self, connection: sqlite3.Connection, now: float) -> None:
+        expired = connection.execute(
+            f"DELETE FROM {self.name} WHERE expires_at <= ?", (now,)
+        ).rowcount
+        evicted = 0
+        excess = connection.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0] - self.max_entries
+        if excess > 0:
+            evicted = connection.execute(
+                f"DELETE FROM {self.name} WHERE key IN "
+                f"(SELECT key FROM {self.name} ORDER BY expires_at LIMIT ?)",
+                (excess,),
+            ).rowcount
+        with self._counts_lock:
+            self.expirations += expired
+            self.evictions += evicted
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        now = self._clock()
+        connection = self._connect()
+        connection.execute(
+            f"INSERT OR REPLACE INTO {self.name}(key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, now + (self.ttl if ttl is None else ttl)),
+        )
+        with self._counts_lock:
+            self._writes += 1
+            due = self._writes % self.maintenance_interval == 0
+        if due:
+            self._maintain(connection, now)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        row = self._connect().execute(
+            f"SELECT value FROM {self.name} WHERE key = ? AND expires_at > ?",
+            (key, self._clock()),
+        ).fetchone()
+        return default if row is None else row[0]
+
+    def pop(self, key: Hashable, default: Any = _MISSING) -> Any:
+        # fetchall() runs the statement to completion, committing the delete.
+        rows = self._connect().execute(
+            f"DELETE FROM {self.name} WHERE key = ? RETURNING value, expires_at", (key,)
+        ).fetchall()
+        row = rows[0] if rows else None
+        if row is None or row[1] <= self._clock():
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        return row[0]
+
+    async def get_async(self, key: Hashable, default: Any = None) -> Any:
+        return await asyncio.to_thread(self.get, key, default)
+
+    async def set_async(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    async def pop_async(self, key: Hashable, default: Any = _MISSING) -> Any:
+        return await asyncio.to_thread(self.pop, key, default)
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.set(key, value)
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __delitem__(self, key: Hashable) -> None:
+        self.pop(key)
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return self._connect().execute(
+            f"SELECT COUNT(*) FROM {self.name} WHERE expires_at > ?", (self._clock(),)
+        ).fetchone()[0]
+
+    def __iter__(self) -> Iterator[Hashable]:
+        rows = self._connect().execute(
+            f"SELECT key FROM {self.name} WHERE expires_at > ?", (self._clock(),)
+        )
+        return iter([row[0] for row in rows])
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "live": len(self),
+            "max_entries": self.max_entries,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
+
+
+def create_expiring_store(name: str, ttl: float, max_entries: int = 100_000):
+    """Build the store selected by ``EPHEMERAL_STORE`` (memory or sqlite).
+
+    ``sqlite`` keeps every store as a table in ``EPHEMERAL_STORE_PATH``,
+    which is what multi-worker deployments need."""
+    backend = os.getenv("EPHEMERAL_STORE", "memory")
+    if backend == "memory":
+        return ExpiringDict(ttl, max_entries)
+    if backend == "sqlite":
+        path = os.getenv("EPHEMERAL_STORE_PATH", "ephemeral.db")
+        return SQLiteExpiringDict(path, name, ttl, max_entries)
+    raise ValueError(f"Unknown EPHEMERAL_STORE backend {backend!r}, expected 'memory' or 'sqlite'")
@@ -0,0 +1,264 @@
+"""Storage for registered users and their WebAuthn credentials.
+
+``server.users_db`` used to be a process-local dict of credential lists, so
+credentials vanished on restart and a login had to scan the user's list for
+the matching ``credential_id``. ``UserStore`` implementations index users by
+email and credentials by ``credential_id``, update sign counts with an atomic
+compare-and-set, and expose an async interface: the SQLite backend runs its
+queries on worker threads so the event loop never waits on disk."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class StoredCredential:
+    credential_id: bytes
+    email: str
+    credential_public_key: bytes
+    sign_count: int
+
+
+class UserStore(ABC):
+    """Async interface shared by the storage backends.
+
+    Callbacks registered with ``subscribe`` are called with the
+    ``credential_id`` whenever a credential is replaced or removed, so
+    caches derived from stored keys can drop their copies."""
+
+    def __init__(self):
+        self._listeners: List[Callable[[bytes], None]] = []
+
+    def subscribe(self, callback: Callable[[bytes], None]) -> None:
+        self._listeners.append(callback)
+
+    def _notify(self, credential_id: bytes) -> None:
+        for callback in self._listeners:
+            callback(credential_id)
+
+    @abstractmethod
+    async def get_credentials(self, email: str) -> List[StoredCredential]:
+        ...
+
+    @abstractmethod
+    async def get_credential(self, credential_id: bytes) -> Optional[StoredCredential]:
+        ...
+
+    @abstractmethod
+    async def add_credential(
+        self,
+        email: str,
+        credential_id: bytes,
+        credential_public_key: bytes,
+        sign_count: int,
+    ) -> None:
+        """Register a credential, replacing any earlier one with the same id."""
+
+    @abstractmethod
+    async def remove_credential(self, credential_id: bytes) -> bool:
+        """Delete a credential; returns False if it did not exist."""
+
+    @abstractmethod
+    async def update_sign_count(self, credential_id: bytes, expected: int, new: int) -> bool:
+        """Set the sign count to ``new`` only if it is still ``expected``.
+
+        Returns False when another login changed it first, which callers
+        must treat as a possible replay."""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryUserStore(UserStore):
+    """Dict-backed store for development and single-process tests."""
+
+    def __init__(self):
+        super().__init__()
+        self._credentials: Dict[bytes, StoredCredential] = {}
+        self._by_email: Dict[str, List[bytes]] = {}
+
+    async def get_credentials(self, email: str) -> List[StoredCredential]:
+        return [self._credentials[cid] for cid in self._by_email.get(email, ())]
+
+    async def get_credential(self, credential_id: bytes) -> Optional[StoredCredential]:
+        return self._credentials.get(credential_id)
+
+    async def add_credential(
+        self,
+        email: str,
+        credential_id: bytes,
+        credential_public_key: bytes,
+        sign_count: int,
+    ) -> None:
+        previous = self._credentials.get(credential_id)
+        if previous is not None:
+            self._by_email[previous.email].remove(credential_id)
+        self._credentials[credential_id] = StoredCredential(
+            credential_id, email, credential_public_key, sign_count
+        )
+        self._by_email.setdefault(email, []).append(credential_id)
+        self._notify(credential_id)
+
+    async def remove_credential(self, credential_id: bytes) -> bool:
+        credential = self._credentials.pop(credential_id, None)
+        if credential is None:
+            return False
+        self._by_email[credential.email].remove(credential_id)
+        self._notify(credential_id)
+        return True
+
+    async def update_sign_count(self, credential_id: bytes, expected: int, new: int) -> bool:
+        # No await between the check and the write, so this is atomic on the event loop.
+        credential = self._credentials.get(credential_id)
+        if credential is None or credential.sign_count != expected:
+            return False
+        credential.sign_count = new
+        return True
+
+
+class SQLiteUserStore(UserStore):
+    """Embedded SQLite store in WAL mode, shareable by every worker process.
+
+    Each worker thread keeps its own connection; WAL lets readers proceed
+    while a writer commits."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            email TEXT PRIMARY KEY
+        );
+        CREATE TABLE IF NOT EXISTS credentials (
+            credential_id BLOB PRIMARY KEY,
+            email TEXT NOT NULL REFERENCES users(email),
+            public_key BLOB NOT NULL,
+            sign_count INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS credentials_by_email ON credentials(email);
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        super().__init__()
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        with self._connect() as connection:
+            connection.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    @staticmethod
+    def _row(row: tuple) -> StoredCredential:
+        return StoredCredential(bytes(row[0]), row[1], bytes(row[2]), row[3])
+
+    def _get_credentials(self, email: str) -> List[StoredCredential]:
+        rows = self._connect().execute(
+            "SELECT credential_id, email, public_key, sign_count FROM credentials WHERE email = ?",
+            (email,),
+        )
+        return [self._row(row) for row in rows]
+
+    def _get_credential(self, credential_id: bytes) -> Optional[StoredCredential]:
+        row = self._connect().execute(
+            "SELECT credential_id, email, public_key, sign_count FROM credentials WHERE credential_id = ?",
+            (credential_id,),
+        ).fetchone()
+        return self._row(row) if row else None
+
+    def _add_credential(
+        self,
+        email: str,
+        credential_id: bytes,
+        credential_public_key: bytes,
+        sign_count: int,
+    ) -> None:
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("INSERT OR IGNORE INTO users(email) VALUES (?)", (email,))
+            connection.execute(
+                "INSERT OR REPLACE INTO credentials(credential_id, email, public_key, sign_count) "
+                "VALUES (?, ?, ?, ?)",
+                (credential_id, email, credential_public_key, sign_count),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _remove_credential(self, credential_id: bytes) -> bool:
+        cursor = self._connect().execute(
+            "DELETE FROM credentials WHERE credential_id = ?", (credential_id,)
+        )
+        return cursor.rowcount == 1
+
+    def _update_sign_count(self, credential_id: bytes, expected: int, new: int) -> bool:
+        cursor = self._connect().execute(
+            "UPDATE credentials SET sign_count = ? WHERE credential_id = ? AND sign_count = ?",
+            (new, credential_id, expected),
+        )
+        return cursor.rowcount == 1
+
+    async def get_credentials(self, email: str) -> List[StoredCredential]:
+        return await asyncio.to_thread(self._get_credentials, email)
+
+    async def get_credential(self, credential_id: bytes) -> Optional[StoredCredential]:
+        return await asyncio.to_thread(self._get_credential, credential_id)
+
+    async def add_credential(
+        self,
+        email: str,
+        credential_id: bytes,
+        credential_public_key: bytes,
+        sign_count: int,
+    ) -> None:
+        await asyncio.to_thread(
+            self._add_credential, email, credential_id, credential_public_key, sign_count
+        )
+        self._notify(credential_id)
+
+    async def remove_credential(self, credential_id: bytes) -> bool:
+        removed = await asyncio.to_thread(self._remove_credential, credential_id)
+        if removed:
+            self._notify(credential_id)
+        return removed
+
+    async def update_sign_count(self, credential_id: bytes, expected: int, new: int) -> bool:
+        return await asyncio.to_thread(self._update_sign_count, credential_id, expected, new)
+
+    async def close(self) -> None:
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+
+def create_user_store(backend: str | None = None, path: str | None = None) -> UserStore:
+    """Build the store selected by ``USER_STORE`` (memory or sqlite)."""
+    backend = backend or os.getenv("USER_STORE", "memory")
+    if backend == "memory":
+        return MemoryUserStore()
+    if backend == "sqlite":
+        return SQLiteUserStore(path or os.getenv("USER_STORE_PATH", "users.db"))
+    raise ValueError(f"Unknown USER_STORE backend {backend!r}, expected 'memory' or 'sqlite'")